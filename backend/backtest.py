@@ -0,0 +1,227 @@
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel
+
+from backend.strategy import DEFAULT_CONFIG, StrategyConfig, compute_signal_frame, resolve_signal
+
+FIRST_BAR = 22  # Bars skipped before the replay starts (chandelier lookback)
+MIN_CANDLES = 50
+
+
+class BacktestConfig(BaseModel):
+    """Execution costs, defaults for one ES contract"""
+    slippage_ticks: float = 1
+    tick_value: float = 12.50
+    tick_size: float = 0.25
+    transaction_fee: float = 5.0  # Per round trip
+    initial_margin: float = 13500
+    futures_multiplier: float = 50
+
+
+def _empty_result() -> dict:
+    return {
+        "totalTrades": 0,
+        "winRate": 0,
+        "totalReturn": 0,
+        "netReturnAfterCosts": 0,
+        "mdd": 0,
+        "totalCosts": 0,
+        "profitFactor": 0,
+        "averageHoldTime": 0,
+        "buyAndHoldReturn": 0,
+        "alphaVsBenchmark": 0,
+        "netProfitAmount": 0,
+        "activePosition": None,
+        "trades": [],
+    }
+
+
+def run_backtest(
+    hist: pd.DataFrame,
+    config: BacktestConfig = BacktestConfig(),
+    strategy: StrategyConfig = DEFAULT_CONFIG,
+) -> dict:
+    """
+    Replay the Anti-Gravity strategy over hist with real-world costs.
+
+    Same rules and BacktestResult shape as runBacktest in
+    frontend/app/utils/backtest.ts. Indicators and raw signals come from one
+    vectorized pass; only the position state machine below walks the bars.
+    """
+    if len(hist) < MIN_CANDLES:
+        return _empty_result()
+
+    signals = compute_signal_frame(hist, strategy)
+    dates = [d.isoformat() for d in hist.index]
+    high = hist["High"].to_numpy(dtype=float).tolist()
+    low = hist["Low"].to_numpy(dtype=float).tolist()
+    close = hist["Close"].to_numpy(dtype=float).tolist()
+    # The frontend engine reads ATR back from the signal's 2-decimal string
+    atr = np.round(signals["atr"].to_numpy(), 2).tolist()
+    ready = signals["ready"].to_numpy().tolist()
+    long_1, long_2 = signals["long_1"].tolist(), signals["long_2"].tolist()
+    short_1, short_2 = signals["short_1"].tolist(), signals["short_2"].tolist()
+    long_exit, short_exit = signals["long_exit"].tolist(), signals["short_exit"].tolist()
+
+    slippage = config.slippage_ticks * config.tick_size
+    fee = config.transaction_fee
+    multiplier = config.futures_multiplier
+    profit_take = strategy.profit_take_multiplier
+
+    trades: List[dict] = []
+    position: Optional[dict] = None
+    equity = 100000.0
+    net_equity = 100000.0
+    initial_equity = equity
+    peak_equity = equity
+    max_drawdown = 0.0
+    total_costs = 0.0
+
+    for i in range(FIRST_BAR, len(close)):
+        if not ready[i]:
+            continue
+        weight = position["weight"] if position else 0
+        signal = resolve_signal(long_1[i], long_2[i], short_1[i], short_2[i], long_exit[i], short_exit[i], weight)
+
+        if position:
+            is_long = position["type"] == "LONG"
+
+            # 1. Partial profit taking (50% of weight)
+            if not position["partial_exit_taken"]:
+                target = position["avg_entry_price"] + atr[i] * profit_take if is_long \
+                    else position["avg_entry_price"] - atr[i] * profit_take
+                if (high[i] >= target) if is_long else (low[i] <= target):
+                    partial_weight = position["weight"] * 0.5
+                    actual_exit = target - slippage if is_long else target + slippage
+                    point_diff = actual_exit - position["avg_entry_price"] if is_long \
+                        else position["avg_entry_price"] - actual_exit
+                    net_profit = point_diff * multiplier * partial_weight
+
+                    total_costs += fee
+                    net_equity += net_profit - fee
+                    trades.append({
+                        "type": position["type"],
+                        "entryDate": position["entry_date"],
+                        "entryPrice": position["avg_entry_price"],
+                        "entryIndex": position["entry_index"],
+                        "exitDate": dates[i],
+                        "exitPrice": target,
+                        "exitIndex": i,
+                        "profit": net_profit,
+                        "returnPercent": net_profit / initial_equity * 100,
+                        "cost": fee,
+                    })
+                    position["weight"] -= partial_weight
+                    position["partial_exit_taken"] = True
+
+            # 2. Full exit of the remaining weight
+            should_exit = signal in (("EXIT_LONG", "STRONG_SELL") if is_long else ("EXIT_SHORT", "STRONG_BUY"))
+            # Breakeven stop once the partial target has been taken
+            if position["partial_exit_taken"]:
+                if (close[i] < position["avg_entry_price"]) if is_long else (close[i] > position["avg_entry_price"]):
+                    should_exit = True
+
+            if should_exit:
+                actual_exit = close[i] - slippage if is_long else close[i] + slippage
+                point_diff = actual_exit - position["avg_entry_price"] if is_long \
+                    else position["avg_entry_price"] - actual_exit
+                net_profit = point_diff * multiplier * position["weight"]
+
+                total_costs += fee
+                net_equity += net_profit - fee
+                peak_equity = max(peak_equity, net_equity)
+                max_drawdown = max(max_drawdown, (peak_equity - net_equity) / peak_equity)
+
+                trades.append({
+                    "type": position["type"],
+                    "entryDate": position["entry_date"],
+                    "entryPrice": position["avg_entry_price"],
+                    "entryIndex": position["entry_index"],
+                    "exitDate": dates[i],
+                    "exitPrice": close[i],
+                    "exitIndex": i,
+                    "profit": net_profit,
+                    "returnPercent": net_profit / initial_equity * 100,
+                    "cost": fee,
+                })
+                position = None
+
+        # 3. Entry logic with initial margin validation (one contract per entry)
+        if not position:
+            if signal in ("STRONG_BUY", "STRONG_SELL") and net_equity >= config.initial_margin:
+                is_long = signal == "STRONG_BUY"
+                entry_price = close[i] + slippage if is_long else close[i] - slippage
+                position = {
+                    "type": "LONG" if is_long else "SHORT",
+                    "avg_entry_price": entry_price,
+                    "entry_date": dates[i],
+                    "entry_index": i,
+                    "weight": 1,
+                    "partial_exit_taken": False,
+                }
+                total_costs += fee
+        elif (signal == "PYRAMID_BUY" and position["type"] == "LONG") or \
+                (signal == "PYRAMID_SELL" and position["type"] == "SHORT"):
+            # Pyramid one more contract if margin allows
+            if net_equity >= config.initial_margin * (position["weight"] + 1):
+                entry_price = close[i] + slippage if position["type"] == "LONG" else close[i] - slippage
+                new_weight = position["weight"] + 1
+                position["avg_entry_price"] = (position["avg_entry_price"] * position["weight"] + entry_price) / new_weight
+                position["weight"] = new_weight
+                total_costs += fee
+
+    net_trade_profits = np.array([t["profit"] - t["cost"] for t in trades], dtype=float)
+    wins = int((net_trade_profits > 0).sum())
+    win_rate = wins / len(trades) * 100 if trades else 0
+
+    net_return_after_costs = (net_equity - initial_equity) / initial_equity * 100
+    total_return = (equity - initial_equity) / initial_equity * 100
+
+    # Benchmark: buy & hold from the first replayed bar
+    first_price = close[FIRST_BAR]
+    last_price = close[-1]
+    buy_and_hold_return = (last_price - first_price) / first_price * 100
+
+    total_profit = float(net_trade_profits[net_trade_profits > 0].sum())
+    total_loss = abs(float(net_trade_profits[net_trade_profits < 0].sum()))
+    profit_factor = total_profit if total_loss == 0 else total_profit / total_loss
+
+    total_hold_time = sum(t["exitIndex"] - t["entryIndex"] for t in trades)
+    average_hold_time = total_hold_time / len(trades) if trades else 0
+
+    active_position = None
+    if position:
+        point_diff = last_price - position["avg_entry_price"] if position["type"] == "LONG" \
+            else position["avg_entry_price"] - last_price
+        if multiplier:
+            floating_profit = point_diff * multiplier * position["weight"]
+            floating_return = floating_profit / initial_equity * 100
+        else:
+            floating_profit = point_diff * position["weight"]
+            floating_return = floating_profit / (position["avg_entry_price"] * position["weight"]) * 100
+        active_position = {
+            "type": position["type"],
+            "avgEntryPrice": position["avg_entry_price"],
+            "weight": position["weight"],
+            "floatingProfit": floating_profit,
+            "floatingReturn": floating_return,
+            "entryDate": position["entry_date"],
+        }
+
+    return {
+        "totalTrades": len(trades),
+        "winRate": win_rate,
+        "totalReturn": total_return,
+        "netReturnAfterCosts": net_return_after_costs,
+        "mdd": max_drawdown * 100,
+        "totalCosts": total_costs,
+        "profitFactor": profit_factor,
+        "averageHoldTime": average_hold_time,
+        "buyAndHoldReturn": buy_and_hold_return,
+        "alphaVsBenchmark": net_return_after_costs - buy_and_hold_return,
+        "netProfitAmount": net_equity - initial_equity,
+        "activePosition": active_position,
+        "trades": trades,
+    }
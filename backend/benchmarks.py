@@ -0,0 +1,434 @@
+"""
+Benchmarks for the backend hot paths, run on synthetic (or recorded) OHLCV
+data with no network access:
+
+    python -m backend.benchmarks --output bench.json
+    python -m backend.benchmarks --quick --only indicators,search
+    python -m backend.benchmarks --output new.json --baseline bench.json --max-regression 0.25
+
+Results are JSON (one record per benchmark and parameter set, with min /
+median / mean / max seconds). With --baseline, medians are compared to a
+previous run and the process exits with status 1 if any benchmark got slower
+by more than --max-regression, so it can gate a deployment.
+
+The API benchmarks use a throwaway SQLite database (BENCH_DATABASE_URL, a
+temporary file by default), never the application's own.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from backend.providers import MarketDataProvider
+
+DEFAULT_SIZES = (1_000, 100_000, 1_000_000)
+QUICK_SIZES = (1_000, 10_000)
+CLIENT_COUNTS = (10, 100, 1000)
+SEARCH_UNIVERSE = 10_000
+GROUPS = ("encoding", "api", "simulation", "indicators", "broadcast", "search")
+
+
+def synthetic_ohlcv(rows: int, freq: str = "1min", tz: str = "America/New_York", seed: int = 7) -> pd.DataFrame:
+    """A random-walk OHLCV series of `rows` bars ending now."""
+    rng = np.random.default_rng(seed)
+    index = pd.date_range(end=pd.Timestamp.now(tz=tz).floor(freq), periods=rows, freq=freq)
+    close = 100 + np.cumsum(rng.normal(0, 0.2, rows))
+    open = np.concatenate(([close[0]], close[:-1]))
+    spread = np.abs(rng.normal(0, 0.3, rows))
+    return pd.DataFrame(
+        {
+            "Open": open,
+            "High": np.maximum(open, close) + spread,
+            "Low": np.minimum(open, close) - spread,
+            "Close": close,
+            "Volume": rng.integers(100, 10_000, rows),
+        },
+        index=index,
+    )
+
+
+def _repeats(rows: int, quick: bool) -> int:
+    if quick:
+        return 3
+    return 7 if rows <= 10_000 else 3 if rows <= 100_000 else 1
+
+
+def measure(name: str, params: dict, fn: Callable[[], object], repeat: int, items: Optional[int] = None) -> dict:
+    """Run fn once to warm up, then `repeat` timed times."""
+    fn()
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    median = statistics.median(times)
+    result = {
+        "name": name,
+        "params": params,
+        "repeat": repeat,
+        "min": min(times),
+        "median": median,
+        "mean": statistics.fmean(times),
+        "max": max(times),
+    }
+    if items:
+        result["items"] = items
+        result["items_per_second"] = items / median if median > 0 else None
+    print(f"  {name:<28} {json.dumps(params):<48} median {median * 1000:10.3f} ms", file=sys.stderr)
+    return result
+
+
+def _get(client, url: str, params: dict):
+    """GET that fails the run on a non-200, so errors are never timed as results."""
+    response = client.get(url, params=params)
+    if response.status_code != 200:
+        raise RuntimeError(f"{url} {params} -> {response.status_code}: {response.text[:200]}")
+    return response
+
+
+def _drain(response) -> int:
+    """Consume a (streaming) response body as a client would; returns the byte count."""
+    if hasattr(response, "body_iterator"):
+        async def consume():
+            total = 0
+            async for chunk in response.body_iterator:
+                total += len(chunk)
+            return total
+        return asyncio.run(consume())
+    return len(response.body)
+
+
+# Benchmark groups; each yields result records
+
+def bench_encoding(sizes: Iterable[int], quick: bool) -> Iterable[dict]:
+    """Candle response encoding per format, without HTTP in the way."""
+    from backend import encoding
+
+    formats = ["json", "ndjson", "columnar", "binary"]
+    try:
+        import pyarrow  # noqa: F401
+        formats.append("arrow")
+    except ImportError:
+        pass
+    for rows in sizes:
+        hist = synthetic_ohlcv(rows)
+        for fmt in formats:
+            yield measure(
+                "encoding.candles", {"rows": rows, "format": fmt},
+                lambda: _drain(encoding.candle_response(hist, fmt)), _repeats(rows, quick), rows,
+            )
+
+
+class SyntheticProvider(MarketDataProvider):
+    """Market data provider serving synthetic 1-minute series; the row count is the symbol's suffix (BENCH-1000)."""
+
+    name = "synthetic"
+
+    def quote(self, symbol: str) -> dict:
+        return {"price": 100.0, "previous_close": 99.0}
+
+    def history(self, symbol: str, interval: str, period=None, start=None) -> pd.DataFrame:
+        hist = synthetic_ohlcv(int(symbol.rsplit("-", 1)[1]))
+        return hist[hist.index >= pd.Timestamp(start)] if start is not None else hist
+
+    def timezone(self, symbol: str) -> Optional[str]:
+        return "America/New_York"
+
+
+def _seed_history(symbol: str, rows: int):
+    from backend import stats_scheduler
+
+    base = datetime(2000, 1, 1)  # Minute-spaced so a million rows stay within datetime64[ns]
+    recorded_at = datetime.utcnow()
+    chunk = 50_000
+    for start in range(0, rows, chunk):
+        stats_scheduler.upsert_daily_stats([
+            {
+                "symbol": symbol, "date": base + timedelta(minutes=i), "price": 100.0 + i % 50,
+                "change_percent": 0.5, "volume": 1000 + i, "atr": 1.5,
+                "open": 100.0, "high": 101.0, "low": 99.0, "recorded_at": recorded_at,
+            }
+            for i in range(start, min(rows, start + chunk))
+        ])
+
+
+def bench_api(sizes: Iterable[int], quick: bool, recording: Optional[str] = None) -> Iterable[dict]:
+    """/stocks/candles and /stocks/history end to end through the ASGI app (warm caches)."""
+    from fastapi.testclient import TestClient
+
+    from backend import pagination, providers
+    from backend.database import create_db_and_tables
+    from backend.main import app
+
+    create_db_and_tables()
+    client = TestClient(app)  # Not entered, so the startup tasks (network, pollers) don't run
+
+    if recording:
+        provider = providers.ReplayProvider(recording)
+        providers.set_provider(provider)
+        series = [(symbol, interval) for interval in ("1m", "5m", "1h", "1d") for symbol in provider.symbols(interval)]
+        for symbol, interval in series:
+            rows = len(provider.history(symbol, interval))
+            for fmt in ("json", "columnar", "binary"):
+                yield measure(
+                    "api.candles", {"symbol": symbol, "interval": interval, "rows": rows, "format": fmt},
+                    lambda: _get(client, f"/stocks/candles/{symbol}", {"period": "max", "interval": interval, "format": fmt}),
+                    _repeats(rows, quick), rows,
+                )
+    else:
+        providers.set_provider(SyntheticProvider())
+        for rows in sizes:
+            symbol = f"BENCH-{rows}"
+            for fmt in ("json", "columnar", "binary"):
+                yield measure(
+                    "api.candles", {"rows": rows, "format": fmt},
+                    lambda: _get(client, f"/stocks/candles/{symbol}", {"period": "max", "interval": "1m", "format": fmt}),
+                    _repeats(rows, quick), rows,
+                )
+
+    for rows in sizes:
+        symbol = f"HIST-{rows}"
+        _seed_history(symbol, rows)
+        page = min(rows, pagination.MAX_LIMIT)
+        middle = pagination.encode_cursor(datetime(2000, 1, 1) + timedelta(minutes=rows // 2), rows // 2)
+        for fmt in ("json", "columnar", "binary"):
+            yield measure(
+                "api.history.first_page", {"rows": rows, "format": fmt},
+                lambda: _get(client, f"/stocks/history/{symbol}", {"limit": page, "format": fmt}),
+                _repeats(page, quick), page,
+            )
+            yield measure(
+                "api.history.deep_page", {"rows": rows, "format": fmt},
+                lambda: _get(client, f"/stocks/history/{symbol}", {"limit": page, "format": fmt, "cursor": middle}),
+                _repeats(page, quick), page,
+            )
+
+
+def bench_simulation(sizes: Iterable[int], quick: bool) -> Iterable[dict]:
+    """get_simulated_1m_candles generation: `rows` 1-minute candles from hourly base bars."""
+    from backend import simulation
+
+    for rows in sizes:
+        base = synthetic_ohlcv(max(1, rows // 60), freq="1h")
+        yield measure(
+            "simulation.minute_candles", {"rows": rows},
+            lambda: simulation.simulate_minute_candles(base, steps=60, seed=1), _repeats(rows, quick), rows,
+        )
+
+
+def bench_indicators(sizes: Iterable[int], quick: bool) -> Iterable[dict]:
+    """Vectorized TR/ATR and the streaming indicator state over the same bars."""
+    from backend import indicators
+    from backend.indicator_engine import IndicatorState
+
+    for rows in sizes:
+        hist = synthetic_ohlcv(rows, freq="1D" if rows <= 10_000 else "1min")
+        high, low, close = (hist[c].to_numpy(dtype=float) for c in ("High", "Low", "Close"))
+        repeat = _repeats(rows, quick)
+        yield measure("indicators.true_range", {"rows": rows}, lambda: indicators.true_range(high, low, close), repeat, rows)
+        yield measure("indicators.wilder_atr", {"rows": rows}, lambda: indicators.wilder_atr(high, low, close, 14), repeat, rows)
+        yield measure("indicators.state_feed", {"rows": rows}, lambda: IndicatorState("BENCH", "1m").feed(hist), repeat, rows)
+
+
+class MockWebSocket:
+    def __init__(self, delivered: List[int]):
+        self.delivered = delivered
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, data: str):
+        self.delivered[0] += 1
+
+    async def close(self, code: int = 1000):
+        pass
+
+
+def bench_broadcast(counts: Iterable[int], quick: bool) -> Iterable[dict]:
+    """ConnectionManager fan-out: queueing a quote batch (publish) and delivering it to every mock socket."""
+    from backend.ws_manager import DEFAULT_SYMBOLS, ConnectionManager
+
+    for clients in counts:
+        async def run() -> List[dict]:
+            manager = ConnectionManager()
+            delivered = [0]
+            for _ in range(clients):
+                await manager.connect(MockWebSocket(delivered))
+            tick = [0]
+
+            def quotes() -> Dict[str, dict]:
+                tick[0] += 1  # New prices every round, so every client gets a delta
+                return {s: {"price": 100.0 + tick[0] * 0.01, "change": 0.1, "change_percent": 0.1} for s in DEFAULT_SYMBOLS}
+
+            async def publish_and_deliver():
+                target = delivered[0] + clients
+                await manager.publish_quotes(quotes())
+                while delivered[0] < target:
+                    await asyncio.sleep(0)
+
+            results = []
+            repeat = 5 if quick else 20
+            for name, coroutine in (
+                ("broadcast.publish", lambda: manager.publish_quotes(quotes())),
+                ("broadcast.deliver", publish_and_deliver),
+                ("broadcast.message", lambda: manager.broadcast({"type": "ping"})),
+            ):
+                times = []
+                for _ in range(repeat + 1):
+                    started = time.perf_counter()
+                    await coroutine()
+                    times.append(time.perf_counter() - started)
+                    await asyncio.sleep(0)  # Let writers flush between rounds
+                times = times[1:]
+                median = statistics.median(times)
+                results.append({
+                    "name": name, "params": {"clients": clients}, "repeat": repeat,
+                    "min": min(times), "median": median, "mean": statistics.fmean(times), "max": max(times),
+                    "items": clients, "items_per_second": clients / median if median > 0 else None,
+                })
+                print(f"  {name:<28} {json.dumps({'clients': clients}):<48} median {median * 1000:10.3f} ms", file=sys.stderr)
+            for websocket in list(manager.clients):
+                manager.disconnect(websocket)
+            return results
+
+        yield from asyncio.run(run())
+
+
+def bench_search(quick: bool) -> Iterable[dict]:
+    """search_stocks over a SEARCH_UNIVERSE-instrument universe: index build and query latency."""
+    from backend.search_index import SymbolIndex
+
+    rng = np.random.default_rng(3)
+    words = ["Global", "Holdings", "Energy", "Tech", "Bio", "Financial", "Motor", "Semiconductor", "Retail", "Capital"]
+    hangul = ["삼성", "현대", "한화", "에너지", "바이오", "금융", "전자", "화학"]
+    instruments = []
+    for i in range(SEARCH_UNIVERSE):
+        if i % 5 == 0:
+            name = "".join(rng.choice(hangul, 2)) + f" {i}"
+            symbol = f"{i:06d}.KS"
+        else:
+            name = " ".join(rng.choice(words, 2)) + f" {i}"
+            symbol = "".join(chr(65 + int(c)) for c in rng.integers(0, 26, 4)) + str(i % 10)
+        instruments.append({"symbol": symbol, "name": name, "exchange": "BENCH", "type": "EQUITY"})
+
+    repeat = 3 if quick else 5
+    yield measure("search.build", {"instruments": SEARCH_UNIVERSE}, lambda: SymbolIndex(instruments), repeat, SEARCH_UNIVERSE)
+    index = SymbolIndex(instruments)
+    queries = {"exact": instruments[1]["symbol"], "prefix": "AB", "word": "energy", "substring": "olding", "hangul": "삼성", "initials": "ㅎㄷ"}
+    for kind, q in queries.items():
+        yield measure(
+            "search.query", {"instruments": SEARCH_UNIVERSE, "query": kind},
+            lambda: [index.search(q, limit=10) for _ in range(100)], repeat, 100,
+        )
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, timeout=5,
+        ).stdout.strip()
+    except Exception:
+        commit = None
+    return {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "commit": commit or None,
+        "timestamp": datetime.utcnow().isoformat(),
+    }
+
+
+def _key(result: dict) -> str:
+    return result["name"] + json.dumps(result["params"], sort_keys=True)
+
+
+def compare(results: List[dict], baseline: List[dict], max_regression: float) -> List[dict]:
+    """Benchmarks whose median got slower than baseline by more than max_regression (a fraction)."""
+    previous = {_key(r): r for r in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get(_key(result))
+        if before is None or before["median"] <= 0:
+            continue
+        change = result["median"] / before["median"] - 1
+        result["change"] = round(change, 4)
+        if change > max_regression:
+            regressions.append({"name": result["name"], "params": result["params"], "baseline": before["median"], "median": result["median"], "change": round(change, 4)})
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Backend hot-path benchmarks")
+    parser.add_argument("--only", help=f"Comma-separated groups to run ({','.join(GROUPS)})")
+    parser.add_argument("--sizes", help="Comma-separated row counts (default 1000,100000,1000000)")
+    parser.add_argument("--quick", action="store_true", help="Small sizes and few repeats, for a smoke run")
+    parser.add_argument("--recording", help="Benchmark /stocks/candles on a market data recording instead of synthetic series")
+    parser.add_argument("--output", help="Write JSON results here (default: stdout)")
+    parser.add_argument("--baseline", help="Previous JSON results to compare medians against")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="Allowed median slowdown vs baseline (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    groups = [g.strip() for g in args.only.split(",")] if args.only else list(GROUPS)
+    unknown = set(groups) - set(GROUPS)
+    if unknown:
+        parser.error(f"Unknown groups: {', '.join(sorted(unknown))}")
+    sizes = [int(s) for s in args.sizes.split(",")] if args.sizes else list(QUICK_SIZES if args.quick else DEFAULT_SIZES)
+
+    # Keep benchmark data out of the application database; must happen before backend.database is imported
+    workdir = tempfile.mkdtemp(prefix="bench-")
+    os.environ["DATABASE_URL"] = os.getenv("BENCH_DATABASE_URL", f"sqlite:///{os.path.join(workdir, 'bench.db')}")
+
+    results: List[dict] = []
+    for group in groups:
+        print(f"▶️ [Bench] {group}", file=sys.stderr)
+        if group == "encoding":
+            results += bench_encoding(sizes, args.quick)
+        elif group == "api":
+            results += bench_api(sizes, args.quick, args.recording)
+        elif group == "simulation":
+            results += bench_simulation(sizes, args.quick)
+        elif group == "indicators":
+            results += bench_indicators(sizes, args.quick)
+        elif group == "broadcast":
+            results += bench_broadcast(CLIENT_COUNTS, args.quick)
+        elif group == "search":
+            results += bench_search(args.quick)
+
+    report = {"environment": environment(), "results": results}
+    status = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline["results"], args.max_regression)
+        report["baseline"] = {"file": args.baseline, "environment": baseline.get("environment"), "max_regression": args.max_regression}
+        report["regressions"] = regressions
+        for r in regressions:
+            print(f"❌ [Bench] {r['name']} {json.dumps(r['params'])}: {r['change']:+.1%} vs baseline", file=sys.stderr)
+        status = 1 if regressions else 0
+
+    text = json.dumps(report, indent=1)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+        print(f"✅ [Bench] {len(results)} results written to {args.output}", file=sys.stderr)
+    else:
+        print(text)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
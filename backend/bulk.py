@@ -0,0 +1,328 @@
+"""
+Streaming bulk import and export for the row tables (trades, journal
+entries, daily stats).
+
+Imports read the request body as it arrives (CSV with a header row, or
+NDJSON), validate each record against the model and insert in batched
+transactions; a batch that hits a constraint is retried row by row so the
+report names the offending lines. Exports walk a server-side cursor and
+stream CSV, NDJSON or Parquet chunk by chunk, so neither direction ever
+holds the whole table in memory.
+"""
+
+import csv
+import io
+import json
+import os
+from datetime import date, datetime, timezone
+from typing import AsyncIterator, Callable, Iterator, List, Optional, Sequence, Tuple, Type
+
+from fastapi import HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import Boolean, DateTime, Float, Integer, insert
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, SQLModel
+
+from backend.database import engine
+from backend.encoding import MEDIA_TYPES
+
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "1000"))  # Rows per import transaction
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "5000"))  # Rows fetched and encoded per chunk
+MAX_REPORTED_ERRORS = 1000  # Errors listed in an import report; the count covers the rest
+
+IMPORT_FORMATS = ("csv", "ndjson")
+EXPORT_FORMATS = ("csv", "ndjson", "parquet")
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": MEDIA_TYPES["ndjson"],
+    "parquet": "application/vnd.apache.parquet",
+}
+
+Record = Tuple[int, dict]  # (line number in the upload, raw fields)
+
+
+def import_format(format: Optional[str], content_type: Optional[str]) -> str:
+    """?format= first, then the Content-Type (text/csv, application/x-ndjson)."""
+    if format:
+        if format not in IMPORT_FORMATS:
+            raise HTTPException(status_code=400, detail=f"Unsupported import format: {format}. Use csv or ndjson")
+        return format
+    content_type = (content_type or "").lower()
+    if "csv" in content_type:
+        return "csv"
+    if "ndjson" in content_type or "jsonl" in content_type or "json-seq" in content_type:
+        return "ndjson"
+    raise HTTPException(status_code=415, detail="Send text/csv or application/x-ndjson, or pass ?format=csv|ndjson")
+
+
+async def _lines(request: Request) -> AsyncIterator[str]:
+    """Decoded body lines (newline kept) as the upload streams in."""
+    pending = b""
+    async for chunk in request.stream():
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8-sig") + "\n"
+    if pending:
+        yield pending.decode("utf-8-sig")
+
+
+async def _ndjson_records(request: Request) -> AsyncIterator[Tuple[int, object]]:
+    number = 0
+    async for line in _lines(request):
+        number += 1
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError as e:
+            yield number, ValueError(f"Invalid JSON: {e}")
+
+
+async def _csv_records(request: Request) -> AsyncIterator[Tuple[int, object]]:
+    """CSV rows as dicts keyed by the header; quoted fields may span lines."""
+    header: Optional[List[str]] = None
+    record, record_line, number = "", 0, 0
+    async for line in _lines(request):
+        number += 1
+        if not record:
+            record_line = number
+        record += line
+        if record.count('"') % 2:
+            continue  # Inside a quoted field that continues on the next line
+        text, record = record, ""
+        if not text.strip():
+            continue
+        try:
+            values = next(csv.reader([text]))
+        except csv.Error as e:
+            yield record_line, ValueError(f"Invalid CSV: {e}")
+            continue
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if len(values) != len(header):
+            yield record_line, ValueError(f"Expected {len(header)} fields, got {len(values)}")
+            continue
+        # Empty cells fall back to the model default (or fail if the field is required)
+        yield record_line, {name: value for name, value in zip(header, values) if value != ""}
+    if record:
+        yield record_line, ValueError("Unterminated quoted field")
+
+
+def _naive_utc(value):
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _validate(model: Type[SQLModel], fields: object, prepare: Optional[Callable[[dict], None]]) -> dict:
+    if not isinstance(fields, dict):
+        raise ValueError("Each record must be an object")
+    fields = {k: v for k, v in fields.items() if k != "id"}  # The database assigns ids
+    if prepare is not None:
+        prepare(fields)
+    row = model.model_validate(fields).model_dump(exclude={"id"})
+    return {k: _naive_utc(v) for k, v in row.items()}
+
+
+def _error_message(error: Exception) -> str:
+    if isinstance(error, ValidationError):
+        return "; ".join(f"{'.'.join(map(str, e['loc'])) or 'record'}: {e['msg']}" for e in error.errors())
+    if isinstance(error, IntegrityError):
+        return f"Conflicts with an existing row ({error.orig})"
+    return str(error)
+
+
+class ImportReport:
+    def __init__(self):
+        self.inserted = 0
+        self.failed = 0
+        self.errors: List[dict] = []
+
+    def error(self, line: int, error: Exception):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": _error_message(error)})
+
+    def as_dict(self) -> dict:
+        return {"inserted": self.inserted, "failed": self.failed, "errors": sorted(self.errors, key=lambda e: e["line"])}
+
+
+def _write_batch(model: Type[SQLModel], batch: List[Record], report: ImportReport):
+    """One transaction per batch; on a constraint error, retry row by row to pin down the bad lines."""
+    table = model.__table__
+    with Session(engine) as session:
+        try:
+            session.execute(insert(table), [row for _, row in batch])
+            session.commit()
+            report.inserted += len(batch)
+            return
+        except IntegrityError:
+            session.rollback()
+        for line, row in batch:
+            try:
+                with session.begin_nested():
+                    session.execute(insert(table), [row])
+                report.inserted += 1
+            except IntegrityError as e:
+                report.error(line, e)
+        session.commit()
+
+
+async def import_rows(
+    request: Request,
+    model: Type[SQLModel],
+    format: Optional[str] = None,
+    prepare: Optional[Callable[[dict], None]] = None,
+    on_batch: Optional[Callable[[List[dict]], None]] = None,
+) -> ImportReport:
+    """
+    Stream the request body into `model`'s table. `prepare` can fill in
+    derived fields of each raw record before validation; `on_batch` sees
+    each written batch's rows.
+    """
+    fmt = import_format(format, request.headers.get("content-type"))
+    records = _csv_records(request) if fmt == "csv" else _ndjson_records(request)
+    report = ImportReport()
+    batch: List[Record] = []
+
+    async def flush():
+        await run_in_threadpool(_write_batch, model, batch, report)
+        if on_batch is not None:
+            on_batch([row for _, row in batch])
+        batch.clear()
+
+    async for line, fields in records:
+        if isinstance(fields, Exception):
+            report.error(line, fields)
+            continue
+        try:
+            batch.append((line, _validate(model, fields, prepare)))
+        except (ValidationError, ValueError, TypeError) as e:
+            report.error(line, e)
+            continue
+        if len(batch) >= BULK_BATCH_SIZE:
+            await flush()
+    if batch:
+        await flush()
+    return report
+
+
+def _csv_value(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def _json_value(value):
+    return value.isoformat() if isinstance(value, (datetime, date)) else value
+
+
+def _chunks(query, chunk_rows: int = EXPORT_CHUNK_ROWS) -> Iterator[Sequence]:
+    """Rows from a server-side cursor, `chunk_rows` at a time; the session lives as long as the stream."""
+    with Session(engine) as session:
+        result = session.execute(query.execution_options(stream_results=True, yield_per=chunk_rows))
+        for partition in result.partitions(chunk_rows):
+            yield partition
+
+
+def _stream_csv(query, columns: List[str]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(columns)
+    for rows in _chunks(query):
+        writer.writerows([_csv_value(v) for v in row] for row in rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _stream_ndjson(query, columns: List[str]) -> Iterator[str]:
+    for rows in _chunks(query):
+        yield "".join(
+            json.dumps({c: _json_value(v) for c, v in zip(columns, row)}, separators=(",", ":")) + "\n"
+            for row in rows
+        )
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands its bytes back between Parquet row groups."""
+
+    def __init__(self):
+        self.parts: List[bytes] = []
+        self.position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.parts.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def drain(self) -> bytes:
+        data, self.parts = b"".join(self.parts), []
+        return data
+
+
+def _arrow_schema(model: Type[SQLModel], columns: List[str]):
+    import pyarrow as pa
+
+    def arrow_type(column_type):
+        if isinstance(column_type, DateTime):
+            return pa.timestamp("us")
+        if isinstance(column_type, Boolean):
+            return pa.bool_()
+        if isinstance(column_type, Integer):
+            return pa.int64()
+        if isinstance(column_type, Float):
+            return pa.float64()
+        return pa.string()
+
+    return pa.schema([(c, arrow_type(model.__table__.columns[c].type)) for c in columns])
+
+
+def _stream_parquet(query, schema, columns: List[str]) -> Iterator[bytes]:
+    """One Parquet row group per chunk, flushed to the client as soon as it is written."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, schema) as writer:
+        for rows in _chunks(query):
+            writer.write_table(pa.Table.from_pylist([dict(zip(columns, row)) for row in rows], schema=schema))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def export_response(query, model: Type[SQLModel], fmt: str, filename: str) -> StreamingResponse:
+    """Stream `query` (a select of `model`'s columns) as CSV, NDJSON or Parquet."""
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported export format: {fmt}. Use one of {', '.join(EXPORT_FORMATS)}")
+    columns = [c.name for c in model.__table__.columns]
+    if fmt == "parquet":
+        try:
+            import pyarrow.parquet  # noqa: F401
+        except ImportError:
+            raise HTTPException(status_code=406, detail="Parquet export requires pyarrow on the server")
+        body = _stream_parquet(query, _arrow_schema(model, columns), columns)
+    elif fmt == "csv":
+        body = _stream_csv(query, columns)
+    else:
+        body = _stream_ndjson(query, columns)
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'},
+    )
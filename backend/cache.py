@@ -0,0 +1,180 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+class TTLCache:
+    """
+    In-process LRU cache with a per-cache TTL and single-flight loading.
+
+    Concurrent misses for the same key (from threads or coroutines) share one
+    in-flight loader call instead of each going upstream. Expired entries stay
+    until evicted so callers can fall back to them (see get_stale).
+    """
+
+    def __init__(self, name: str, ttl: float, maxsize: int = 1024):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def _get_fresh(self, key: Hashable) -> Tuple[bool, Any]:
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry[0] >= self.ttl:
+            return False, None
+        self._entries.move_to_end(key)
+        return True, entry[1]
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            hit, value = self._get_fresh(key)
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return value
+
+    def get_stale(self, key: Hashable) -> Optional[Any]:
+        """Last loaded value regardless of age, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[1] if entry is not None else None
+
+    def set(self, key: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def _claim(self, key: Hashable) -> Tuple[bool, Any, Optional[Future], bool]:
+        """Under the lock: (hit, value, future, owner). The owner must run the loader."""
+        with self._lock:
+            hit, value = self._get_fresh(key)
+            if hit:
+                self.hits += 1
+                return True, value, None, False
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return False, None, future, False
+            self.misses += 1
+            future = Future()
+            self._inflight[key] = future
+            return False, None, future, True
+
+    def _settle(self, key: Hashable, future: Future, value: Any = None, error: Optional[BaseException] = None):
+        if error is None:
+            self.set(key, value)
+            future.set_result(value)
+        else:
+            future.set_exception(error)
+        with self._lock:
+            self._inflight.pop(key, None)
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Blocking variant, for sync handlers and worker threads."""
+        hit, value, future, owner = self._claim(key)
+        if hit:
+            return value
+        if not owner:
+            return future.result()
+        try:
+            value = loader()
+        except BaseException as e:
+            self._settle(key, future, error=e)
+            raise
+        self._settle(key, future, value)
+        return value
+
+    async def aget_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Async variant; loader returns an awaitable (e.g. an upstream.run call)."""
+        hit, value, future, owner = self._claim(key)
+        if hit:
+            return value
+        if not owner:
+            return await asyncio.wrap_future(future)
+        try:
+            value = await loader()
+        except BaseException as e:
+            self._settle(key, future, error=e)
+            raise
+        self._settle(key, future, value)
+        return value
+
+    async def aget_or_load_many(
+        self, keys: List[Hashable], loader: Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]]
+    ) -> Tuple[Dict[Hashable, Any], Dict[Hashable, BaseException]]:
+        """
+        Batch variant: one loader call for the keys nobody else is loading;
+        keys already in flight wait for their owner. Returns (values, errors)
+        by key; keys the loader leaves out fail with LookupError.
+        """
+        values: Dict[Hashable, Any] = {}
+        errors: Dict[Hashable, BaseException] = {}
+        waiting: Dict[Hashable, Future] = {}
+        owned: Dict[Hashable, Future] = {}
+        for key in dict.fromkeys(keys):
+            hit, value, future, owner = self._claim(key)
+            if hit:
+                values[key] = value
+            elif owner:
+                owned[key] = future
+            else:
+                waiting[key] = future
+
+        if owned:
+            try:
+                loaded = await loader(list(owned))
+            except BaseException as e:
+                for key, future in owned.items():
+                    self._settle(key, future, error=e)
+                    errors[key] = e
+                if not isinstance(e, Exception):
+                    raise
+            else:
+                for key, future in owned.items():
+                    if key in loaded:
+                        self._settle(key, future, loaded[key])
+                        values[key] = loaded[key]
+                    else:
+                        error = LookupError(f"Loader returned nothing for {key!r}")
+                        self._settle(key, future, error=error)
+                        errors[key] = error
+
+        for key, future in waiting.items():
+            try:
+                values[key] = await asyncio.wrap_future(future)
+            except Exception as e:
+                errors[key] = e
+        return values, errors
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "ttl": self.ttl,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+        }
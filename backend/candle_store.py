@@ -0,0 +1,281 @@
+import re
+import threading
+from contextlib import ExitStack
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+from sqlmodel import Session, select
+
+from backend import providers, upstream
+from backend.database import engine, upsert_insert
+from backend.models import CandleBar, CandleSeries
+
+# How long a stored series is served as-is before the missing tail is fetched.
+# Intraday bars change every minute; daily bars only need the live last bar refreshed.
+REFRESH_TTL_SECONDS = {
+    "1m": 30, "2m": 60, "5m": 60, "15m": 120, "30m": 120,
+    "60m": 300, "90m": 300, "1h": 300,
+}
+DEFAULT_REFRESH_TTL_SECONDS = 600
+
+_PERIOD_RE = re.compile(r"^(\d+)(d|wk|mo|y)$")
+_PERIOD_UNIT_DAYS = {"d": 1, "wk": 7, "mo": 31, "y": 366}
+
+OHLCV_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+# One loader per (symbol, interval) at a time: a second caller waits and then
+# finds the series the first one stored instead of fetching and inserting it again
+_series_locks: Dict[Tuple[str, str], threading.Lock] = {}
+_series_locks_guard = threading.Lock()
+
+
+def _series_lock(symbol: str, interval: str) -> threading.Lock:
+    with _series_locks_guard:
+        return _series_locks.setdefault((symbol, interval), threading.Lock())
+
+
+def period_start(period: str, now: Optional[datetime] = None) -> Optional[datetime]:
+    """Translate a yfinance period string into a UTC window start (None = unbounded)."""
+    now = now or datetime.now(timezone.utc)
+    if period == "max":
+        return None
+    if period == "ytd":
+        return datetime(now.year, 1, 1, tzinfo=timezone.utc)
+    match = _PERIOD_RE.match(period)
+    if not match:
+        raise ValueError(f"Unsupported period: {period}")
+    count, unit = match.groups()
+    return now - timedelta(days=int(count) * _PERIOD_UNIT_DAYS[unit])
+
+
+def _empty_frame(tz: str = "UTC") -> pd.DataFrame:
+    return pd.DataFrame(columns=OHLCV_COLUMNS, index=pd.DatetimeIndex([], tz=tz))
+
+
+def epoch_seconds(index: pd.DatetimeIndex):
+    """UTC epoch seconds for a DatetimeIndex, independent of its storage unit."""
+    if index.tz is None:
+        index = index.tz_localize("UTC")
+    return ((index - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1)).to_numpy()
+
+
+def _upsert(session: Session, symbol: str, interval: str, hist: pd.DataFrame) -> Optional[int]:
+    """
+    Write upstream bars, replacing any stored bar with the same open time.
+    Returns the open time of the last bar written (None if every row lacked prices).
+    """
+    hist = hist.dropna(subset=["Open", "High", "Low", "Close"])
+    if hist.empty:
+        return None
+    ts = epoch_seconds(hist.index)
+    rows = [
+        {"symbol": symbol, "interval": interval, "ts": int(t),
+         "open": float(o), "high": float(h), "low": float(l), "close": float(c), "volume": int(v)}
+        for t, o, h, l, c, v in zip(
+            ts, hist["Open"].to_numpy(), hist["High"].to_numpy(), hist["Low"].to_numpy(),
+            hist["Close"].to_numpy(), hist["Volume"].fillna(0).to_numpy()
+        )
+    ]
+    stmt = upsert_insert(CandleBar)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["symbol", "interval", "ts"],
+        set_={col: stmt.excluded[col] for col in ("open", "high", "low", "close", "volume")},
+    )
+    session.execute(stmt, rows)
+    return int(ts.max())
+
+
+def _read(session: Session, symbol: str, interval: str, start: Optional[datetime], tz: str) -> pd.DataFrame:
+    query = (
+        select(CandleBar.ts, CandleBar.open, CandleBar.high, CandleBar.low, CandleBar.close, CandleBar.volume)
+        .where(CandleBar.symbol == symbol)
+        .where(CandleBar.interval == interval)
+    )
+    if start is not None:
+        query = query.where(CandleBar.ts >= int(start.timestamp()))
+    rows = session.execute(query.order_by(CandleBar.ts.asc())).all()
+    if not rows:
+        return _empty_frame(tz)
+
+    frame = pd.DataFrame.from_records(rows, columns=["ts"] + OHLCV_COLUMNS)
+    index = pd.to_datetime(frame.pop("ts"), unit="s", utc=True).dt.tz_convert(tz)
+    frame.index = pd.DatetimeIndex(index, name="Date")
+    return frame
+
+
+# Provider calls go through the upstream circuit breaker here rather than around
+# the whole store read, so rate-limited tail refreshes count towards opening it
+# and stored bars can still be served while it is open.
+
+def _fetch(symbol: str, interval: str, period: Optional[str] = None, start: Optional[datetime] = None) -> pd.DataFrame:
+    return upstream.call("provider_history", providers.get_provider().history, symbol, interval, period=period, start=start)
+
+
+def _fetch_many(
+    symbols: List[str], interval: str, period: Optional[str] = None, start: Optional[datetime] = None
+) -> Dict[str, pd.DataFrame]:
+    """One bulk upstream download, split back into per-symbol frames."""
+    return upstream.call(
+        "provider_history_bulk", providers.get_provider().history_many, symbols, interval, period=period, start=start
+    )
+
+
+def _series_tz(symbol: str, hist: pd.DataFrame) -> str:
+    """Exchange timezone of a freshly fetched series."""
+    tz = str(hist.index.tz) if hist.index.tz is not None else "UTC"
+    if tz == "UTC":
+        # Bulk downloads across exchanges are merged on a UTC index; ask for the real one
+        try:
+            tz = upstream.call("provider_timezone", providers.get_provider().timezone, symbol) or tz
+        except Exception:
+            pass
+    return tz
+
+
+def _unavailable(error: BaseException) -> bool:
+    return isinstance(error, upstream.UpstreamUnavailable) or upstream.is_rate_limit(error)
+
+
+def _needs(series: Optional[CandleSeries], start_ts: Optional[int], ttl: int, now: datetime) -> Optional[str]:
+    """What a stored series needs before it can serve the window: "full", "tail" or None."""
+    if series is None:
+        return "full"
+    covered = series.covered_from is None or (start_ts is not None and series.covered_from <= start_ts)
+    if not covered:
+        return "full"
+    age = (now.replace(tzinfo=None) - series.refreshed_at).total_seconds()
+    if age < ttl:
+        return None
+    # A tail older than the whole window (e.g. after long downtime) is cheaper
+    # and safer to refetch in full than to page through upstream limits.
+    if start_ts is not None and series.last_ts < start_ts:
+        return "full"
+    return "tail"
+
+
+def _store_full(
+    session: Session, series: Optional[CandleSeries], symbol: str, interval: str,
+    hist: pd.DataFrame, start_ts: Optional[int], now: datetime,
+) -> CandleSeries:
+    # From the rows written: a forming bar yfinance returns without prices isn't stored
+    last_ts = _upsert(session, symbol, interval, hist)
+    if last_ts is None:  # No priced rows at all: the next tail starts before the first one
+        last_ts = series.last_ts if series is not None else int(hist.index[0].timestamp()) - 1
+    if series is None:
+        # Another worker process may store the same series first; keep its row and update it
+        stmt = upsert_insert(CandleSeries).values(
+            symbol=symbol, interval=interval, tz=_series_tz(symbol, hist), covered_from=start_ts,
+            last_ts=last_ts, refreshed_at=now.replace(tzinfo=None),
+        ).on_conflict_do_nothing(index_elements=["symbol", "interval"])
+        session.execute(stmt)
+        series = session.get(CandleSeries, (symbol, interval), populate_existing=True)
+    series.covered_from = start_ts
+    series.last_ts = max(series.last_ts, last_ts)
+    series.refreshed_at = now.replace(tzinfo=None)
+    session.add(series)
+    return series
+
+
+def _store_tail(session: Session, series: CandleSeries, tail: pd.DataFrame, now: datetime):
+    last_ts = _upsert(session, series.symbol, series.interval, tail) if not tail.empty else None
+    if last_ts is not None:
+        series.last_ts = max(series.last_ts, last_ts)
+    series.refreshed_at = now.replace(tzinfo=None)
+    session.add(series)
+
+
+def get_history(symbol: str, period: str = "60d", interval: str = "1d") -> pd.DataFrame:
+    """
+    Return OHLCV bars for symbol/interval covering period, yfinance-style
+    (Open/High/Low/Close/Volume columns on a tz-aware index).
+
+    Bars are served from the local store; upstream is only asked for the window
+    we have never seen or for the tail since the last stored bar.
+    """
+    now = datetime.now(timezone.utc)
+    start = period_start(period, now)
+    start_ts = int(start.timestamp()) if start is not None else None
+    ttl = REFRESH_TTL_SECONDS.get(interval, DEFAULT_REFRESH_TTL_SECONDS)
+
+    with _series_lock(symbol, interval), Session(engine) as session:
+        series = session.get(CandleSeries, (symbol, interval))
+        need = _needs(series, start_ts, ttl, now)
+
+        if need == "full":
+            try:
+                hist = _fetch(symbol, interval, period=period)
+            except Exception as e:
+                if series is None or not _unavailable(e):
+                    raise
+                # Older bars would have to come from upstream; serve the part we have
+                print(f"⚠️ [Candle Store] Upstream unavailable for {symbol} {interval}, serving stored bars: {e}")
+                return _read(session, symbol, interval, start, series.tz)
+            if hist.empty:
+                return _empty_frame()
+            series = _store_full(session, series, symbol, interval, hist, start_ts, now)
+            session.commit()
+        elif need == "tail":
+            # Re-fetch from the last stored bar: it may have been partial when we saw it.
+            try:
+                tail = _fetch(symbol, interval, start=datetime.fromtimestamp(series.last_ts, tz=timezone.utc))
+            except Exception as e:
+                print(f"⚠️ [Candle Store] Tail refresh failed for {symbol} {interval}, serving stored bars: {e}")
+            else:
+                _store_tail(session, series, tail, now)
+                session.commit()
+
+        return _read(session, symbol, interval, start, series.tz)
+
+
+def get_history_many(symbols: List[str], period: str = "60d", interval: str = "1d") -> Dict[str, pd.DataFrame]:
+    """
+    get_history for several symbols, with at most one bulk upstream download
+    for the series that need a full window and one for those that need a tail.
+    Symbols upstream has no data for map to an empty frame.
+    """
+    now = datetime.now(timezone.utc)
+    start = period_start(period, now)
+    start_ts = int(start.timestamp()) if start is not None else None
+    ttl = REFRESH_TTL_SECONDS.get(interval, DEFAULT_REFRESH_TTL_SECONDS)
+    symbols = list(dict.fromkeys(symbols))
+
+    with ExitStack() as locks:
+        for symbol in sorted(symbols):  # Fixed order, so overlapping batches can't deadlock
+            locks.enter_context(_series_lock(symbol, interval))
+        session = locks.enter_context(Session(engine))
+        series_by_symbol = {symbol: session.get(CandleSeries, (symbol, interval)) for symbol in symbols}
+        needs = {symbol: _needs(series, start_ts, ttl, now) for symbol, series in series_by_symbol.items()}
+
+        full = [symbol for symbol, need in needs.items() if need == "full"]
+        if full:
+            try:
+                frames = _fetch_many(full, interval, period=period)
+            except Exception as e:
+                if not _unavailable(e) or any(series_by_symbol[s] is None for s in full):
+                    raise
+                print(f"⚠️ [Candle Store] Upstream unavailable for {len(full)} symbols, serving stored bars: {e}")
+                frames = {}
+            for symbol, hist in frames.items():
+                if not hist.empty:
+                    series_by_symbol[symbol] = _store_full(
+                        session, series_by_symbol[symbol], symbol, interval, hist, start_ts, now
+                    )
+            session.commit()
+
+        tail = [symbol for symbol, need in needs.items() if need == "tail"]
+        if tail:
+            tail_start = datetime.fromtimestamp(min(series_by_symbol[s].last_ts for s in tail), tz=timezone.utc)
+            try:
+                frames = _fetch_many(tail, interval, start=tail_start)
+            except Exception as e:
+                print(f"⚠️ [Candle Store] Bulk tail refresh failed for {len(tail)} symbols, serving stored bars: {e}")
+            else:
+                for symbol in tail:
+                    _store_tail(session, series_by_symbol[symbol], frames.get(symbol, _empty_frame()), now)
+                session.commit()
+
+        return {
+            symbol: _read(session, symbol, interval, start, series.tz) if series else _empty_frame()
+            for symbol, series in series_by_symbol.items()
+        }
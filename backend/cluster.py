@@ -0,0 +1,246 @@
+"""
+Multi-worker mode (CLUSTER_MODE=1, for uvicorn --workers N).
+
+Workers elect a leader through an exclusive file lock. The leader runs the
+market poller and the scheduled jobs, and hosts a small pub/sub broker on a
+Unix socket. Every other worker connects to the broker, reports the symbols
+its own clients are subscribed to, and fans the leader's ticks out to its own
+sockets. The lock dies with its process, so another worker takes over if the
+leader goes away.
+
+Without CLUSTER_MODE the process is its own leader and nothing here opens a
+socket or a lock file.
+"""
+
+import asyncio
+import fcntl
+import json
+import os
+import tempfile
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Callable, Dict, Optional, Set
+
+from backend.live_bars import bars
+from backend.ws_manager import manager
+
+CLUSTER_MODE = os.getenv("CLUSTER_MODE", "0").lower() in ("1", "true", "yes")
+# Lock files and the broker socket; every worker of one deployment must share it
+CLUSTER_DIR = os.getenv("CLUSTER_DIR", os.path.join(tempfile.gettempdir(), "portfolio-suite"))
+ELECTION_INTERVAL = 5.0  # Seconds between leadership attempts by followers
+REPORT_INTERVAL = 2.0  # Seconds between a follower's subscription reports
+MAX_PEER_BUFFER = 4 * 1024 * 1024  # Bytes queued for one follower before it is dropped
+
+role = "leader" if not CLUSTER_MODE else "starting"  # leader or follower once elected
+
+
+class FileLock:
+    """Exclusive flock on CLUSTER_DIR/<name>.lock, released when the process exits."""
+
+    def __init__(self, name: str):
+        self.path = os.path.join(CLUSTER_DIR, f"{name}.lock")
+        self.fd: Optional[int] = None
+
+    def acquire(self, blocking: bool = False) -> bool:
+        if self.fd is not None:
+            return True
+        os.makedirs(CLUSTER_DIR, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self.fd = fd
+        return True
+
+    def release(self):
+        if self.fd is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+            os.close(self.fd)
+            self.fd = None
+
+
+@contextmanager
+def job_lock(name: str, blocking: bool = False):
+    """
+    Run a job in one worker at a time. Yields whether the lock was taken
+    (always True outside cluster mode); with blocking=True waits for it.
+    """
+    if not CLUSTER_MODE:
+        yield True
+        return
+    lock = FileLock(name)
+    acquired = lock.acquire(blocking)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            lock.release()
+
+
+@asynccontextmanager
+async def async_job_lock(name: str):
+    """job_lock(blocking=True) without blocking the event loop while waiting."""
+    if not CLUSTER_MODE:
+        yield
+        return
+    lock = FileLock(name)
+    await asyncio.to_thread(lock.acquire, True)
+    try:
+        yield
+    finally:
+        lock.release()
+
+
+def _encode(message: dict) -> bytes:
+    return (json.dumps(message) + "\n").encode()
+
+
+class Broker:
+    """Leader side: newline-delimited JSON over a Unix socket, one connection per follower."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.peers: Dict[asyncio.StreamWriter, Set[str]] = {}
+        self.server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)  # Left behind by a previous leader; we hold the lock now
+        self.server = await asyncio.start_unix_server(self._serve, path=self.path)
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.peers[writer] = set()
+        try:
+            while line := await reader.readline():
+                message = json.loads(line)
+                if message.get("type") == "symbols":
+                    self.peers[writer] = set(message.get("symbols", []))
+        except (ConnectionError, ValueError, asyncio.CancelledError):
+            pass  # Follower gone, garbage on the wire, or shutting down
+        finally:
+            self.peers.pop(writer, None)
+            writer.close()
+
+    def symbols(self) -> Set[str]:
+        symbols: Set[str] = set()
+        for peer_symbols in self.peers.values():
+            symbols |= peer_symbols
+        return symbols
+
+    def publish(self, message: dict):
+        data = _encode(message)
+        for writer in list(self.peers):
+            if writer.transport.get_write_buffer_size() > MAX_PEER_BUFFER:
+                print("⚠️ [Cluster] Dropping a follower that stopped reading")
+                self.peers.pop(writer, None)
+                writer.close()
+                continue
+            writer.write(data)
+
+
+broker: Optional[Broker] = None
+
+
+def _socket_path() -> str:
+    return os.path.join(CLUSTER_DIR, "broker.sock")
+
+
+def subscribed_symbols() -> Set[str]:
+    """Symbols the poller has to fetch: this worker's clients plus every follower's."""
+    symbols = manager.subscribed_symbols() if manager.active_connections else set()
+    if broker is not None:
+        symbols |= broker.symbols()
+    return symbols
+
+
+async def _fan_out(quotes: Dict[str, dict], at: float):
+    """This worker's share of a tick: live bars plus its own sockets."""
+    closed, updated = bars.on_quotes(quotes, at)
+    await manager.publish_quotes(quotes)
+    if closed or updated:
+        await manager.publish_bars(closed, updated)
+
+
+async def publish_quotes(quotes: Dict[str, dict]):
+    """Fan a quote batch out to this worker's sockets and to every follower."""
+    at = time.time()  # Stamped once, so every worker cuts bars at the same instants
+    if broker is not None and broker.peers:
+        broker.publish({"type": "quotes", "time": at, "quotes": quotes})
+    await _fan_out(quotes, at)
+
+
+async def _report_symbols(writer: asyncio.StreamWriter):
+    last = None
+    try:
+        while True:
+            symbols = sorted(manager.subscribed_symbols()) if manager.active_connections else []
+            if symbols != last:
+                writer.write(_encode({"type": "symbols", "symbols": symbols}))
+                await writer.drain()
+                last = symbols
+            await asyncio.sleep(REPORT_INTERVAL)
+    except ConnectionError:
+        pass  # The read loop sees the broken connection and reconnects
+
+
+async def _follow():
+    """Follower side: stay connected to the leader's broker and relay its ticks locally."""
+    while True:
+        try:
+            reader, writer = await asyncio.open_unix_connection(_socket_path(), limit=MAX_PEER_BUFFER)
+        except (FileNotFoundError, ConnectionError):
+            await asyncio.sleep(1)  # No leader broker yet
+            continue
+        print("🔗 [Cluster] Following the leader's market feed")
+        reporter = asyncio.create_task(_report_symbols(writer))
+        try:
+            while line := await reader.readline():
+                message = json.loads(line)
+                if message.get("type") == "quotes":
+                    await _fan_out(message["quotes"], message.get("time") or time.time())
+        except (ConnectionError, ValueError) as e:
+            print(f"⚠️ [Cluster] Broker connection lost: {e}")
+        finally:
+            reporter.cancel()
+            writer.close()
+        await asyncio.sleep(1)
+
+
+async def run(start_leader_tasks: Callable[[], None]):
+    """
+    Leader election loop. The winner starts the broker and calls
+    start_leader_tasks (poller, scheduled jobs); everyone else follows and
+    keeps trying, so a follower takes over within ELECTION_INTERVAL seconds.
+    """
+    global role, broker
+    if not CLUSTER_MODE:
+        start_leader_tasks()
+        return
+
+    lock = FileLock("leader")
+    follower: Optional[asyncio.Task] = None
+    while not lock.acquire():
+        if follower is None:
+            role = "follower"
+            print(f"👥 [Cluster] Worker {os.getpid()} is a follower")
+            follower = asyncio.create_task(_follow())
+        await asyncio.sleep(ELECTION_INTERVAL)
+
+    if follower is not None:
+        follower.cancel()
+    broker = Broker(_socket_path())
+    await broker.start()
+    role = "leader"
+    print(f"👑 [Cluster] Worker {os.getpid()} is the leader (broker at {broker.path})")
+    start_leader_tasks()
+
+
+def stats() -> dict:
+    return {
+        "cluster_mode": CLUSTER_MODE,
+        "role": role,
+        "pid": os.getpid(),
+        "followers": len(broker.peers) if broker is not None else 0,
+    }
@@ -1,14 +1,123 @@
+import os
+
+from sqlalchemy import event, inspect, text
+from sqlalchemy.engine import make_url
 from sqlmodel import create_engine, SQLModel, Session
-from backend.models import DiaryEntry, Trade, StockDailyStat  # Ensure models are imported for metadata
+from backend.models import DiaryEntry, Trade, StockDailyStat, CandleBar, CandleSeries, Position, PositionLot, LotClose, ScreenerRun, ScreenerResult  # Ensure models are imported for metadata
 
 sqlite_file_name = "database.db"
-sqlite_url = f"sqlite:///{sqlite_file_name}"
+DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///{sqlite_file_name}")
+DB_ECHO = os.getenv("DB_ECHO", "0").lower() in ("1", "true", "yes")  # SQL logging, off by default
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+is_sqlite = DATABASE_URL.startswith("sqlite")
+is_memory = is_sqlite and (":memory:" in DATABASE_URL or DATABASE_URL.rstrip("/") in ("sqlite:", "sqlite:/"))
+
+
+def _engine_options(url: str) -> dict:
+    options = {"echo": DB_ECHO, "pool_pre_ping": not is_sqlite}
+    if is_sqlite:
+        # Sessions are used from FastAPI's threadpool and the upstream pool
+        options["connect_args"] = {"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000}
+    if not is_memory:
+        options.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT)
+    return options
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets readers proceed while the stats/candle writers commit
+    cursor = dbapi_connection.cursor()
+    if not is_memory:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.close()
+
+
+# The candle store and the stats scheduler write with INSERT .. ON CONFLICT, which
+# SQLAlchemy offers for these backends only
+UPSERT_DIALECTS = ("sqlite", "postgresql")
+DATABASE_BACKEND = make_url(DATABASE_URL).get_backend_name()
+if DATABASE_BACKEND not in UPSERT_DIALECTS:
+    raise RuntimeError(f"Unsupported DATABASE_URL backend {DATABASE_BACKEND}; use one of {', '.join(UPSERT_DIALECTS)}")
+
+engine = create_engine(DATABASE_URL, **_engine_options(DATABASE_URL))
+if is_sqlite:
+    event.listen(engine, "connect", _set_sqlite_pragmas)
+
+
+def upsert_insert(table):
+    """INSERT for `table` with on_conflict_do_update/do_nothing, for the configured backend."""
+    if DATABASE_BACKEND == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(table)
+
+
+DAILY_STAT_UNIQUE_INDEX = "ux_stockdailystat_symbol_date"
+
+
+def _dedupe_daily_stats(conn):
+    """
+    One-time migration for databases created before the unique (symbol, date)
+    index: keep the newest row per day so the index can be built. Skipped once
+    the index exists.
+    """
+    if DAILY_STAT_UNIQUE_INDEX in {index["name"] for index in inspect(conn).get_indexes("stockdailystat")}:
+        return
+    removed = conn.execute(text(
+        "DELETE FROM stockdailystat WHERE id NOT IN "
+        "(SELECT MAX(id) FROM stockdailystat GROUP BY symbol, date)"
+    )).rowcount
+    print(f"🧹 [Database] Removed {removed} duplicate daily stat rows before adding {DAILY_STAT_UNIQUE_INDEX}")
 
-engine = create_engine(sqlite_url, echo=True)
 
 def create_db_and_tables():
     SQLModel.metadata.create_all(engine)
+    # create_all skips tables that already exist, so add indexes introduced since separately
+    with engine.begin() as conn:
+        _dedupe_daily_stats(conn)
+        for model in (DiaryEntry, Trade, StockDailyStat):
+            for index in model.__table__.indexes:
+                index.create(conn, checkfirst=True)
 
 def get_session():
     with Session(engine) as session:
         yield session
+
+
+# Optional async path (needs an async driver, e.g. aiosqlite for SQLite)
+try:
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from sqlmodel.ext.asyncio.session import AsyncSession
+    if is_sqlite:
+        import aiosqlite  # noqa: F401
+except ImportError:
+    create_async_engine = None
+
+ASYNC_DATABASE_URL = os.getenv(
+    "ASYNC_DATABASE_URL",
+    DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1) if is_sqlite else DATABASE_URL,
+)
+_async_engine = None
+
+
+def get_async_engine():
+    global _async_engine
+    if create_async_engine is None:
+        raise RuntimeError("Async database access needs an async driver (pip install aiosqlite)")
+    if _async_engine is None:
+        _async_engine = create_async_engine(ASYNC_DATABASE_URL, **_engine_options(ASYNC_DATABASE_URL))
+        if is_sqlite:
+            event.listen(_async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+    return _async_engine
+
+
+async def get_async_session():
+    """Async counterpart of get_session for handlers that must not block the event loop."""
+    async with AsyncSession(get_async_engine(), expire_on_commit=False) as session:
+        yield session
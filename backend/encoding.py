@@ -0,0 +1,164 @@
+import json
+import struct
+from typing import Dict, Iterable, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+from fastapi import HTTPException
+from fastapi.responses import Response, StreamingResponse
+
+CHUNK_ROWS = 5000
+
+MEDIA_TYPES = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+    "columnar": "application/vnd.columnar+json",
+    "binary": "application/vnd.columnar+octet-stream",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+
+def negotiate_format(format: Optional[str], accept: Optional[str], allowed: Iterable[str]) -> str:
+    """Pick a response format from ?format= first, then the Accept header, defaulting to row JSON."""
+    allowed = tuple(allowed)
+    if format:
+        if format not in allowed:
+            raise HTTPException(status_code=400, detail=f"Unsupported format: {format}. Use one of {', '.join(allowed)}")
+        return format
+    if accept:
+        for fmt in allowed:
+            if fmt != "json" and MEDIA_TYPES[fmt] in accept:
+                return fmt
+    return "json"
+
+
+def candle_table(hist: pd.DataFrame) -> pd.DataFrame:
+    """Candle columns as served by the API: date, rounded OHLC and integer volume."""
+    return pd.DataFrame(
+        {
+            "date": hist.index,
+            "open": np.round(hist["Open"].to_numpy(dtype=float), 2),
+            "high": np.round(hist["High"].to_numpy(dtype=float), 2),
+            "low": np.round(hist["Low"].to_numpy(dtype=float), 2),
+            "close": np.round(hist["Close"].to_numpy(dtype=float), 2),
+            "volume": hist["Volume"].fillna(0).to_numpy(dtype=np.int64),
+        }
+    )
+
+
+def _json_column(series: pd.Series) -> list:
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return [None if pd.isna(d) else d.isoformat() for d in series]
+    values = series.to_numpy()
+    if values.dtype.kind == "f" and np.isnan(values).any():
+        return [None if np.isnan(v) else v for v in values.tolist()]
+    return values.tolist()
+
+
+def to_columnar_json(table: pd.DataFrame) -> bytes:
+    """{"date": [...], "open": [...], ...} built column by column."""
+    return json.dumps({col: _json_column(table[col]) for col in table.columns}, separators=(",", ":")).encode()
+
+
+def to_binary(table: pd.DataFrame) -> bytes:
+    """
+    Packed little-endian column buffers.
+
+    Layout: uint32 header length, a UTF-8 JSON header
+    {"rows": n, "columns": [{"name", "dtype", ...}]}, then each column's raw
+    buffer in header order. Datetimes are int64 UTC epoch milliseconds (the
+    header carries their timezone), numbers are <f8 or <i8, strings are a
+    JSON array in the header itself.
+    """
+    columns, buffers = [], []
+    for col in table.columns:
+        series = table[col]
+        if pd.api.types.is_datetime64_any_dtype(series):
+            index = pd.DatetimeIndex(series)
+            tz = str(index.tz) if index.tz is not None else None
+            if tz is None:
+                index = index.tz_localize("UTC")
+            millis = (index - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(milliseconds=1)
+            columns.append({"name": col, "dtype": "<i8", "unit": "ms", "tz": tz})
+            buffers.append(np.asarray(millis, dtype="<i8").tobytes())
+        elif series.dtype.kind in "iub":
+            columns.append({"name": col, "dtype": "<i8"})
+            buffers.append(series.to_numpy(dtype="<i8").tobytes())
+        elif series.dtype.kind == "f":
+            columns.append({"name": col, "dtype": "<f8"})
+            buffers.append(series.to_numpy(dtype="<f8").tobytes())
+        else:
+            columns.append({"name": col, "dtype": "str", "values": _json_column(series)})
+    header = json.dumps({"rows": len(table), "columns": columns}, separators=(",", ":")).encode()
+    return struct.pack("<I", len(header)) + header + b"".join(buffers)
+
+
+def to_arrow(table: pd.DataFrame) -> bytes:
+    """Arrow IPC stream; needs the optional pyarrow package."""
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise HTTPException(status_code=406, detail="Arrow format requires pyarrow on the server")
+    arrow_table = pa.Table.from_pandas(table, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, arrow_table.schema) as writer:
+        writer.write_table(arrow_table)
+    return sink.getvalue().to_pybytes()
+
+
+def columnar_response(table: pd.DataFrame, fmt: str) -> Response:
+    """Encode a column table in one of the compact formats."""
+    if fmt == "columnar":
+        return Response(to_columnar_json(table), media_type=MEDIA_TYPES["columnar"])
+    if fmt == "binary":
+        return Response(to_binary(table), media_type=MEDIA_TYPES["binary"])
+    if fmt == "arrow":
+        return Response(to_arrow(table), media_type=MEDIA_TYPES["arrow"])
+    raise ValueError(f"Not a columnar format: {fmt}")
+
+
+def _candle_chunks(frame: pd.DataFrame, chunk_rows: int = CHUNK_ROWS) -> Iterator[list]:
+    """Yield serialized candle rows (one JSON object string each), chunk by chunk."""
+    for start in range(0, len(frame), chunk_rows):
+        chunk = frame.iloc[start:start + chunk_rows]
+        dates = chunk.index.map(lambda d: d.isoformat())
+        columns = [np.round(chunk[col].to_numpy(dtype=float), 2).tolist() for col in ("Open", "High", "Low", "Close")]
+        volumes = chunk["Volume"].fillna(0).to_numpy(dtype=np.int64).tolist()
+        yield [
+            f'{{"date":"{d}","open":{o},"high":{h},"low":{l},"close":{c},"volume":{v}}}'
+            for d, o, h, l, c, v in zip(dates, *columns, volumes)
+        ]
+
+
+def stream_candles_ndjson(frame: pd.DataFrame) -> Iterator[str]:
+    """Newline-delimited candles, one object per line."""
+    for rows in _candle_chunks(frame):
+        yield "\n".join(rows) + "\n"
+
+
+def stream_candles_json(frame: pd.DataFrame) -> Iterator[str]:
+    """The classic JSON array of candle objects, emitted incrementally."""
+    yield "["
+    first = True
+    for rows in _candle_chunks(frame):
+        yield ("" if first else ",") + ",".join(rows)
+        first = False
+    yield "]"
+
+
+def candle_response(hist: pd.DataFrame, fmt: str) -> Response:
+    """Serve yfinance-style OHLCV bars in the negotiated format."""
+    if fmt == "ndjson":
+        return StreamingResponse(stream_candles_ndjson(hist), media_type=MEDIA_TYPES["ndjson"])
+    if fmt == "json":
+        return StreamingResponse(stream_candles_json(hist), media_type=MEDIA_TYPES["json"])
+    return columnar_response(candle_table(hist), fmt)
+
+
+def stream_timeframes_json(meta: dict, frames: Dict[str, pd.DataFrame]) -> Iterator[str]:
+    """{...meta, "candles": {"1d": [...], "4h": [...]}} with each timeframe streamed like stream_candles_json."""
+    yield json.dumps(meta, separators=(",", ":"))[:-1] + ',"candles":{'
+    for i, (interval, frame) in enumerate(frames.items()):
+        yield ("," if i else "") + json.dumps(interval) + ":"
+        yield from stream_candles_json(frame)
+    yield "}}"
@@ -0,0 +1,314 @@
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backend import market_data
+from backend.candle_store import epoch_seconds
+from backend.strategy import CHANDELIER_LOOKBACK, CHANNEL_PERIOD, DEFAULT_CONFIG, StrategyConfig
+
+# History each state is seeded from: the shortest window with about 300 bars,
+# i.e. the EMA200's SMA seed plus 100 bars of warm-up (ATR and the rest need far
+# fewer). Later bars come from the stored series, so this is fetched once.
+HISTORY_PERIODS = {
+    "1m": "7d", "2m": "7d", "5m": "10d", "15m": "30d", "30m": "45d",
+    "60m": "90d", "1h": "90d", "1d": "450d", "1wk": "6y", "1mo": "max",
+}
+INTERVAL_SECONDS = {
+    "1m": 60, "2m": 120, "5m": 300, "15m": 900, "30m": 1800,
+    "60m": 3600, "1h": 3600, "1d": 86400, "1wk": 7 * 86400,
+}
+REFRESH_SECONDS = 60  # How often ensure() pulls new bars for an existing state
+
+
+class SeededEMA:
+    """Streaming counterpart of indicators.seeded_ema: SMA of the first `period` values, then recursive."""
+    __slots__ = ("period", "alpha", "count", "total", "value")
+
+    def __init__(self, period: int, alpha: float):
+        self.period = period
+        self.alpha = alpha
+        self.count = 0
+        self.total = 0.0
+        self.value: Optional[float] = None
+
+    def update(self, x: float):
+        self.count += 1
+        if self.count < self.period:
+            self.total += x
+        elif self.count == self.period:
+            self.value = (self.total + x) / self.period
+        else:
+            self.value += self.alpha * (x - self.value)
+
+    def copy(self) -> "SeededEMA":
+        other = SeededEMA(self.period, self.alpha)
+        other.count, other.total, other.value = self.count, self.total, self.value
+        return other
+
+
+class RollingExtreme:
+    """Max (or min) of the last `size` values in amortized O(1), via a monotonic deque."""
+    __slots__ = ("size", "sign", "count", "window")
+
+    def __init__(self, size: int, maximum: bool = True):
+        self.size = size
+        self.sign = 1.0 if maximum else -1.0
+        self.count = 0
+        self.window: Deque[Tuple[int, float]] = deque()
+
+    def update(self, x: float):
+        key = self.sign * x
+        while self.window and self.window[-1][1] <= key:
+            self.window.pop()
+        self.window.append((self.count, key))
+        if self.window[0][0] <= self.count - self.size:
+            self.window.popleft()
+        self.count += 1
+
+    @property
+    def value(self) -> Optional[float]:
+        return self.sign * self.window[0][1] if self.window else None
+
+    def copy(self) -> "RollingExtreme":
+        other = RollingExtreme(self.size, self.sign > 0)
+        other.count, other.window = self.count, deque(self.window)
+        return other
+
+
+class RollingMean:
+    __slots__ = ("size", "window", "total")
+
+    def __init__(self, size: int):
+        self.size = size
+        self.window: Deque[float] = deque()
+        self.total = 0.0
+
+    def update(self, x: float):
+        self.window.append(x)
+        self.total += x
+        if len(self.window) > self.size:
+            self.total -= self.window.popleft()
+
+    @property
+    def value(self) -> Optional[float]:
+        return self.total / self.size if len(self.window) == self.size else None
+
+    def copy(self) -> "RollingMean":
+        other = RollingMean(self.size)
+        other.window, other.total = deque(self.window), self.total
+        return other
+
+
+_COMPONENTS = ("atr", "ema_fast", "ema_trend", "volume_fast", "volume_slow", "highs", "lows", "closes")
+
+
+class IndicatorState:
+    """
+    Per symbol/interval indicator state, advanced one bar at a time in O(1).
+
+    Bars arrive in order; a bar with the same open time as the last one
+    (the still-forming bar, or a tick) replaces it by rewinding to the state
+    before that bar. Values match strategy.compute_signal_frame on the same bars.
+    """
+
+    def __init__(self, symbol: str, interval: str, config: StrategyConfig = DEFAULT_CONFIG):
+        self.symbol = symbol
+        self.interval = interval
+        self.config = config
+        self.bars = 0
+        self.last_ts: Optional[int] = None
+        self.bar: Optional[Tuple[float, float, float, float, float]] = None  # open, high, low, close, volume
+        self.prev_close: Optional[float] = None
+        self.atr = SeededEMA(config.atr_period, 1 / config.atr_period)
+        self.ema_fast = SeededEMA(config.ema_fast_period, 2 / (config.ema_fast_period + 1))
+        self.ema_trend = SeededEMA(config.ema_trend_period, 2 / (config.ema_trend_period + 1))
+        self.volume_fast = SeededEMA(config.volume_ema_fast, 2 / (config.volume_ema_fast + 1))
+        self.volume_slow = SeededEMA(config.volume_ema_slow, 2 / (config.volume_ema_slow + 1))
+        self.highs = RollingExtreme(CHANDELIER_LOOKBACK, maximum=True)
+        self.lows = RollingExtreme(CHANDELIER_LOOKBACK, maximum=False)
+        self.closes = RollingMean(CHANNEL_PERIOD)
+        self._base: Optional[dict] = None  # State before the last bar, for revising it
+
+    def _snapshot(self) -> dict:
+        snap = {name: getattr(self, name).copy() for name in _COMPONENTS}
+        snap.update(bars=self.bars, prev_close=self.prev_close)
+        return snap
+
+    def _restore(self, snap: dict):
+        for name in _COMPONENTS:
+            setattr(self, name, snap[name].copy())
+        self.bars, self.prev_close = snap["bars"], snap["prev_close"]
+
+    def advance(self, ts: int, open: float, high: float, low: float, close: float, volume: float):
+        if self.last_ts is not None and ts < self.last_ts:
+            return
+        if ts == self.last_ts:
+            self._restore(self._base)
+        else:
+            if self.bar is not None:
+                self.prev_close = self.bar[3]
+            self._base = self._snapshot()
+
+        if self.prev_close is None:
+            tr = high - low
+        else:
+            tr = max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+        self.atr.update(tr)
+        self.ema_fast.update(close)
+        self.ema_trend.update(close)
+        self.volume_fast.update(volume)
+        self.volume_slow.update(volume)
+        self.highs.update(high)
+        self.lows.update(low)
+        self.closes.update(close)
+        self.bars += 1
+        self.last_ts = ts
+        self.bar = (open, high, low, close, volume)
+
+    def tick(self, price: float, now: Optional[float] = None) -> bool:
+        """Fold a live price into the forming bar; ignored once that bar's period is over."""
+        if self.bar is None:
+            return False
+        span = INTERVAL_SECONDS.get(self.interval)
+        if span and (now or time.time()) - self.last_ts >= span:
+            return False  # New period started; its bar arrives with the next refresh
+        open, high, low, _, volume = self.bar
+        self.advance(self.last_ts, open, max(high, price), min(low, price), price, volume)
+        return True
+
+    def feed(self, hist: pd.DataFrame):
+        """Advance through the bars of hist from the last one seen (inclusive, so it is revised)."""
+        hist = hist.dropna(subset=["Open", "High", "Low", "Close"])
+        if hist.empty:
+            return
+        ts = epoch_seconds(hist.index)
+        start = 0 if self.last_ts is None else int(np.searchsorted(ts, self.last_ts))
+        rows = zip(
+            ts[start:].tolist(),
+            *(hist[c].to_numpy(dtype=float)[start:].tolist() for c in ("Open", "High", "Low", "Close")),
+            hist["Volume"].fillna(0).to_numpy(dtype=float)[start:].tolist(),
+        )
+        for row in rows:
+            self.advance(*row)
+
+    def indicators(self) -> dict:
+        """Indicator values as of the last bar (None until each has enough history)."""
+        atr = self.atr.value
+        multiplier = self.config.chandelier_multiplier
+        values = {
+            "atr": atr,
+            "ema_fast": self.ema_fast.value,
+            "ema_trend": self.ema_trend.value,
+            "volume_ema_fast": self.volume_fast.value,
+            "volume_ema_slow": self.volume_slow.value,
+            "sma20": self.closes.value,
+            "chandelier_long": self.highs.value - atr * multiplier if atr is not None else None,
+            "chandelier_short": self.lows.value + atr * multiplier if atr is not None else None,
+        }
+        return {k: None if v is None else round(float(v), 2) for k, v in values.items()}
+
+    def stats(self) -> dict:
+        """The /stocks/stats shape: latest bar, change vs previous close and ATR."""
+        open, high, low, close, volume = self.bar
+        prev = self.prev_close if self.prev_close is not None else close
+        change = close - prev
+        return {
+            "symbol": self.symbol,
+            "price": round(close, 2),
+            "change": round(change, 2),
+            "change_percent": round(change / prev * 100, 2) if prev else 0.0,
+            "volume": int(volume),
+            "atr": self.indicators()["atr"],
+            "high": round(high, 2),
+            "low": round(low, 2),
+            "open": round(open, 2),
+        }
+
+    def snapshot(self) -> dict:
+        return {
+            "symbol": self.symbol,
+            "interval": self.interval,
+            "time": pd.Timestamp(self.last_ts, unit="s", tz="UTC").isoformat(),
+            "bars": self.bars,
+            **self.stats(),
+            **self.indicators(),
+        }
+
+
+class IndicatorEngine:
+    """Registry of IndicatorStates, seeded once from history and then advanced by new bars and ticks."""
+
+    def __init__(self):
+        self.states: Dict[Tuple[str, str], IndicatorState] = {}
+        self._refreshed: Dict[Tuple[str, str], float] = {}
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}  # Keys some ensure() call is loading
+
+    def get(self, symbol: str, interval: str = "1d") -> Optional[IndicatorState]:
+        return self.states.get((symbol, interval))
+
+    async def ensure(self, symbols: Iterable[str], interval: str = "1d") -> Dict[str, Optional[IndicatorState]]:
+        """
+        States for symbols, seeding new ones and pulling new bars for stale ones
+        (one bulk read). Symbols another call is already loading wait for it
+        instead of being seeded twice.
+        """
+        symbols = list(dict.fromkeys(symbols))
+        now = time.monotonic()
+        due = [s for s in symbols if now - self._refreshed.get((s, interval), -REFRESH_SECONDS) >= REFRESH_SECONDS]
+        waits = {self._inflight[(s, interval)] for s in due if (s, interval) in self._inflight}
+        load = [s for s in due if (s, interval) not in self._inflight]
+        if load:
+            future = asyncio.get_running_loop().create_future()
+            for symbol in load:
+                self._inflight[(symbol, interval)] = future
+            try:
+                await self._load(load, interval, now)
+            except BaseException as e:
+                future.set_exception(e)
+                future.exception()  # Retrieved here; waiters (if any) see it too
+                raise
+            else:
+                future.set_result(None)
+            finally:
+                for symbol in load:
+                    self._inflight.pop((symbol, interval), None)
+        for wait in waits:
+            await wait
+        return {s: self.states.get((s, interval)) for s in symbols}
+
+    async def _load(self, symbols: List[str], interval: str, now: float):
+        period = HISTORY_PERIODS.get(interval, HISTORY_PERIODS["1d"])
+        frames = await market_data.get_history_many(symbols, period=period, interval=interval)
+        for symbol in symbols:
+            hist = frames.get(symbol)
+            if hist is None or hist.empty:
+                continue
+            key = (symbol, interval)
+            state = self.states.get(key)
+            if state is None:
+                # Seeding walks the whole window once; keep it off the event loop
+                state = IndicatorState(symbol, interval)
+                await asyncio.to_thread(state.feed, hist)
+                self.states[key] = state
+            else:
+                state.feed(hist)  # Only the new (and the revised last) bars
+            self._refreshed[key] = now
+
+    def on_quotes(self, quotes: Dict[str, dict], interval: str = "1d") -> Dict[str, dict]:
+        """Fold live prices into the daily states; returns fresh indicator values per updated symbol."""
+        updated = {}
+        for symbol, quote in quotes.items():
+            state = self.states.get((symbol, interval))
+            if state is not None and quote.get("price") is not None and state.tick(float(quote["price"])):
+                updated[symbol] = state.indicators()
+        return updated
+
+    def stats(self) -> dict:
+        return {"states": len(self.states)}
+
+
+engine = IndicatorEngine()
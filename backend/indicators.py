@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+
+
+def true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """TR per bar; the first bar has no previous close and uses high - low."""
+    prev_close = np.empty_like(close)
+    prev_close[0] = np.nan
+    prev_close[1:] = close[:-1]
+    tr = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    tr[0] = high[0] - low[0]
+    return tr
+
+
+def seeded_ema(values: np.ndarray, period: int, alpha: float) -> np.ndarray:
+    """
+    Recursive average seeded with the simple mean of the first `period` values,
+    as in the frontend strategy. Bars before the seed are 0.
+    """
+    values = np.asarray(values, dtype=float)
+    out = np.zeros(len(values))
+    if len(values) < period:
+        return out
+    seeded = values[period - 1:].copy()
+    seeded[0] = values[:period].mean()
+    out[period - 1:] = pd.Series(seeded).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+    return out
+
+
+def ema(values: np.ndarray, period: int) -> np.ndarray:
+    return seeded_ema(values, period, 2 / (period + 1))
+
+
+def wilder_atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int = 14) -> np.ndarray:
+    """ATR with Wilder's smoothing: atr = (prev_atr * (period - 1) + tr) / period."""
+    return seeded_ema(true_range(high, low, close), period, 1 / period)
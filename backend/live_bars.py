@@ -0,0 +1,167 @@
+"""
+Live intraday bars built from the polled quote feed.
+
+Every tick the poller publishes is folded into rolling 1m/5m/15m bars per
+symbol. Each (symbol, interval) keeps a fixed-size NumPy structured-array
+ring, so memory stays flat however long the server runs. The rings serve as
+the live tail of /stocks/candles and drive the bar_update/bar_close
+WebSocket events, without any extra upstream calls.
+"""
+
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+LIVE_INTERVALS = {"1m": 60, "5m": 300, "15m": 900}  # Bar length in seconds
+LIVE_BARS_CAPACITY = int(os.getenv("LIVE_BARS_CAPACITY", "500"))  # Bars kept per symbol and interval
+LIVE_BARS_IDLE_SECONDS = int(os.getenv("LIVE_BARS_IDLE_SECONDS", str(24 * 3600)))  # Drop symbols without ticks this long
+PRUNE_EVERY = 300  # Seconds between idle-symbol sweeps
+
+# Quotes carry no volume, so live bars are OHLC only
+BAR_DTYPE = np.dtype([("time", "i8"), ("open", "f8"), ("high", "f8"), ("low", "f8"), ("close", "f8")])
+
+
+def bar_dict(bar) -> dict:
+    return {
+        "time": int(bar["time"]),
+        "open": float(bar["open"]),
+        "high": float(bar["high"]),
+        "low": float(bar["low"]),
+        "close": float(bar["close"]),
+    }
+
+
+class BarRing:
+    """Fixed-capacity ring of bars, oldest overwritten first."""
+    __slots__ = ("bars", "head", "count")
+
+    def __init__(self, capacity: int = LIVE_BARS_CAPACITY):
+        self.bars = np.zeros(capacity, dtype=BAR_DTYPE)
+        self.head = 0  # Next slot to write
+        self.count = 0
+
+    def last(self) -> Optional[np.void]:
+        """The forming bar as a writable record view, or None while empty."""
+        return self.bars[self.head - 1] if self.count else None
+
+    def append(self, start: int, price: float):
+        self.bars[self.head] = (start, price, price, price, price)
+        self.head = (self.head + 1) % len(self.bars)
+        self.count = min(self.count + 1, len(self.bars))
+
+    def ordered(self) -> np.ndarray:
+        """Bars oldest first (a copy)."""
+        if self.count < len(self.bars):
+            return self.bars[:self.count].copy()
+        return np.concatenate((self.bars[self.head:], self.bars[:self.head]))
+
+
+class LiveBars:
+    def __init__(self, intervals: Dict[str, int] = LIVE_INTERVALS, capacity: int = LIVE_BARS_CAPACITY):
+        self.intervals = intervals
+        self.capacity = capacity
+        self.rings: Dict[str, Dict[str, BarRing]] = {}
+        self.last_price: Dict[str, float] = {}
+        self.last_tick: Dict[str, float] = {}
+        self.last_prune = time.time()
+
+    def tick(self, symbol: str, price: float, at: float) -> Tuple[Dict[str, dict], Dict[str, dict]]:
+        """
+        Fold one price into every interval of `symbol`. Returns ({interval: bar}
+        closed by this tick, {interval: bar} updated by it). A new bar is only
+        opened when the price moves, so a closed market doesn't print flat bars.
+        """
+        rings = self.rings.get(symbol)
+        if rings is None:
+            rings = self.rings[symbol] = {interval: BarRing(self.capacity) for interval in self.intervals}
+        moved = self.last_price.get(symbol) != price
+        self.last_price[symbol] = price
+        self.last_tick[symbol] = at
+        closed, updated = {}, {}
+        for interval, seconds in self.intervals.items():
+            ring = rings[interval]
+            start = int(at) - int(at) % seconds
+            bar = ring.last()
+            if bar is None or start > bar["time"]:
+                if not moved:
+                    continue
+                if bar is not None:
+                    closed[interval] = bar_dict(bar)
+                ring.append(start, price)
+                updated[interval] = bar_dict(ring.last())
+            elif start == bar["time"] and moved:
+                bar["high"] = max(bar["high"], price)
+                bar["low"] = min(bar["low"], price)
+                bar["close"] = price
+                updated[interval] = bar_dict(bar)
+            # Older ticks (clock skew between workers) are ignored
+        return closed, updated
+
+    def on_quotes(self, quotes: Dict[str, dict], at: Optional[float] = None) -> Tuple[Dict[str, dict], Dict[str, dict]]:
+        """Fold a quote batch; returns ({symbol: {interval: bar}} closed, {symbol: {interval: bar}} updated)."""
+        at = time.time() if at is None else at
+        closed, updated = {}, {}
+        for symbol, quote in quotes.items():
+            price = quote.get("price")
+            if price is None:
+                continue
+            symbol_closed, symbol_updated = self.tick(symbol, float(price), at)
+            if symbol_closed:
+                closed[symbol] = symbol_closed
+            if symbol_updated:
+                updated[symbol] = symbol_updated
+        if at - self.last_prune > PRUNE_EVERY:
+            self.prune(at)
+        return closed, updated
+
+    def prune(self, now: float):
+        self.last_prune = now
+        for symbol in [s for s, t in self.last_tick.items() if now - t > LIVE_BARS_IDLE_SECONDS]:
+            self.rings.pop(symbol, None)
+            self.last_price.pop(symbol, None)
+            self.last_tick.pop(symbol, None)
+
+    def frame(self, symbol: str, interval: str, tz: Optional[str] = None) -> pd.DataFrame:
+        """Live bars as a yfinance-style frame (Open..Volume, Volume 0), indexed in `tz`."""
+        ring = self.rings.get(symbol, {}).get(interval)
+        bars = ring.ordered() if ring is not None else np.zeros(0, dtype=BAR_DTYPE)
+        index = pd.to_datetime(bars["time"], unit="s", utc=True)
+        if tz is not None:
+            index = index.tz_convert(tz)
+        return pd.DataFrame(
+            {"Open": bars["open"], "High": bars["high"], "Low": bars["low"], "Close": bars["close"], "Volume": 0.0},
+            index=index,
+        )
+
+    def stats(self) -> dict:
+        rings = sum(len(r) for r in self.rings.values())
+        return {"symbols": len(self.rings), "rings": rings, "bytes": rings * self.capacity * BAR_DTYPE.itemsize}
+
+
+def with_live_tail(hist: pd.DataFrame, live: pd.DataFrame) -> pd.DataFrame:
+    """
+    Extend upstream bars with live ones: bars newer than the last upstream
+    bar are appended, and a live bar sharing its open time widens it.
+    """
+    if live.empty or hist.empty:
+        return hist
+    last = hist.index[-1]
+    live = live[live.index >= last]
+    if live.empty:
+        return hist
+    hist = hist.copy()
+    if live.index[0] == last:
+        bar = live.iloc[0]
+        hist.loc[last, "High"] = max(hist.loc[last, "High"], bar["High"])
+        hist.loc[last, "Low"] = min(hist.loc[last, "Low"], bar["Low"])
+        hist.loc[last, "Close"] = bar["Close"]
+        live = live.iloc[1:]
+    if live.empty:
+        return hist
+    return pd.concat([hist, live[hist.columns.intersection(live.columns)]])
+
+
+bars = LiveBars()
@@ -1,14 +1,17 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-import httpx
+from fastapi.responses import JSONResponse, PlainTextResponse
 import asyncio
-from backend.database import create_db_and_tables
+from backend.database import create_db_and_tables, engine
 from backend.ws_manager import manager
-from backend.tasks import broadcast_market_updates, auto_record_daily_stats
-from backend.routers import entries, trades, stocks
+from backend.tasks import broadcast_market_updates, auto_record_daily_stats, replay_market_feed
+from backend.routers import entries, trades, stocks, backtest, portfolio, screener
+from backend.portfolio import ensure_materialized
+from backend import cluster, indicator_engine, live_bars, market_data, metrics, providers, universe, upstream
 
 import platform
 import sys
+from sqlalchemy import text
 
 app = FastAPI(title="Portfolio Suite API")
 
@@ -18,11 +21,23 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Link"],  # Keyset pagination of list endpoints
 )
 
+app.add_middleware(metrics.MetricsMiddleware)
+
 app.include_router(entries.router)
 app.include_router(trades.router)
 app.include_router(stocks.router)
+app.include_router(backtest.router)
+app.include_router(portfolio.router)
+app.include_router(screener.router)
+
+@app.exception_handler(upstream.UpstreamUnavailable)
+async def upstream_unavailable_handler(request: Request, exc: upstream.UpstreamUnavailable):
+    """Fail fast with 503 while the market data upstream is rate limiting or timing out"""
+    headers = {"Retry-After": str(int(exc.retry_after) + 1)} if exc.retry_after is not None else None
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers=headers)
 
 @app.get("/health")
 def health_check():
@@ -33,59 +48,106 @@ def health_check():
         "api_title": app.title
     }
 
-@app.on_event("startup")
-async def on_startup():
-    create_db_and_tables()
-    # Fetch S&P 500 list for local search and populate stocks router cache
+readiness = {"started": False}
+
+@app.get("/ready")
+def readiness_probe():
+    """
+    Readiness (unlike /health, which only says the process is up): startup
+    finished, the database answers and a full instrument universe is loaded.
+    503 until then, so load balancers hold traffic back. Serving only the
+    built-in KOSPI list (no snapshot, no seed) counts as not ready.
+    """
+    checks = {
+        "started": readiness["started"],
+        "database": False,
+        "universe": len(stocks.STOCKS_CACHE) > 0 and universe.state["source"] != "builtin",
+    }
     try:
-        async with httpx.AsyncClient() as client:
-            url = "https://gist.githubusercontent.com/princefishthrower/30ab8a532b4b281ce5bfe386e1df7a29/raw/sandp500.json"
-            response = await client.get(url)
-            if response.status_code == 200:
-                data = response.json()
-                sp500 = [
-                    {
-                        "symbol": item.get("symbol"),
-                        "name": item.get("name"),
-                        "exchange": "S&P 500",
-                        "type": "EQUITY"
-                    }
-                    for item in data.get("companies", [])
-                ]
-                stocks.STOCKS_CACHE.extend(sp500)
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+        checks["database"] = True
     except Exception as e:
-        print(f"Failed to load stocks cache: {e}")
-        
-    # Add KOSPI Top 10 to cache
-    kospi_top_10 = [
-        {"symbol": "005930.KS", "name": "Samsung Electronics (삼성전자)", "exchange": "KRX", "type": "EQUITY"},
-        {"symbol": "000660.KS", "name": "SK Hynix (SK하이닉스)", "exchange": "KRX", "type": "EQUITY"},
-        {"symbol": "373220.KS", "name": "LG Energy Solution (LG에너지솔루션)", "exchange": "KRX", "type": "EQUITY"},
-        {"symbol": "207940.KS", "name": "Samsung Biologics (삼성바이오로직스)", "exchange": "KRX", "type": "EQUITY"},
-        {"symbol": "005380.KS", "name": "Hyundai Motor (현대자동차)", "exchange": "KRX", "type": "EQUITY"},
-        {"symbol": "005935.KS", "name": "Samsung Electronics Pref (삼성전자우)", "exchange": "KRX", "type": "EQUITY"},
-        {"symbol": "000270.KS", "name": "Kia (기아)", "exchange": "KRX", "type": "EQUITY"},
-        {"symbol": "068270.KS", "name": "Celltrion (셀트리온)", "exchange": "KRX", "type": "EQUITY"},
-        {"symbol": "105560.KS", "name": "KB Financial Group (KB금융)", "exchange": "KRX", "type": "EQUITY"},
-        {"symbol": "005490.KS", "name": "POSCO Holdings (POSCO홀딩스)", "exchange": "KRX", "type": "EQUITY"},
-    ]
-    stocks.STOCKS_CACHE.extend(kospi_top_10)
-    print(f"Loaded {len(stocks.STOCKS_CACHE)} stocks into cache.")
-
-    # Start background tasks
-    asyncio.create_task(broadcast_market_updates())
+        print(f"⚠️ [Ready] Database check failed: {e}")
+    ready = all(checks.values())
+    body = {"ready": ready, "checks": checks, "universe": universe.stats(), "cluster_role": cluster.role}
+    return JSONResponse(body, status_code=200 if ready else 503)
+
+@app.on_event("startup")
+async def on_startup():
+    # Workers of a cluster start together; migrate and rebuild one at a time
+    async with cluster.async_job_lock("startup"):
+        create_db_and_tables()
+        await asyncio.to_thread(ensure_materialized)
+    # Search universe from the local snapshot (no network); refreshed in the background
+    stocks.set_instruments(universe.load())
+    print(f"Loaded {len(stocks.STOCKS_CACHE)} stocks into cache ({universe.state['source']}).")
+    asyncio.create_task(universe.keep_fresh(stocks.set_instruments))
+
+    # Start background tasks; in cluster mode only the elected leader polls and runs scheduled jobs
+    asyncio.create_task(cluster.run(start_leader_tasks))
+    readiness["started"] = True
+
+def start_leader_tasks():
+    if providers.PROVIDER_NAME == "replay" and providers.REPLAY_SPEED > 0:
+        asyncio.create_task(replay_market_feed())
+    else:
+        asyncio.create_task(broadcast_market_updates())
     asyncio.create_task(auto_record_daily_stats())
 
 @app.get("/")
 def read_root():
     return {"message": "Welcome to Portfolio Suite API"}
 
+@app.get("/upstream/stats")
+def upstream_stats():
+    """Active market data provider, upstream pool size, circuit breaker state and per-call-kind counters"""
+    return {"provider": providers.get_provider().name, **upstream.stats()}
+
+# Values kept by other modules, read when /metrics is scraped
+for field in ("hits", "misses", "coalesced", "evictions"):
+    metrics.collected(
+        f"cache_{field}_total", f"Market data cache {field}", "counter",
+        lambda field=field: {(name,): stats[field] for name, stats in market_data.cache_stats().items()}, ("cache",),
+    )
+metrics.collected(
+    "cache_entries", "Entries held per market data cache", "gauge",
+    lambda: {(name,): stats["size"] for name, stats in market_data.cache_stats().items()}, ("cache",),
+)
+metrics.collected(
+    "upstream_circuit_open", "1 while the upstream circuit breaker is open or probing", "gauge",
+    lambda: {(): 0 if upstream.breaker.state == "closed" else 1},
+)
+metrics.collected("ws_connections", "Active market feed WebSocket connections", "gauge", lambda: {(): len(manager.clients)})
+metrics.collected("ws_queued_messages", "Messages waiting in client outboxes", "gauge", lambda: {(): manager.stats()["queued_messages"]})
+metrics.collected("ws_dropped_messages_total", "Messages dropped for slow clients", "counter", lambda: {(): manager.dropped_messages})
+metrics.collected("ws_slow_disconnects_total", "Clients disconnected for being stuck", "counter", lambda: {(): manager.slow_disconnects})
+metrics.collected("cluster_leader", "1 on the worker running the market poller and scheduled jobs", "gauge", lambda: {(): int(cluster.role == "leader")})
+metrics.collected("live_bar_bytes", "Memory held by live intraday bar rings", "gauge", lambda: {(): live_bars.bars.stats()["bytes"]})
+metrics.collected("indicator_states", "Live indicator states held by the engine", "gauge", lambda: {(): len(indicator_engine.engine.states)})
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/cluster/stats")
+def cluster_stats():
+    """Worker role (leader or follower) and, on the leader, how many followers are connected"""
+    return cluster.stats()
+
+@app.get("/ws/stats")
+def websocket_stats():
+    """Connection count and outbound queue depth of the market feed, and the live bar buffers' footprint"""
+    return {**manager.stats(), "live_bars": live_bars.bars.stats()}
+
 @app.websocket("/ws/market")
 async def websocket_endpoint(websocket: WebSocket):
     await manager.connect(websocket)
     try:
         while True:
-            await websocket.receive_text()
+            message = await websocket.receive_text()
+            await manager.handle_message(websocket, message)
     except WebSocketDisconnect:
         manager.disconnect(websocket)
     except Exception as e:
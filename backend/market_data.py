@@ -0,0 +1,105 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+import pandas as pd
+
+from backend import candle_store, providers, upstream
+from backend.cache import TTLCache
+
+# Shared caches for every upstream read; see cache_stats() for hit rates
+quote_cache = TTLCache("quotes", ttl=4, maxsize=5000)
+history_cache = TTLCache("history", ttl=30, maxsize=512)
+
+QUOTE_FETCH_CONCURRENCY = 16
+
+
+def quote_fields(price: float, previous_close: Optional[float]) -> dict:
+    return {
+        "price": round(float(price), 2),
+        "change": round(float(price - previous_close), 2) if previous_close else 0,
+        "change_percent": round(float((price - previous_close) / previous_close * 100), 2) if previous_close else 0,
+    }
+
+
+def _fetch_quote(symbol: str) -> dict:
+    raw = providers.get_provider().quote(symbol)
+    return quote_fields(raw["price"], raw["previous_close"])
+
+
+async def _cached(cache: TTLCache, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    cache.aget_or_load, but while upstream is unavailable (rate limited,
+    circuit open or call timed out) fall back to the last value loaded for
+    key, however old.
+    """
+    try:
+        return await cache.aget_or_load(key, loader)
+    except Exception as e:
+        stale = cache.get_stale(key)
+        if stale is None or not (isinstance(e, upstream.UpstreamUnavailable) or upstream.is_rate_limit(e)):
+            raise
+        return stale
+
+
+async def get_quote(symbol: str) -> dict:
+    """Latest price/change for symbol: {"price", "change", "change_percent"}"""
+    return await _cached(quote_cache, symbol, lambda: upstream.run("quote", _fetch_quote, symbol))
+
+
+async def get_quotes(symbols: List[str]) -> Tuple[Dict[str, dict], Dict[str, Exception]]:
+    """Quotes for many symbols, fetched concurrently; returns (quotes, errors by symbol)"""
+    semaphore = asyncio.Semaphore(QUOTE_FETCH_CONCURRENCY)
+
+    async def load(symbol: str):
+        async with semaphore:
+            try:
+                return symbol, await get_quote(symbol), None
+            except Exception as e:
+                return symbol, None, e
+
+    quotes, errors = {}, {}
+    for symbol, quote, error in await asyncio.gather(*(load(symbol) for symbol in dict.fromkeys(symbols))):
+        if error is None:
+            quotes[symbol] = quote
+        else:
+            errors[symbol] = error
+    return quotes, errors
+
+
+async def get_history(symbol: str, period: str = "60d", interval: str = "1d") -> pd.DataFrame:
+    """
+    Candle-store history behind a short-lived in-memory cache. The frame is
+    shared between callers and must be treated as read-only.
+    """
+    return await _cached(
+        history_cache,
+        (symbol, period, interval),
+        lambda: upstream.run("store_history", candle_store.get_history, symbol, period=period, interval=interval, guarded=False),
+    )
+
+
+async def get_history_many(symbols: List[str], period: str = "60d", interval: str = "1d") -> Dict[str, pd.DataFrame]:
+    """
+    Bulk get_history. Symbols missing from the cache go to the candle store in
+    one call; symbols another caller is already loading wait for that load.
+    """
+    async def load(keys):
+        loaded = await upstream.run(
+            "store_history_bulk", candle_store.get_history_many, [symbol for symbol, _, _ in keys],
+            period=period, interval=interval, guarded=False,
+        )
+        return {(symbol, period, interval): hist for symbol, hist in loaded.items()}
+
+    keys = [(symbol, period, interval) for symbol in dict.fromkeys(symbols)]
+    values, errors = await history_cache.aget_or_load_many(keys, load)
+    for key, error in errors.items():
+        # Same fallback as get_history: stale frames while upstream is unavailable
+        stale = history_cache.get_stale(key)
+        if stale is None or not (isinstance(error, upstream.UpstreamUnavailable) or upstream.is_rate_limit(error)):
+            raise error
+        values[key] = stale
+    return {symbol: values[key] for symbol, key in zip(dict.fromkeys(symbols), keys)}
+
+
+def cache_stats() -> dict:
+    return {cache.name: cache.stats() for cache in (quote_cache, history_cache)}
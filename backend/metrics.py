@@ -0,0 +1,266 @@
+"""
+In-process metrics, served in the Prometheus text format at /metrics.
+
+Counters and histograms are updated on the hot paths (HTTP middleware,
+upstream calls, WebSocket fan-out, background tasks); values that already
+live elsewhere (cache hit counts, connection counts) are read at scrape time
+through registered callbacks.
+"""
+
+import bisect
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Per-request profiling (?profile=1 or X-Profile: 1) is off unless enabled; it needs pyinstrument
+PROFILE_REQUESTS = os.getenv("PROFILE_REQUESTS", "0").lower() in ("1", "true", "yes")
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()  # Updated from the event loop and the upstream pool alike
+
+    @abstractmethod
+    def samples(self) -> Iterator[str]:
+        """Exposition lines for every label set, without HELP/TYPE."""
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self.values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels[n]) for n in self.labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            items = sorted(self.values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        self.series: Dict[LabelValues, List[float]] = {}  # Per-bucket counts, then +Inf count and sum
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels[n]) for n in self.labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [0.0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self.series.items())
+        for key, series in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labels, key, le)} {_format_value(cumulative)}"
+            yield f"{self.name}_sum{_format_labels(self.labels, key)} {series[-1]!r}"
+            yield f"{self.name}_count{_format_labels(self.labels, key)} {_format_value(cumulative)}"
+
+
+class Collected(Metric):
+    """A gauge or counter whose values are read from `collect` at scrape time: {label values: value}."""
+
+    def __init__(self, name: str, help: str, kind: str, collect: Callable[[], Dict[LabelValues, float]], labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self.kind = kind
+        self.collect = collect
+
+    def samples(self) -> Iterator[str]:
+        for key, value in sorted(self.collect().items()):
+            yield f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+
+
+REGISTRY: List[Metric] = []
+
+
+def _register(metric: Metric) -> Metric:
+    REGISTRY.append(metric)
+    return metric
+
+
+def counter(name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+    return _register(Counter(name, help, labels))
+
+
+def gauge(name: str, help: str, labels: Sequence[str] = ()) -> Gauge:
+    return _register(Gauge(name, help, labels))
+
+
+def histogram(name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    return _register(Histogram(name, help, labels, buckets))
+
+
+def collected(name: str, help: str, kind: str, collect: Callable[[], Dict[LabelValues, float]], labels: Sequence[str] = ()) -> Collected:
+    return _register(Collected(name, help, kind, collect, labels))
+
+
+def render() -> str:
+    blocks = []
+    for metric in REGISTRY:
+        try:
+            blocks.append(metric.render())
+        except Exception as e:
+            # One broken collector must not take the whole scrape down
+            blocks.append(f"# {metric.name} unavailable: {e}")
+    return "\n".join(blocks) + "\n"
+
+
+# Metrics shared across modules
+http_requests = counter("http_requests_total", "HTTP requests by route template and status", ("method", "route", "status"))
+http_latency = histogram("http_request_duration_seconds", "HTTP request latency, until the last body chunk is sent", ("method", "route"))
+http_in_flight = gauge("http_requests_in_flight", "HTTP requests being served")
+upstream_calls = counter("upstream_calls_total", "Market data calls by kind (provider_* reach upstream, store_* are candle store reads) and outcome", ("kind", "outcome"))
+upstream_latency = histogram("upstream_call_duration_seconds", "Market data call latency by kind", ("kind",))
+ws_publish_latency = histogram("ws_publish_duration_seconds", "Time to fan one quote batch out to every client queue")
+ws_publish_recipients = counter("ws_publish_messages_total", "Market update messages queued for clients")
+market_poll_latency = histogram("market_poll_cycle_duration_seconds", "Duration of one quote poll + publish cycle")
+task_latency = histogram("background_task_duration_seconds", "Background task run times", ("task",))
+task_runs = counter("background_task_runs_total", "Background task runs by outcome", ("task", "outcome"))
+
+
+@contextmanager
+def track_task(task: str):
+    """Time one run of a background task and count its outcome."""
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        task_latency.observe(time.perf_counter() - started, task=task)
+        task_runs.inc(task=task, outcome=outcome)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording per-route request counts and latency. Routes are
+    labelled by their path template (/stocks/candles/{symbol}), never the raw
+    path, so label cardinality stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        if PROFILE_REQUESTS and _wants_profile(scope):
+            return await _profile(self.app, scope, receive, send)
+
+        started = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        http_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_in_flight.dec()
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "")
+            http_requests.inc(method=method, route=path, status=status["code"])
+            http_latency.observe(time.perf_counter() - started, method=method, route=path)
+
+
+def _wants_profile(scope) -> bool:
+    query = scope.get("query_string", b"").decode()
+    if any(part in ("profile=1", "profile=true", "profile=text") for part in query.split("&")):
+        return True
+    return any(name == b"x-profile" and value in (b"1", b"true") for name, value in scope.get("headers", []))
+
+
+async def _profile(app, scope, receive, send):
+    """Run the request under the pyinstrument sampling profiler and answer with the profile instead."""
+    text = "profile=text" in scope.get("query_string", b"").decode()
+    try:
+        from pyinstrument import Profiler
+    except ImportError:
+        body, content_type, status = b"Request profiling requires pyinstrument on the server", b"text/plain", 501
+    else:
+        async def discard(message):
+            pass
+
+        profiler = Profiler(async_mode="enabled")
+        profiler.start()
+        try:
+            await app(scope, receive, discard)
+        finally:
+            profiler.stop()
+        if text:
+            body, content_type = profiler.output_text(unicode=True).encode(), b"text/plain; charset=utf-8"
+        else:
+            body, content_type = profiler.output_html().encode(), b"text/html; charset=utf-8"
+        status = 200
+    await send({"type": "http.response.start", "status": status, "headers": [(b"content-type", content_type)]})
+    await send({"type": "http.response.body", "body": body})
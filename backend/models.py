@@ -1,9 +1,13 @@
 from typing import Optional
+from sqlalchemy import Index
 from sqlmodel import Field, SQLModel
 
 from datetime import datetime
 
 class DiaryEntry(SQLModel, table=True):
+    # Keyset pagination walks (created_at, id)
+    __table_args__ = (Index("ix_diaryentry_created_at_id", "created_at", "id"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     title: str = Field(index=True)
     content: str
@@ -11,9 +15,14 @@ class DiaryEntry(SQLModel, table=True):
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 class Trade(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_trade_trade_date_id", "trade_date", "id"),
+        Index("ix_trade_market_trade_date_id", "market", "trade_date", "id"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     stock_name: str = Field(index=True)
-    type: str  # Buy or Sell
+    type: str  # Buy or Sell (case-insensitive; anything else is rejected)
     price: float
     quantity: int
     market: str = Field(default="US", index=True) # "US" or "KR"
@@ -22,6 +31,9 @@ class Trade(SQLModel, table=True):
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 class StockDailyStat(SQLModel, table=True):
+    # One row per symbol per day; also serves the per-symbol date-ordered history scan
+    __table_args__ = (Index("ux_stockdailystat_symbol_date", "symbol", "date", unique=True),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     symbol: str = Field(index=True)
     date: datetime = Field(default_factory=datetime.utcnow)
@@ -33,3 +45,102 @@ class StockDailyStat(SQLModel, table=True):
     high: float
     low: float
     recorded_at: datetime = Field(default_factory=datetime.utcnow)
+
+class CandleBar(SQLModel, table=True):
+    symbol: str = Field(primary_key=True)
+    interval: str = Field(primary_key=True)
+    ts: int = Field(primary_key=True)  # Bar open time, UTC epoch seconds
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: int
+
+class CandleSeries(SQLModel, table=True):
+    symbol: str = Field(primary_key=True)
+    interval: str = Field(primary_key=True)
+    tz: str = "UTC"  # Exchange timezone reported by upstream
+    covered_from: Optional[int] = None  # Earliest window fetched in full (None = max)
+    last_ts: int
+    refreshed_at: datetime = Field(default_factory=datetime.utcnow)
+
+class Position(SQLModel, table=True):
+    """Materialized per-symbol aggregates, maintained by backend/portfolio.py on every trade write."""
+    symbol: str = Field(primary_key=True)
+    market: str = Field(primary_key=True)
+    quantity: int = 0  # Open quantity: the shares left in open lots (never negative)
+    cost_basis: float = 0.0  # Cost of the open FIFO lots
+    realized_pnl: float = 0.0
+    buy_quantity: int = 0
+    buy_cost: float = 0.0
+    sell_quantity: int = 0
+    sell_proceeds: float = 0.0
+    trade_count: int = 0
+    last_trade_date: Optional[datetime] = None
+    last_trade_id: Optional[int] = None
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class PositionLot(SQLModel, table=True):
+    """One buy trade's shares, consumed first-in first-out by later sells."""
+    __table_args__ = (Index("ix_positionlot_symbol_market_open", "symbol", "market", "opened_at", "trade_id"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    trade_id: int = Field(index=True)
+    symbol: str
+    market: str
+    opened_at: datetime
+    price: float
+    quantity: int
+    remaining: int
+
+class LotClose(SQLModel, table=True):
+    """Quantity a sell trade took from a lot (lot_id None for quantity sold beyond holdings)."""
+    __table_args__ = (Index("ix_lotclose_symbol_market", "symbol", "market"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    sell_trade_id: int = Field(index=True)
+    symbol: str
+    market: str
+    lot_id: Optional[int] = Field(default=None, index=True)
+    quantity: int
+    buy_price: Optional[float] = None
+    sell_price: float
+    realized_pnl: float = 0.0
+
+class ScreenerRun(SQLModel, table=True):
+    """One universe-wide screener pass (backend/screener.py)."""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    interval: str = "1d"
+    status: str = "running"  # running, finished or failed
+    symbols: int = 0  # Universe size
+    screened: int = 0  # Symbols with enough history for a signal
+    failed: int = 0
+    error: Optional[str] = None
+    started_at: datetime = Field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
+    seconds: Optional[float] = None
+
+class ScreenerResult(SQLModel, table=True):
+    """Latest-bar AntiGravity signal for one symbol in a screener run."""
+    __table_args__ = (Index("ix_screenerresult_run_signal", "run_id", "signal"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    run_id: int = Field(index=True)
+    symbol: str
+    market: str  # "US" or "KRX"
+    as_of: datetime  # Date of the bar the signal was computed on
+    price: float
+    atr: float
+    signal: str  # STRONG_BUY, STRONG_SELL, EXIT_LONG, EXIT_SHORT or HOLD (for a flat position)
+    strength: float  # Distance of the close from the SMA20 centerline, in ATRs (signed)
+    regime: str
+    regime_confidence: float
+    market_bias: str  # BULLISH, BEARISH or NEUTRAL
+    volume_status: str  # ACCUMULATION or DIVERGENCE
+    risk_heat: str  # LOW, NORMAL or HIGH
+    position_size: float  # 1%-risk recommended weight; risk_heat is bucketed from it
+    risk_reward: float
+    entry_long: float
+    entry_short: float
+    stop_loss: float
+    chandelier_stop: float
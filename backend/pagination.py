@@ -0,0 +1,83 @@
+import base64
+import json
+from datetime import datetime, timezone
+from typing import Any, List, Optional, Tuple
+
+from fastapi import HTTPException, Request, Response
+from sqlalchemy import tuple_
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+# Response headers carrying the next page; list bodies stay plain JSON arrays
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Timestamps are stored as naive UTC; align aware query parameters with them."""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def date_range(query, column, start: Optional[datetime] = None, end: Optional[datetime] = None):
+    """Bound query to start <= column <= end (both inclusive), as the list and export endpoints do."""
+    start, end = _naive_utc(start), _naive_utc(end)
+    if start is not None:
+        query = query.where(column >= start)
+    if end is not None:
+        query = query.where(column <= end)
+    return query
+
+
+def encode_cursor(key: datetime, id: int) -> str:
+    raw = json.dumps([key.isoformat(), id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        key, id = json.loads(raw)
+        return datetime.fromisoformat(key), int(id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset(
+    query,
+    sort_column,
+    id_column,
+    limit: int,
+    cursor: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    descending: bool = False,
+):
+    """
+    Restrict query to one page ordered by (sort_column, id_column), resuming
+    after cursor. Fetches limit + 1 rows so next_page can tell whether more exist.
+    start/end bound sort_column, both inclusive (see date_range).
+    """
+    query = date_range(query, sort_column, start, end)
+    if cursor:
+        key, last_id = decode_cursor(cursor)
+        position = tuple_(sort_column, id_column)
+        query = query.where(position < tuple_(key, last_id) if descending else position > tuple_(key, last_id))
+    if descending:
+        query = query.order_by(sort_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(sort_column.asc(), id_column.asc())
+    return query.limit(limit + 1)
+
+
+def next_page(rows: List[Any], limit: int, sort_field: str, request: Request, response: Response) -> List[Any]:
+    """Trim the probe row and, if there is a next page, advertise its cursor in the headers."""
+    if len(rows) <= limit:
+        return rows
+    rows = rows[:limit]
+    last = rows[-1]
+    cursor = encode_cursor(getattr(last, sort_field), last.id)
+    response.headers[NEXT_CURSOR_HEADER] = cursor
+    response.headers["Link"] = f'<{request.url.include_query_params(cursor=cursor)}>; rel="next"'
+    return rows
@@ -0,0 +1,405 @@
+"""
+Portfolio engine: per-symbol FIFO lots and P&L aggregates (Position,
+PositionLot, LotClose) maintained incrementally inside the same transaction
+as each trade write. Trades arriving in chronological order (the normal case)
+touch only their own position's open lots; a backdated insert or a delete
+that isn't the symbol's latest trade replays just that one symbol.
+
+Short positions aren't modelled: a position's quantity is always the sum of
+its open lots. A trade write that would sell more than is held is rejected
+(OversellError); trades already stored that do (older data, bulk imports)
+keep the excess as an unmatched LotClose and leave the position flat.
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, func, insert
+from sqlmodel import Session, select
+
+from backend.database import engine
+from backend.models import LotClose, Position, PositionLot, Trade
+
+
+TRADE_TYPES = ("buy", "sell")
+TRADE_MARKETS = ("US", "KR")
+
+
+def market_for(stock_name: str) -> str:
+    """Trade.market code for a symbol: "KR" for KOSPI/KOSDAQ listings, else "US"."""
+    return "KR" if stock_name.endswith((".KS", ".KQ")) else "US"
+
+
+class OversellError(ValueError):
+    """A sell for more shares than the position holds at that point."""
+
+
+def trade_side(type: str) -> str:
+    """Normalized trade type ("buy" or "sell"); ValueError for anything else."""
+    side = type.strip().lower() if isinstance(type, str) else None
+    if side not in TRADE_TYPES:
+        raise ValueError(f"Trade type must be Buy or Sell, got {type!r}")
+    return side
+
+
+def _is_buy(trade: Trade) -> bool:
+    return trade_side(trade.type) == "buy"
+
+
+def _order_key(trade: Trade) -> Tuple[datetime, int]:
+    return trade.trade_date, trade.id
+
+
+def _is_latest(position: Position, trade: Trade) -> bool:
+    return position.last_trade_date is None or _order_key(trade) >= (position.last_trade_date, position.last_trade_id)
+
+
+def _open_lots(session: Session, symbol: str, market: str) -> List[PositionLot]:
+    return session.exec(
+        select(PositionLot)
+        .where(PositionLot.symbol == symbol, PositionLot.market == market, PositionLot.remaining > 0)
+        .order_by(PositionLot.opened_at, PositionLot.trade_id)
+    ).all()
+
+
+class _SessionBook:
+    """Books an incremental write through the ORM session."""
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    def open_lot(self, **fields) -> PositionLot:
+        lot = PositionLot(**fields)
+        self.session.add(lot)
+        self.session.flush()  # Later sells need lot.id
+        return lot
+
+    def close(self, **fields):
+        self.session.add(LotClose(**fields))
+
+    def touch(self, row):
+        self.session.add(row)
+
+
+class _Row:
+    """Attribute bag standing in for a Position or PositionLot during a replay, without per-change ORM bookkeeping."""
+
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+
+class _ReplayBook:
+    """Collects a replay's positions, lots and closes in memory and writes each table with one bulk insert."""
+
+    def __init__(self, session: Session):
+        self.session = session
+        self.positions: List[_Row] = []
+        self.lots: List[_Row] = []
+        self.closes: List[dict] = []
+
+    def new_position(self, symbol: str, market: str) -> _Row:
+        position = _Row(**Position(symbol=symbol, market=market).model_dump())
+        self.positions.append(position)
+        return position
+
+    def open_lot(self, **fields) -> _Row:
+        # Until write() a lot's id is its index in self.lots; the database assigns the real one
+        lot = _Row(id=len(self.lots), **fields)
+        self.lots.append(lot)
+        return lot
+
+    def close(self, **fields):
+        self.closes.append({"lot_id": None, "buy_price": None, "realized_pnl": 0.0, **fields})
+
+    def touch(self, row):
+        pass
+
+    def write(self):
+        if self.positions:
+            self.session.execute(insert(Position), [vars(p) for p in self.positions])
+        if self.lots:
+            # Ids come from the database (RETURNING, in parameter order), so sequences stay in step
+            rows = [{k: v for k, v in vars(lot).items() if k != "id"} for lot in self.lots]
+            stmt = insert(PositionLot).returning(PositionLot.id, sort_by_parameter_order=True)
+            lot_ids = self.session.execute(stmt, rows).scalars().all()
+            for close in self.closes:
+                if close["lot_id"] is not None:
+                    close["lot_id"] = lot_ids[close["lot_id"]]
+        if self.closes:
+            self.session.execute(insert(LotClose), self.closes)
+
+
+def _apply(book, position, trade, open_lots: list, strict_from: Optional[Tuple[datetime, int]] = None) -> int:
+    """
+    Book one trade onto position; open_lots is the FIFO queue of lots with
+    shares left. Returns the shares sold beyond holdings, which raise
+    OversellError instead for trades ordered at or after strict_from.
+    """
+    quantity, price = trade.quantity, trade.price
+    left = 0
+    if _is_buy(trade):
+        lot = book.open_lot(
+            trade_id=trade.id, symbol=position.symbol, market=position.market,
+            opened_at=trade.trade_date, price=price, quantity=quantity, remaining=quantity,
+        )
+        open_lots.append(lot)
+        position.quantity += quantity
+        position.cost_basis += price * quantity
+        position.buy_quantity += quantity
+        position.buy_cost += price * quantity
+    else:
+        left = quantity
+        while left > 0 and open_lots:
+            lot = open_lots[0]
+            take = min(left, lot.remaining)
+            pnl = (price - lot.price) * take
+            lot.remaining -= take
+            book.touch(lot)
+            book.close(
+                sell_trade_id=trade.id, symbol=position.symbol, market=position.market, lot_id=lot.id,
+                quantity=take, buy_price=lot.price, sell_price=price, realized_pnl=pnl,
+            )
+            position.cost_basis -= lot.price * take
+            position.realized_pnl += pnl
+            left -= take
+            if lot.remaining == 0:
+                open_lots.pop(0)
+        if left > 0:
+            if strict_from is not None and _order_key(trade) >= strict_from:
+                raise OversellError(
+                    f"Selling {quantity} {position.symbol} on {trade.trade_date:%Y-%m-%d} exceeds the "
+                    f"{quantity - left} shares held"
+                )
+            # Sold more than held: kept for the record, no cost to realize against
+            book.close(
+                sell_trade_id=trade.id, symbol=position.symbol, market=position.market,
+                quantity=left, sell_price=price,
+            )
+        position.quantity -= quantity - left
+        position.sell_quantity += quantity
+        position.sell_proceeds += price * quantity
+    position.trade_count += 1
+    position.last_trade_date, position.last_trade_id = _order_key(trade)
+    position.updated_at = datetime.utcnow()
+    book.touch(position)
+    return left
+
+
+def _reset(session: Session, symbol: Optional[str] = None, market: Optional[str] = None):
+    for model in (LotClose, PositionLot, Position):
+        stmt = delete(model)
+        if symbol is not None:
+            stmt = stmt.where(model.symbol == symbol, model.market == market)
+        session.execute(stmt)
+
+
+# Replays read plain rows: only the columns _apply needs, no ORM objects
+_TRADE_COLUMNS = (Trade.id, Trade.stock_name, Trade.market, Trade.type, Trade.price, Trade.quantity, Trade.trade_date)
+# Rows with any other type (written before types were validated) are left out of positions
+_VALID_TYPE = func.lower(func.trim(Trade.type)).in_(TRADE_TYPES)
+
+
+def rebuild_symbol(session: Session, symbol: str, market: str, strict_from: Optional[Tuple[datetime, int]] = None) -> int:
+    """
+    Replay one position from its trades (used for out-of-order writes).
+    Returns the shares sold beyond holdings; with strict_from, such a sell
+    at or after that (trade_date, id) raises OversellError instead.
+    """
+    _reset(session, symbol, market)
+    trades = session.execute(
+        select(*_TRADE_COLUMNS)
+        .where(Trade.stock_name == symbol, Trade.market == market, _VALID_TYPE)
+        .order_by(Trade.trade_date, Trade.id)
+    ).all()
+    if not trades:
+        return 0
+    book = _ReplayBook(session)
+    position = book.new_position(symbol, market)
+    open_lots: list = []
+    unmatched = 0
+    for trade in trades:
+        unmatched += _apply(book, position, trade, open_lots, strict_from)
+    book.write()
+    return unmatched
+
+
+def rebuild_all(session: Session) -> int:
+    """Replay every trade; returns the number of positions built."""
+    _reset(session)
+    book = _ReplayBook(session)
+    positions: Dict[Tuple[str, str], Tuple[_Row, list]] = {}
+    for trade in session.execute(select(*_TRADE_COLUMNS).where(_VALID_TYPE).order_by(Trade.trade_date, Trade.id)).all():
+        key = (trade.stock_name, trade.market)
+        if key not in positions:
+            positions[key] = (book.new_position(trade.stock_name, trade.market), [])
+        position, open_lots = positions[key]
+        _apply(book, position, trade, open_lots)
+    book.write()
+    return len(positions)
+
+
+def apply_trade(session: Session, trade: Trade):
+    """
+    Book a newly inserted (flushed) trade; the caller commits. Raises
+    ValueError for an unknown type and OversellError if this trade (or, when
+    backdated, a later sell) would sell more than is held.
+    """
+    is_buy = _is_buy(trade)
+    position = session.get(Position, (trade.stock_name, trade.market))
+    if position is None:
+        position = Position(symbol=trade.stock_name, market=trade.market)
+    if not _is_latest(position, trade):
+        rebuild_symbol(session, trade.stock_name, trade.market, strict_from=_order_key(trade))
+        return
+    open_lots = [] if is_buy else _open_lots(session, trade.stock_name, trade.market)
+    _apply(_SessionBook(session), position, trade, open_lots, strict_from=_order_key(trade))
+
+
+def remove_trade(session: Session, trade: Trade):
+    """
+    Unbook a trade that was just deleted (and flushed); the caller commits.
+    Raises OversellError if a later sell depended on the deleted buy.
+    """
+    try:
+        is_buy = _is_buy(trade)
+    except ValueError:
+        return  # Never booked
+    position = session.get(Position, (trade.stock_name, trade.market))
+    if position is None or _order_key(trade) != (position.last_trade_date, position.last_trade_id):
+        rebuild_symbol(session, trade.stock_name, trade.market, strict_from=_order_key(trade))
+        return
+
+    quantity, price = trade.quantity, trade.price
+    if is_buy:
+        # Latest trade, so nothing has sold out of this lot yet
+        session.execute(delete(PositionLot).where(PositionLot.trade_id == trade.id))
+        position.quantity -= quantity
+        position.cost_basis -= price * quantity
+        position.buy_quantity -= quantity
+        position.buy_cost -= price * quantity
+    else:
+        for close in session.exec(select(LotClose).where(LotClose.sell_trade_id == trade.id)).all():
+            if close.lot_id is not None:
+                lot = session.get(PositionLot, close.lot_id)
+                lot.remaining += close.quantity
+                session.add(lot)
+                position.cost_basis += close.buy_price * close.quantity
+                position.realized_pnl -= close.realized_pnl
+                position.quantity += close.quantity  # Unmatched shares never left the position
+            session.delete(close)
+        position.sell_quantity -= quantity
+        position.sell_proceeds -= price * quantity
+    position.trade_count -= 1
+    if position.trade_count == 0:
+        session.delete(position)
+        return
+
+    previous = session.exec(
+        select(Trade.trade_date, Trade.id)
+        .where(Trade.stock_name == trade.stock_name, Trade.market == trade.market)
+        .order_by(Trade.trade_date.desc(), Trade.id.desc())
+    ).first()
+    position.last_trade_date, position.last_trade_id = previous
+    position.updated_at = datetime.utcnow()
+    session.add(position)
+
+
+def ensure_materialized():
+    """
+    Rebuild the aggregates if they don't account for every trade, or were
+    built by older versions (which let oversold positions go negative).
+    """
+    with Session(engine) as session:
+        trades = session.exec(select(func.count()).select_from(Trade).where(_VALID_TYPE)).one()
+        booked = session.exec(select(func.coalesce(func.sum(Position.trade_count), 0))).one()
+        negative = session.exec(select(func.count()).select_from(Position).where(Position.quantity < 0)).one()
+        if trades != booked or negative:
+            count = rebuild_all(session)
+            session.commit()
+            print(f"✅ [Portfolio] Rebuilt {count} positions from {trades} trades")
+
+
+def load_positions(market: Optional[str] = None, include_closed: bool = False, include_lots: bool = False) -> List[dict]:
+    with Session(engine) as session:
+        query = select(Position).order_by(Position.market, Position.symbol)
+        if market:
+            query = query.where(Position.market == market)
+        if not include_closed:
+            query = query.where(Position.quantity != 0)
+        positions = session.exec(query).all()
+
+        lots: Dict[Tuple[str, str], List[dict]] = {}
+        if include_lots and positions:
+            lot_query = select(PositionLot).where(PositionLot.remaining > 0).order_by(PositionLot.opened_at, PositionLot.trade_id)
+            if market:
+                lot_query = lot_query.where(PositionLot.market == market)
+            for lot in session.exec(lot_query):
+                lots.setdefault((lot.symbol, lot.market), []).append({
+                    "trade_id": lot.trade_id, "opened_at": lot.opened_at,
+                    "price": lot.price, "quantity": lot.quantity, "remaining": lot.remaining,
+                })
+
+    result = []
+    for p in positions:
+        item = {
+            "symbol": p.symbol,
+            "market": p.market,
+            "quantity": p.quantity,
+            "avg_cost": round(p.cost_basis / p.quantity, 4) if p.quantity > 0 else 0.0,
+            "cost_basis": round(p.cost_basis, 2),
+            "realized_pnl": round(p.realized_pnl, 2),
+            "buy_cost": round(p.buy_cost, 2),
+            "sell_proceeds": round(p.sell_proceeds, 2),
+            "trade_count": p.trade_count,
+            "last_trade_date": p.last_trade_date,
+        }
+        if include_lots:
+            item["lots"] = lots.get((p.symbol, p.market), [])
+        result.append(item)
+    return result
+
+
+def with_quote(position: dict, quote: Optional[dict]) -> dict:
+    """Add live price, market value and unrealized P&L (None while the symbol has no quote)."""
+    price = quote["price"] if quote else None
+    if price is None or position["quantity"] <= 0:
+        unrealized = 0.0 if position["quantity"] == 0 else None
+        return {**position, "price": price, "market_value": None, "unrealized_pnl": unrealized, "unrealized_pct": None}
+    market_value = price * position["quantity"]
+    unrealized = market_value - position["cost_basis"]
+    return {
+        **position,
+        "price": price,
+        "market_value": round(market_value, 2),
+        "unrealized_pnl": round(unrealized, 2),
+        "unrealized_pct": round(unrealized / position["cost_basis"] * 100, 2) if position["cost_basis"] else None,
+    }
+
+
+def summarize(positions: List[dict]) -> Dict[str, dict]:
+    """P&L totals per market (amounts stay in each market's own currency, so markets aren't summed)."""
+    markets: Dict[str, dict] = {}
+    for p in positions:
+        m = markets.setdefault(p["market"], {
+            "buy_cost": 0.0, "sell_proceeds": 0.0, "cost_basis": 0.0, "market_value": 0.0,
+            "realized_pnl": 0.0, "unrealized_pnl": 0.0, "open_positions": 0, "unpriced": [],
+        })
+        m["buy_cost"] += p["buy_cost"]
+        m["sell_proceeds"] += p["sell_proceeds"]
+        m["realized_pnl"] += p["realized_pnl"]
+        if p["quantity"] > 0:
+            m["open_positions"] += 1
+            m["cost_basis"] += p["cost_basis"]
+            if p["unrealized_pnl"] is None:
+                m["unpriced"].append(p["symbol"])
+            else:
+                m["market_value"] += p["market_value"]
+                m["unrealized_pnl"] += p["unrealized_pnl"]
+    for m in markets.values():
+        m["turnover"] = m["buy_cost"] + m["sell_proceeds"]
+        m["net_pnl"] = m["realized_pnl"] + m["unrealized_pnl"]
+        m["roi"] = m["net_pnl"] / m["buy_cost"] * 100 if m["buy_cost"] > 0 else 0.0
+        for key, value in m.items():
+            if isinstance(value, float):
+                m[key] = round(value, 2)
+    return markets
@@ -0,0 +1,350 @@
+"""
+Market data providers. Every upstream read (quotes, history, bulk history,
+exchange timezone) goes through the active provider:
+
+  MARKET_DATA_PROVIDER=yfinance  live Yahoo Finance (default)
+  MARKET_DATA_PROVIDER=replay    serve responses recorded under MARKET_DATA_REPLAY_DIR
+  MARKET_DATA_RECORD_DIR=...     with yfinance, also capture every response there
+
+A replay run can also stream its recorded quotes into the WebSocket feed at
+MARKET_DATA_REPLAY_SPEED times real time (see tasks.replay_market_feed).
+Replayed bars still pass through the candle store, so point DATABASE_URL at
+a scratch database when replaying.
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional
+from urllib.parse import quote as _quote_path, unquote
+
+import numpy as np
+import pandas as pd
+
+OHLCV_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+PROVIDER_NAME = os.getenv("MARKET_DATA_PROVIDER", "yfinance").lower()
+RECORD_DIR = os.getenv("MARKET_DATA_RECORD_DIR", "")
+REPLAY_DIR = os.getenv("MARKET_DATA_REPLAY_DIR", "market_data_recording")
+REPLAY_SPEED = float(os.getenv("MARKET_DATA_REPLAY_SPEED", "0"))  # 0 = no tick stream, quotes stay put
+REPLAY_LOOP = os.getenv("MARKET_DATA_REPLAY_LOOP", "1").lower() in ("1", "true", "yes")
+REPLAY_MAX_SLEEP = 5.0  # Longest real-time pause between ticks (skips nights and weekends)
+
+
+class MarketDataProvider(ABC):
+    """
+    What the backend needs from a market data source. Calls block; they run on
+    the upstream pool. quote and history are required; the rest have defaults.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def quote(self, symbol: str) -> dict:
+        """{"price", "previous_close"} (previous_close may be None); LookupError if unknown."""
+
+    @abstractmethod
+    def history(self, symbol: str, interval: str, period: Optional[str] = None, start=None) -> pd.DataFrame:
+        """OHLCV bars on a tz-aware index, for a yfinance period or from start; empty frame if none."""
+
+    def history_many(self, symbols: List[str], interval: str, period: Optional[str] = None, start=None) -> Dict[str, pd.DataFrame]:
+        """history for several symbols in one request; symbols without data may be left out."""
+        return {symbol: self.history(symbol, interval, period=period, start=start) for symbol in symbols}
+
+    def timezone(self, symbol: str) -> Optional[str]:
+        """Exchange timezone name, if known."""
+        return None
+
+
+class YFinanceProvider(MarketDataProvider):
+    name = "yfinance"
+
+    def __init__(self):
+        import yfinance as yf
+        self.yf = yf
+
+    def quote(self, symbol: str) -> dict:
+        ticker = self.yf.Ticker(symbol)
+        info = ticker.fast_info
+        price = info.get('lastPrice')
+        previous_close = info.get('previousClose')
+        if price is None:
+            hist = ticker.history(period="1d")
+            if hist.empty:
+                raise LookupError(f"Price not found for {symbol}")
+            price = hist['Close'].iloc[-1]
+        return {"price": float(price), "previous_close": float(previous_close) if previous_close else None}
+
+    def history(self, symbol: str, interval: str, period: Optional[str] = None, start=None) -> pd.DataFrame:
+        ticker = self.yf.Ticker(symbol)
+        if start is not None:
+            return ticker.history(start=start, interval=interval)
+        return ticker.history(period=period, interval=interval)
+
+    def history_many(self, symbols: List[str], interval: str, period: Optional[str] = None, start=None) -> Dict[str, pd.DataFrame]:
+        """One bulk download, split back into per-symbol frames."""
+        data = self.yf.download(
+            symbols, period=None if start is not None else period, start=start, interval=interval,
+            group_by="ticker", auto_adjust=True, ignore_tz=False, progress=False, threads=True,
+        )
+        frames = {}
+        if data is None or data.empty:
+            return frames
+        for symbol in symbols:
+            if isinstance(data.columns, pd.MultiIndex):
+                if symbol not in data.columns.get_level_values(0):
+                    continue
+                hist = data[symbol]
+            else:
+                hist = data
+            # Mixed exchanges share one index; rows from other calendars are all-NaN here
+            frames[symbol] = hist.dropna(how="all")
+        return frames
+
+    def timezone(self, symbol: str) -> Optional[str]:
+        return self.yf.Ticker(symbol).fast_info["timezone"]
+
+
+# On-disk recording layout (plain JSON, so recordings can be diffed and shipped to air-gapped boxes):
+#   quotes.jsonl                  one {"t", "symbol", "price", "previous_close"} per line
+#   history/<symbol>@<interval>.json  {"symbol", "interval", "tz", "ts": [...], "open": [...], ...}
+#   timezones.json                {symbol: tz}
+
+def _history_path(directory: Path, symbol: str, interval: str) -> Path:
+    return directory / "history" / f"{_quote_path(symbol, safe='')}@{interval}.json"
+
+
+def _frame_to_record(symbol: str, interval: str, hist: pd.DataFrame) -> dict:
+    tz = str(hist.index.tz) if hist.index.tz is not None else "UTC"
+    index = hist.index if hist.index.tz is not None else hist.index.tz_localize("UTC")
+    record = {
+        "symbol": symbol, "interval": interval, "tz": tz,
+        "ts": ((index - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1)).tolist(),
+    }
+    for col in OHLCV_COLUMNS:
+        values = hist[col].to_numpy(dtype=float) if col in hist else np.full(len(hist), np.nan)
+        record[col.lower()] = [None if np.isnan(v) else v for v in values.tolist()]
+    return record
+
+
+def _record_to_frame(record: dict) -> pd.DataFrame:
+    index = pd.to_datetime(record["ts"], unit="s", utc=True).tz_convert(record["tz"])
+    return pd.DataFrame(
+        {col: np.array([np.nan if v is None else v for v in record[col.lower()]], dtype=float) for col in OHLCV_COLUMNS},
+        index=index,
+    )
+
+
+class RecordingProvider(MarketDataProvider):
+    """Pass-through to another provider that also saves every response under directory."""
+
+    name = "recording"
+
+    def __init__(self, inner: MarketDataProvider, directory: str):
+        self.inner = inner
+        self.directory = Path(directory)
+        (self.directory / "history").mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()  # Writers run concurrently on the upstream pool
+
+    def _save_history(self, symbol: str, interval: str, hist: pd.DataFrame):
+        if hist is None or hist.empty:
+            return
+        path = _history_path(self.directory, symbol, interval)
+        with self._lock:
+            if path.exists():
+                # Merge with what was recorded before; fresher bars win
+                stored = _record_to_frame(json.loads(path.read_text()))
+                tz = hist.index.tz if str(hist.index.tz) != "UTC" else stored.index.tz  # Prefer the exchange tz
+                hist = pd.concat([stored.tz_convert(tz), hist[OHLCV_COLUMNS].tz_convert(tz)])
+                hist = hist[~hist.index.duplicated(keep="last")].sort_index()
+            path.write_text(json.dumps(_frame_to_record(symbol, interval, hist)))
+
+    def quote(self, symbol: str) -> dict:
+        result = self.inner.quote(symbol)
+        line = json.dumps({"t": time.time(), "symbol": symbol, **result})
+        with self._lock:
+            with open(self.directory / "quotes.jsonl", "a") as f:
+                f.write(line + "\n")
+        return result
+
+    def history(self, symbol: str, interval: str, period: Optional[str] = None, start=None) -> pd.DataFrame:
+        hist = self.inner.history(symbol, interval, period=period, start=start)
+        self._save_history(symbol, interval, hist)
+        return hist
+
+    def history_many(self, symbols: List[str], interval: str, period: Optional[str] = None, start=None) -> Dict[str, pd.DataFrame]:
+        frames = self.inner.history_many(symbols, interval, period=period, start=start)
+        for symbol, hist in frames.items():
+            self._save_history(symbol, interval, hist)
+        return frames
+
+    def timezone(self, symbol: str) -> Optional[str]:
+        tz = self.inner.timezone(symbol)
+        if tz:
+            path = self.directory / "timezones.json"
+            with self._lock:
+                known = json.loads(path.read_text()) if path.exists() else {}
+                if known.get(symbol) != tz:
+                    known[symbol] = tz
+                    path.write_text(json.dumps(known, indent=1, sort_keys=True))
+        return tz
+
+
+class ReplayProvider(MarketDataProvider):
+    """
+    Serves a recording made by RecordingProvider, without network access.
+    History requests get every recorded bar (from start, for tail refreshes);
+    quotes are the latest replayed tick, else the last recorded quote, else
+    the last recorded daily close.
+    """
+
+    name = "replay"
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        if not self.directory.is_dir():
+            raise FileNotFoundError(f"No market data recording at {self.directory}")
+        self._frames: Dict[tuple, pd.DataFrame] = {}
+        self._lock = threading.Lock()
+        self.live: Dict[str, dict] = {}  # Set by ticks() as the replay clock advances
+        self.recorded_quotes = self._load_quotes()
+        path = self.directory / "timezones.json"
+        self.timezones: Dict[str, str] = json.loads(path.read_text()) if path.exists() else {}
+
+    def _load_quotes(self) -> pd.DataFrame:
+        path = self.directory / "quotes.jsonl"
+        if not path.exists():
+            return pd.DataFrame(columns=["t", "symbol", "price", "previous_close"])
+        with open(path) as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+        return pd.DataFrame(rows, columns=["t", "symbol", "price", "previous_close"]).sort_values("t", kind="stable")
+
+    def _frame(self, symbol: str, interval: str) -> Optional[pd.DataFrame]:
+        key = (symbol, interval)
+        with self._lock:
+            if key not in self._frames:
+                path = _history_path(self.directory, symbol, interval)
+                self._frames[key] = _record_to_frame(json.loads(path.read_text())) if path.exists() else None
+            return self._frames[key]
+
+    def symbols(self, interval: Optional[str] = None) -> List[str]:
+        """Symbols with recorded history (optionally for one interval)."""
+        found = set()
+        for path in (self.directory / "history").glob("*.json"):
+            name, _, recorded_interval = path.stem.rpartition("@")
+            if interval is None or recorded_interval == interval:
+                found.add(unquote(name))
+        return sorted(found)
+
+    def quote(self, symbol: str) -> dict:
+        if symbol in self.live:
+            return self.live[symbol]
+        recorded = self.recorded_quotes[self.recorded_quotes["symbol"] == symbol]
+        if not recorded.empty:
+            last = recorded.iloc[-1]
+            return {"price": float(last["price"]), "previous_close": None if pd.isna(last["previous_close"]) else float(last["previous_close"])}
+        daily = self._frame(symbol, "1d")
+        if daily is None or daily.empty:
+            raise LookupError(f"Price not found for {symbol}")
+        closes = daily["Close"].dropna()
+        return {"price": float(closes.iloc[-1]), "previous_close": float(closes.iloc[-2]) if len(closes) > 1 else None}
+
+    def history(self, symbol: str, interval: str, period: Optional[str] = None, start=None) -> pd.DataFrame:
+        hist = self._frame(symbol, interval)
+        if hist is None:
+            return pd.DataFrame(columns=OHLCV_COLUMNS, index=pd.DatetimeIndex([], tz="UTC"))
+        if start is not None:
+            hist = hist[hist.index >= pd.Timestamp(start)]
+        return hist.copy()
+
+    def history_many(self, symbols: List[str], interval: str, period: Optional[str] = None, start=None) -> Dict[str, pd.DataFrame]:
+        frames = {symbol: self.history(symbol, interval, period=period, start=start) for symbol in symbols}
+        return {symbol: hist for symbol, hist in frames.items() if not hist.empty}
+
+    def timezone(self, symbol: str) -> Optional[str]:
+        return self.timezones.get(symbol)
+
+    def _tick_table(self) -> pd.DataFrame:
+        """Recorded quotes, or (without any) the closes of the finest recorded intraday series per symbol."""
+        if not self.recorded_quotes.empty:
+            return self.recorded_quotes
+        tables = []
+        for interval in ("1m", "2m", "5m", "15m", "30m", "1h"):
+            for symbol in self.symbols(interval):
+                if any(symbol in set(t["symbol"]) for t in tables):
+                    continue
+                bars = self._frame(symbol, interval)["Close"].dropna()
+                # Previous close = last bar of the previous session day
+                days = bars.index.normalize()
+                day_close = bars.groupby(days).last()
+                previous = day_close.shift(1).reindex(days).to_numpy()
+                tables.append(pd.DataFrame({
+                    "t": (bars.index - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1),
+                    "symbol": symbol, "price": bars.to_numpy(), "previous_close": previous,
+                }))
+        if not tables:
+            return self.recorded_quotes
+        return pd.concat(tables, ignore_index=True).sort_values("t", kind="stable")
+
+    async def ticks(self, speed: float, loop: bool = REPLAY_LOOP) -> AsyncIterator[Dict[str, dict]]:
+        """
+        Replay the recording at `speed` times real time, yielding
+        {symbol: {"price", "previous_close"}} for each recorded instant and
+        updating what quote() returns as it goes.
+        """
+        table = self._tick_table()
+        if table.empty:
+            raise LookupError(f"Nothing to replay in {self.directory}")
+        times = np.floor(table["t"].to_numpy(dtype=float))  # One batch per second, like a poll cycle
+        while True:
+            previous_t = None
+            for t, batch in table.groupby(times, sort=True):
+                gap = 0.0 if previous_t is None else (t - previous_t) / speed
+                await asyncio.sleep(min(gap, REPLAY_MAX_SLEEP))  # Always yields to the event loop
+                previous_t = t
+                ticks = {
+                    row.symbol: {
+                        "price": float(row.price),
+                        "previous_close": None if pd.isna(row.previous_close) else float(row.previous_close),
+                    }
+                    for row in batch.itertuples(index=False)
+                }
+                self.live.update(ticks)
+                yield ticks
+            if not loop:
+                return
+            await asyncio.sleep(1.0)  # Pause between passes over the recording
+
+
+def _from_env() -> MarketDataProvider:
+    if PROVIDER_NAME == "replay":
+        return ReplayProvider(REPLAY_DIR)
+    if PROVIDER_NAME != "yfinance":
+        raise ValueError(f"Unknown MARKET_DATA_PROVIDER: {PROVIDER_NAME}")
+    provider = YFinanceProvider()
+    return RecordingProvider(provider, RECORD_DIR) if RECORD_DIR else provider
+
+
+_provider: Optional[MarketDataProvider] = None
+_provider_lock = threading.Lock()  # First calls race in from the upstream pool
+
+
+def get_provider() -> MarketDataProvider:
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                _provider = _from_env()
+    return _provider
+
+
+def set_provider(provider: MarketDataProvider) -> MarketDataProvider:
+    """Swap the active provider (e.g. for a benchmark run); returns the previous one."""
+    global _provider
+    with _provider_lock:
+        previous, _provider = _provider, provider
+    return previous
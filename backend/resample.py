@@ -0,0 +1,122 @@
+import re
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from backend.candle_store import period_start
+
+# Intervals fetched from upstream directly (minutes; None = daily or coarser)
+NATIVE_INTERVALS: Dict[str, Optional[int]] = {
+    "1m": 1, "2m": 2, "5m": 5, "15m": 15, "30m": 30, "1h": 60, "90m": 90,
+    "1d": None, "5d": None, "1wk": None, "1mo": None, "3mo": None,
+}
+# How far back upstream serves each intraday interval
+NATIVE_MAX_DAYS = {"1m": 7, "2m": 60, "5m": 60, "15m": 60, "30m": 60, "1h": 730, "90m": 60}
+# Sessions that start the evening before their trading day (CME Globex opens 18:00 New York)
+SESSION_ROLLOVER = {"=F": pd.Timedelta(hours=6)}
+
+_INTERVAL_RE = re.compile(r"^(\d+)(m|h|d|wk|mo)$")
+_ALIASES = {"60m": "1h"}
+
+
+def normalize_interval(interval: str) -> str:
+    interval = _ALIASES.get(interval, interval)
+    match = _INTERVAL_RE.match(interval)
+    if not match:
+        raise ValueError(f"Unsupported interval: {interval}")
+    count, unit = int(match.group(1)), match.group(2)
+    if count <= 0 or (unit in ("d", "wk", "mo") and count != 1) or (unit in ("m", "h") and count * (60 if unit == "h" else 1) > 24 * 60):
+        raise ValueError(f"Unsupported interval: {interval}")
+    return interval
+
+
+def interval_minutes(interval: str) -> Optional[int]:
+    """Bar length in minutes for intraday intervals, None for 1d/1wk/1mo."""
+    count, unit = _INTERVAL_RE.match(interval).groups()
+    return int(count) * (60 if unit == "h" else 1) if unit in ("m", "h") else None
+
+
+def base_interval(targets: Iterable[str], period: str, now: Optional[datetime] = None) -> str:
+    """
+    The one native interval every target can be built from: the coarsest
+    intraday interval dividing all intraday targets that upstream still
+    serves for `period`, or 1d when every target is daily or coarser.
+    """
+    minutes = [m for m in (interval_minutes(t) for t in targets) if m is not None]
+    if not minutes:
+        return "1d"
+    start = period_start(period, now)
+    days = None if start is None else ((now or datetime.now(timezone.utc)) - start).days
+    candidates = sorted(
+        (m, name) for name, m in NATIVE_INTERVALS.items()
+        if m is not None and name != "90m" and all(t % m == 0 for t in minutes)
+    )
+    for m, name in reversed(candidates):
+        if days is not None and days <= NATIVE_MAX_DAYS[name]:
+            return name
+    raise ValueError(
+        f"Intraday data for {', '.join(sorted(set(targets)))} is only available for the last "
+        f"{NATIVE_MAX_DAYS[candidates[-1][1]]} days; use a shorter period"
+    )
+
+
+def _trading_days(local: pd.DatetimeIndex, symbol: str) -> pd.DatetimeIndex:
+    """Session date of each bar (exchange midnight), moving evening-session bars to the next day."""
+    shift = next((delta for suffix, delta in SESSION_ROLLOVER.items() if symbol.endswith(suffix)), None)
+    return (local + shift).normalize() if shift is not None else local.normalize()
+
+
+def resample(hist: pd.DataFrame, interval: str, symbol: str = "") -> pd.DataFrame:
+    """
+    Aggregate OHLCV bars into `interval` in one vectorized groupby.
+
+    Bars are grouped by exchange session, not the UTC clock: intraday bins
+    are anchored at each session's first bar (09:30 New York, 09:00 Seoul,
+    18:00 the evening before for CME futures), daily bars by session date,
+    weekly and monthly bars by the calendar week/month of the session date.
+    Labels are bin starts in the series' exchange timezone.
+    """
+    if hist.empty:
+        return hist
+    local = hist.index
+    days = _trading_days(local, symbol)
+    minutes = interval_minutes(interval)
+
+    if minutes is not None:
+        # Anchor at each session's first bar so e.g. 4h bars start at the open
+        session_open = pd.DatetimeIndex(pd.Series(local).groupby(days.to_numpy()).transform("min"))
+        step = pd.Timedelta(minutes=minutes)
+        labels = session_open + ((local - session_open) // step) * step
+    elif interval == "1d":
+        labels = days
+    else:
+        freq = "W-SUN" if interval == "1wk" else "M"
+        labels = days.tz_localize(None).to_period(freq).start_time.tz_localize(local.tz)
+
+    grouped = hist.groupby(labels, sort=True)
+    out = pd.DataFrame({
+        "Open": grouped["Open"].first(),
+        "High": grouped["High"].max(),
+        "Low": grouped["Low"].min(),
+        "Close": grouped["Close"].last(),
+        "Volume": grouped["Volume"].sum(),
+    })
+    out.index.name = hist.index.name
+    return out
+
+
+def plan(targets: List[str], period: str) -> Tuple[str, List[str]]:
+    """(base interval to fetch, normalized targets); raises ValueError for unsupported combinations."""
+    targets = list(dict.fromkeys(t.strip() for t in targets if t.strip()))
+    if not targets:
+        raise ValueError("No intervals requested")
+    if len(targets) == 1 and targets[0] in NATIVE_INTERVALS:
+        return targets[0], targets  # Served as is, no resampling
+    targets = list(dict.fromkeys(normalize_interval(t) for t in targets))
+    return base_interval(targets, period), targets
+
+
+def build(base: pd.DataFrame, base_name: str, targets: List[str], symbol: str = "") -> Dict[str, pd.DataFrame]:
+    """Every target timeframe from the one base series."""
+    return {t: base if t == base_name else resample(base, t, symbol) for t in targets}
@@ -1 +1 @@
-from . import entries, trades, stocks
+from . import entries, trades, stocks, backtest, portfolio, screener
@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from backend import market_data, upstream
+from backend.backtest import BacktestConfig, run_backtest
+
+router = APIRouter(prefix="/backtest", tags=["backtest"])
+
+@router.get("/{symbol}")
+async def backtest_symbol(symbol: str, period: str = "2y", interval: str = "1d", config: BacktestConfig = Depends()):
+    try:
+        hist = await market_data.get_history(symbol, period=period, interval=interval)
+        if hist.empty:
+            raise HTTPException(status_code=404, detail="No candle data found")
+        return await run_in_threadpool(run_backtest, hist, config)
+    except (HTTPException, upstream.UpstreamUnavailable):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Backtest failed: {str(e)}")
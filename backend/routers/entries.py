@@ -1,7 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlmodel import Session, select
-from typing import List
+from typing import List, Literal, Optional
+from datetime import datetime
+from backend import bulk
 from backend.database import get_session
+from backend.pagination import DEFAULT_LIMIT, MAX_LIMIT, date_range, keyset, next_page
 from backend.models import DiaryEntry
 
 router = APIRouter(prefix="/entries", tags=["entries"])
@@ -14,9 +17,33 @@ def create_entry(entry: DiaryEntry, session: Session = Depends(get_session)):
     return entry
 
 @router.get("/", response_model=List[DiaryEntry])
-def read_entries(session: Session = Depends(get_session)):
-    entries = session.exec(select(DiaryEntry)).all()
-    return entries
+def read_entries(
+    request: Request,
+    response: Response,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    order: Literal["asc", "desc"] = "asc",
+    session: Session = Depends(get_session),
+):
+    """Entries by created_at; follow the X-Next-Cursor header (or Link rel=next) for more pages"""
+    query = keyset(select(DiaryEntry), DiaryEntry.created_at, DiaryEntry.id, limit, cursor, start, end,
+                   descending=order == "desc")
+    entries = session.exec(query).all()
+    return next_page(entries, limit, "created_at", request, response)
+
+@router.post("/bulk")
+async def import_entries(request: Request, format: Optional[str] = None):
+    """Import journal entries from a streamed CSV (header row) or NDJSON body; reports rejected rows by line"""
+    report = await bulk.import_rows(request, DiaryEntry, format)
+    return report.as_dict()
+
+@router.get("/export")
+def export_entries(format: str = "csv", start: Optional[datetime] = None, end: Optional[datetime] = None):
+    """Every entry by created_at, streamed as csv, ndjson or parquet"""
+    query = date_range(select(*DiaryEntry.__table__.columns), DiaryEntry.created_at, start, end)
+    return bulk.export_response(query.order_by(DiaryEntry.created_at, DiaryEntry.id), DiaryEntry, format, "entries")
 
 @router.get("/{entry_id}", response_model=DiaryEntry)
 def read_entry(entry_id: int, session: Session = Depends(get_session)):
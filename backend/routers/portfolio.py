@@ -0,0 +1,32 @@
+from fastapi import APIRouter
+from fastapi.concurrency import run_in_threadpool
+from sqlmodel import Session
+from typing import Optional
+from backend import market_data, portfolio
+from backend.database import engine
+
+router = APIRouter(prefix="/portfolio", tags=["portfolio"])
+
+async def _priced_positions(market: Optional[str], include_closed: bool = False, include_lots: bool = False):
+    positions = await run_in_threadpool(portfolio.load_positions, market, include_closed, include_lots)
+    quotes, _ = await market_data.get_quotes([p["symbol"] for p in positions if p["quantity"] > 0])
+    return [portfolio.with_quote(p, quotes.get(p["symbol"])) for p in positions]
+
+@router.get("/positions")
+async def get_positions(market: Optional[str] = None, include_closed: bool = False, include_lots: bool = False):
+    """Open positions (FIFO cost basis, realized P&L) joined with live prices; market is "US" or "KR" """
+    return await _priced_positions(market, include_closed, include_lots)
+
+@router.get("/pnl")
+async def get_pnl(market: Optional[str] = None):
+    """Realized/unrealized P&L, turnover and ROI per market, in that market's currency"""
+    positions = await _priced_positions(market, include_closed=True)
+    return {"markets": portfolio.summarize(positions)}
+
+@router.post("/rebuild")
+def rebuild_portfolio():
+    """Recompute every position from the trade table"""
+    with Session(engine) as session:
+        count = portfolio.rebuild_all(session)
+        session.commit()
+    return {"positions": count}
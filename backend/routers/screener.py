@@ -0,0 +1,120 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlmodel import Session, select
+from typing import Optional
+from backend import screener
+from backend.indicator_engine import HISTORY_PERIODS
+from backend.database import engine
+from backend.models import ScreenerResult, ScreenerRun
+from backend.routers import stocks
+
+router = APIRouter(prefix="/screener", tags=["screener"])
+
+SORT_COLUMNS = {
+    "strength": ScreenerResult.strength,
+    "risk_heat": ScreenerResult.position_size,  # HIGH/NORMAL/LOW buckets of the position size
+    "risk_reward": ScreenerResult.risk_reward,
+    "symbol": ScreenerResult.symbol,
+}
+
+FILTER_VALUES = {
+    "signal": screener.SIGNALS,
+    "regime": screener.REGIMES,
+    "market_bias": screener.MARKET_BIASES,
+    "volume_status": screener.VOLUME_STATUSES,
+    "risk_heat": screener.RISK_HEATS,
+    "market": screener.RESULT_MARKETS,
+}
+
+def _csv(name: str, value: Optional[str]):
+    values = [v.strip().upper() for v in value.split(",") if v.strip()] if value else None
+    unknown = sorted(set(values or ()) - set(FILTER_VALUES[name]))
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown {name} {', '.join(unknown)}; use {', '.join(FILTER_VALUES[name])}",
+        )
+    return values
+
+def _query_results(run_id: Optional[int], filters: dict, min_risk_reward: Optional[float], sort: str, order: str, limit: int):
+    with Session(engine) as session:
+        run = session.get(ScreenerRun, run_id) if run_id is not None else session.exec(
+            select(ScreenerRun).where(ScreenerRun.status == "finished").order_by(ScreenerRun.id.desc())
+        ).first()
+        if run is None:
+            return None, []
+        query = select(ScreenerResult).where(ScreenerResult.run_id == run.id)
+        for column, values in filters.items():
+            if values:
+                query = query.where(getattr(ScreenerResult, column).in_(values))
+        if min_risk_reward is not None:
+            query = query.where(ScreenerResult.risk_reward >= min_risk_reward)
+        column = SORT_COLUMNS[sort]
+        query = query.order_by(column.desc() if order == "desc" else column.asc(), ScreenerResult.symbol).limit(limit)
+        return run, session.exec(query).all()
+
+@router.get("")
+async def get_screener(
+    run_id: Optional[int] = None,
+    signal: Optional[str] = None,
+    regime: Optional[str] = None,
+    market_bias: Optional[str] = None,
+    volume_status: Optional[str] = None,
+    risk_heat: Optional[str] = None,
+    market: Optional[str] = None,
+    min_risk_reward: Optional[float] = None,
+    sort: str = "strength",
+    order: str = "desc",
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """
+    Results of a screener run (latest finished run by default). Filters take
+    comma-separated values, e.g. signal=STRONG_BUY,EXIT_SHORT&regime=BULL&market=US
+    (unknown values are rejected with 400); sort is strength, risk_heat,
+    risk_reward or symbol.
+    """
+    if sort not in SORT_COLUMNS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of {', '.join(SORT_COLUMNS)}")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order must be asc or desc")
+    filters = {
+        "signal": _csv("signal", signal),
+        "regime": _csv("regime", regime),
+        "market_bias": _csv("market_bias", market_bias),
+        "volume_status": _csv("volume_status", volume_status),
+        "risk_heat": _csv("risk_heat", risk_heat),
+        "market": _csv("market", market),
+    }
+    run, results = await run_in_threadpool(_query_results, run_id, filters, min_risk_reward, sort, order, limit)
+    if run is None:
+        raise HTTPException(status_code=404, detail="No screener run found; start one with POST /screener/run")
+    return {"run": run, "results": results}
+
+@router.post("/run", status_code=202)
+async def start_screener_run(interval: str = "1d"):
+    """Screen every loaded instrument in the background; poll GET /screener/runs/{id} for progress"""
+    if interval not in HISTORY_PERIODS:
+        # Only intervals with a history window to screen over; 5d/3mo would come back empty
+        raise HTTPException(status_code=400, detail=f"Unsupported interval: {interval}; use {', '.join(HISTORY_PERIODS)}")
+    symbols = [item["symbol"] for item in stocks.STOCKS_CACHE]
+    if not symbols:
+        raise HTTPException(status_code=503, detail="Instrument universe is not loaded yet")
+    try:
+        run_id, _ = await screener.start_screener(symbols, interval)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"run_id": run_id, "symbols": len(symbols), "status": "running"}
+
+@router.get("/runs")
+def list_screener_runs(limit: int = Query(20, ge=1, le=200)):
+    """Most recent screener runs"""
+    with Session(engine) as session:
+        return session.exec(select(ScreenerRun).order_by(ScreenerRun.id.desc()).limit(limit)).all()
+
+@router.get("/runs/{run_id}")
+def get_screener_run(run_id: int):
+    with Session(engine) as session:
+        run = session.get(ScreenerRun, run_id)
+        if run is None:
+            raise HTTPException(status_code=404, detail="Screener run not found")
+        return run
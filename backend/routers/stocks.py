@@ -1,103 +1,126 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
 from sqlmodel import Session, select
-from typing import List
-import yfinance as yf
+from typing import Dict, List, Optional, Tuple
 import pandas as pd
-import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime
 from backend.database import get_session
+from backend import bulk, encoding, indicator_engine, live_bars, market_data, pagination, resample, simulation, upstream
 from backend.models import StockDailyStat
+from backend.search_index import SymbolIndex
 
 router = APIRouter(prefix="/stocks", tags=["stocks"])
 
-# This will be populated from main.py or we can move the cache here
+# Searchable universe, installed by main.py from backend/universe.py
 STOCKS_CACHE = []
+SEARCH_INDEX = SymbolIndex()
+
+def set_instruments(instruments: List[dict]):
+    """Replace the searchable universe (a refreshed snapshot) and rebuild the search index."""
+    global SEARCH_INDEX
+    index = SymbolIndex(instruments)  # Built first, so searches never see a half-swapped universe
+    STOCKS_CACHE[:] = instruments
+    SEARCH_INDEX = index
+
+# Response formats; "json" (array of row objects) stays the default
+CANDLE_FORMATS = ("json", "ndjson", "columnar", "binary", "arrow")
+HISTORY_FORMATS = ("json", "columnar", "binary", "arrow")
 
 @router.get("/search")
-async def search_stocks(q: str):
+async def search_stocks(q: str, limit: int = 10):
     if not q:
         return []
-    
-    q = q.upper()
-    results = [
-        s for s in STOCKS_CACHE 
-        if q in s["symbol"].upper() or q in s["name"].upper()
-    ]
-    return results[:10]
+    return SEARCH_INDEX.search(q, limit=min(limit, 50))
 
 @router.get("/price/{symbol}")
-def get_stock_price(symbol: str):
+async def get_stock_price(symbol: str):
     try:
-        ticker = yf.Ticker(symbol)
-        price = ticker.fast_info.get('last_price')
-        if price is None:
-            hist = ticker.history(period="1d")
-            if not hist.empty:
-                price = hist['Close'].iloc[-1]
-        
-        if price is not None:
-            return {"symbol": symbol, "price": round(float(price), 2)}
-        else:
-            raise HTTPException(status_code=404, detail="Price not found")
+        quote = await market_data.get_quote(symbol)
+        return {"symbol": symbol, "price": quote["price"]}
+    except LookupError:
+        raise HTTPException(status_code=404, detail="Price not found")
+    except upstream.UpstreamUnavailable:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/prices/")
 async def get_stock_prices(symbols: List[str]):
-    results = {}
+    quotes, _ = await market_data.get_quotes(symbols)
+    return {symbol: quotes[symbol]["price"] if symbol in quotes else None for symbol in symbols}
+
+@router.get("/cache")
+def get_cache_stats():
+    """Hit/miss statistics of the shared quote and history caches"""
+    return market_data.cache_stats()
+
+@router.post("/stats")
+async def get_stocks_stats(symbols: List[str]):
+    """Stats for many symbols from one bulk download, keyed by symbol (None when unavailable)."""
     try:
-        tickers = yf.Tickers(" ".join(symbols))
-        for symbol in symbols:
-            ticker = tickers.tickers[symbol]
-            price = ticker.fast_info.get('last_price')
-            if price is None:
-                hist = ticker.history(period="1d")
-                if not hist.empty:
-                    price = hist['Close'].iloc[-1]
-            
-            results[symbol] = round(float(price), 2) if price is not None else None
-        return results
+        states = await indicator_engine.engine.ensure(symbols, "1d")
+        return {symbol: state.stats() if state else None for symbol, state in states.items()}
+    except upstream.UpstreamUnavailable:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/stats/bulk")
+async def import_stock_stats(request: Request, format: Optional[str] = None):
+    """
+    Import daily stats from a streamed CSV (header row) or NDJSON body, in
+    batched transactions; rows for an already recorded symbol/date are
+    reported by line and skipped.
+    """
+    report = await bulk.import_rows(request, StockDailyStat, format)
+    return report.as_dict()
+
+@router.get("/stats/export")
+def export_stock_stats(
+    format: str = "csv",
+    symbol: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+):
+    """Recorded daily stats by symbol and date, streamed as csv, ndjson or parquet"""
+    query = select(*StockDailyStat.__table__.columns)
+    if symbol:
+        query = query.where(StockDailyStat.symbol == symbol)
+    query = pagination.date_range(query, StockDailyStat.date, start, end)
+    query = query.order_by(StockDailyStat.symbol, StockDailyStat.date)
+    return bulk.export_response(query, StockDailyStat, format, "stock_stats")
+
 @router.get("/stats/{symbol}")
 async def get_stock_stats(symbol: str):
     try:
-        ticker = yf.Ticker(symbol)
-        hist = ticker.history(period="30d")
-        if hist.empty:
+        state = (await indicator_engine.engine.ensure([symbol], "1d"))[symbol]
+        if state is None:
             raise HTTPException(status_code=404, detail="No historical data found")
-        
-        hist['HL'] = hist['High'] - hist['Low']
-        hist['HCp'] = abs(hist['High'] - hist['Close'].shift(1))
-        hist['LCp'] = abs(hist['Low'] - hist['Close'].shift(1))
-        hist['TR'] = hist[['HL', 'HCp', 'LCp']].max(axis=1)
-        
-        atr_period = 14
-        atr = hist['TR'].rolling(window=atr_period).mean().iloc[-1]
-        
-        last_item = hist.iloc[-1]
-        prev_item = hist.iloc[-2] if len(hist) > 1 else last_item
-        
-        change = last_item['Close'] - prev_item['Close']
-        change_percent = (change / prev_item['Close'] * 100) if prev_item['Close'] != 0 else 0
-        
-        return {
-            "symbol": symbol,
-            "price": round(float(last_item['Close']), 2),
-            "change": round(float(change), 2),
-            "change_percent": round(float(change_percent), 2),
-            "volume": int(last_item['Volume']),
-            "atr": round(float(atr), 2) if not pd.isna(atr) else None,
-            "high": round(float(last_item['High']), 2),
-            "low": round(float(last_item['Low']), 2),
-            "open": round(float(last_item['Open']), 2)
-        }
+        return state.stats()
+    except (HTTPException, upstream.UpstreamUnavailable):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/indicators/{symbol}")
+async def get_stock_indicators(symbol: str, interval: str = "1d"):
+    """Latest bar with Wilder ATR, EMAs, SMA20 and chandelier levels from the incremental indicator engine"""
+    if interval not in indicator_engine.HISTORY_PERIODS:
+        raise HTTPException(status_code=400, detail=f"Unsupported interval: {interval}")
+    try:
+        state = (await indicator_engine.engine.ensure([symbol], interval))[symbol]
+        if state is None:
+            raise HTTPException(status_code=404, detail="No candle data found")
+        return state.snapshot()
+    except (HTTPException, upstream.UpstreamUnavailable):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/stats/record", response_model=StockDailyStat)
-async def record_stock_stats(stat: StockDailyStat, session: Session = Depends(get_session)):
+def record_stock_stats(stat: StockDailyStat, session: Session = Depends(get_session)):
     try:
         if isinstance(stat.date, str):
             stat.date = datetime.fromisoformat(stat.date.replace('Z', '+00:00'))
@@ -106,100 +129,138 @@ async def record_stock_stats(stat: StockDailyStat, session: Session = Depends(ge
         session.commit()
         session.refresh(stat)
         return stat
+    except IntegrityError:
+        session.rollback()
+        raise HTTPException(status_code=409, detail=f"Stats for {stat.symbol} on {stat.date} already recorded")
     except Exception as e:
         session.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
+def _with_live_tails(symbol: str, frames: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+    """Extend 1m/5m/15m frames with the bars built from the live quote feed since the upstream fetch."""
+    return {
+        interval: live_bars.with_live_tail(hist, live_bars.bars.frame(symbol, interval, hist.index.tz))
+        if interval in live_bars.LIVE_INTERVALS else hist
+        for interval, hist in frames.items()
+    }
+
+async def _load_timeframes(symbol: str, intervals: List[str], period: str, live: bool = False) -> Tuple[str, Dict[str, pd.DataFrame]]:
+    """One fetch at the finest interval needed, every requested timeframe resampled from it."""
+    try:
+        base, targets = resample.plan(intervals, period)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    hist = await market_data.get_history(symbol, period=period, interval=base)
+    if hist.empty:
+        raise HTTPException(status_code=404, detail="No candle data found")
+    frames = await run_in_threadpool(resample.build, hist, base, targets, symbol)
+    if live and symbol in live_bars.bars.rings:
+        frames = _with_live_tails(symbol, frames)
+    return base, frames
+
+@router.get("/candles/multi/{symbol}")
+async def get_stock_candles_multi(
+    symbol: str,
+    intervals: str = "1d,4h,1h",
+    period: str = "60d",
+    live: bool = True,
+):
+    """Several timeframes (e.g. 1d,4h,1h) from a single upstream fetch, keyed by interval"""
+    try:
+        base, frames = await _load_timeframes(symbol, intervals.split(","), period, live)
+        meta = {"symbol": symbol, "period": period, "base_interval": base}
+        return StreamingResponse(encoding.stream_timeframes_json(meta, frames), media_type=encoding.MEDIA_TYPES["json"])
+    except (HTTPException, upstream.UpstreamUnavailable):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/candles/{symbol}")
-async def get_stock_candles(symbol: str, period: str = "60d", interval: str = "1d"):
+async def get_stock_candles(
+    symbol: str,
+    period: str = "60d",
+    interval: str = "1d",
+    format: Optional[str] = None,
+    accept: Optional[str] = Header(default=None),
+    live: bool = True,
+):
+    """
+    OHLCV bars; intervals upstream doesn't serve (4h, 2h, 10m, ...) are resampled
+    from a finer one. 1m/5m/15m end with the bars built from the live feed
+    (Volume 0) unless live=false.
+    """
+    fmt = encoding.negotiate_format(format, accept, CANDLE_FORMATS)
     try:
-        ticker = yf.Ticker(symbol)
-        hist = ticker.history(period=period, interval=interval)
-        if hist.empty:
-            raise HTTPException(status_code=404, detail="No candle data found")
-        
-        candles = []
-        for date, row in hist.iterrows():
-            candles.append({
-                "date": date.isoformat(),
-                "open": round(float(row['Open']), 2),
-                "high": round(float(row['High']), 2),
-                "low": round(float(row['Low']), 2),
-                "close": round(float(row['Close']), 2),
-                "volume": int(row['Volume'])
-            })
-        return candles
+        _, frames = await _load_timeframes(symbol, [interval], period, live)
+        hist = next(iter(frames.values()))
+        return await run_in_threadpool(encoding.candle_response, hist, fmt)
+    except (HTTPException, upstream.UpstreamUnavailable):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/history/{symbol}", response_model=List[StockDailyStat])
-async def get_stock_history(symbol: str, session: Session = Depends(get_session)):
-    stats = session.exec(
-        select(StockDailyStat)
-        .where(StockDailyStat.symbol == symbol)
-        .order_by(StockDailyStat.date.asc())
-    ).all()
-    return stats
+def get_stock_history(
+    symbol: str,
+    request: Request,
+    response: Response,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(pagination.DEFAULT_LIMIT, ge=1, le=pagination.MAX_LIMIT),
+    format: Optional[str] = None,
+    accept: Optional[str] = Header(default=None),
+    session: Session = Depends(get_session),
+):
+    """Recorded daily stats, oldest first; follow the X-Next-Cursor header (or Link rel=next) for more pages"""
+    fmt = encoding.negotiate_format(format, accept, HISTORY_FORMATS)
+    if fmt != "json":
+        # Select plain columns so no ORM objects are built per row
+        columns = list(StockDailyStat.__table__.columns)
+        query = pagination.keyset(
+            select(*columns).where(StockDailyStat.symbol == symbol),
+            StockDailyStat.date, StockDailyStat.id, limit, cursor, start, end,
+        )
+        rows = pagination.next_page(session.execute(query).all(), limit, "date", request, response)
+        table = pd.DataFrame.from_records(rows, columns=[c.name for c in columns])
+        result = encoding.columnar_response(table, fmt)
+        for header in (pagination.NEXT_CURSOR_HEADER, "link"):
+            if header in response.headers:
+                result.headers[header] = response.headers[header]
+        return result
+
+    query = pagination.keyset(
+        select(StockDailyStat).where(StockDailyStat.symbol == symbol),
+        StockDailyStat.date, StockDailyStat.id, limit, cursor, start, end,
+    )
+    stats = session.exec(query).all()
+    return pagination.next_page(stats, limit, "date", request, response)
 
 @router.get("/simulation/1m/{symbol}")
-async def get_simulated_1m_candles(symbol: str):
+async def get_simulated_1m_candles(
+    symbol: str,
+    period: str = "1y",
+    interval: str = "1h",
+    seed: Optional[int] = None,
+    format: Optional[str] = None,
+    accept: Optional[str] = Header(default=None),
+):
+    steps = simulation.BASE_INTERVAL_MINUTES.get(interval)
+    if steps is None:
+        raise HTTPException(status_code=400, detail=f"Unsupported base interval: {interval}")
+    fmt = encoding.negotiate_format(format, accept, CANDLE_FORMATS)
+
     try:
-        # Fetch 1 year of 1-hour data as the baseline macro trend
-        ticker = yf.Ticker(symbol)
-        hist = ticker.history(period="1y", interval="1h")
+        # Fetch the base bars (1 year of 1-hour data by default) as the macro trend
+        hist = await market_data.get_history(symbol, period=period, interval=interval)
         if hist.empty:
             raise HTTPException(status_code=404, detail="No base data found for simulation")
-        
-        simulated_candles = []
-        
-        # Extrapolate 60 1-minute candles for each 1-hour candle
-        for date, row in hist.iterrows():
-            hour_open = float(row['Open'])
-            hour_high = float(row['High'])
-            hour_low = float(row['Low'])
-            hour_close = float(row['Close'])
-            hour_vol = int(row['Volume'])
-            
-            # Simple linear interpolation with random walk bounded by H/L
-            # This is a basic simulation for testing purposes
-            steps = 60
-            base_vol = hour_vol // steps
-            
-            # Generate 60 steps traversing from Open to Close
-            price_path = np.linspace(hour_open, hour_close, steps)
-            
-            # Add synthetic noise within the bounds
-            noise_amplitude = (hour_high - hour_low) * 0.2
-            noise = np.random.normal(0, noise_amplitude, steps)
-            
-            # Ensure start and end perfectly match the hourly candle
-            noisy_path = price_path + noise
-            noisy_path[0] = hour_open
-            noisy_path[-1] = hour_close
-            
-            # Clamp to High/Low
-            noisy_path = np.clip(noisy_path, hour_low, hour_high)
-            
-            for i in range(steps):
-                current_time = date + timedelta(minutes=i)
-                
-                # Derive synthetic OHLC for the minute
-                m_open = noisy_path[i] if i == 0 else m_close # type: ignore
-                m_close = noisy_path[i]
-                
-                # Add slight wick noise
-                m_high = min(hour_high, max(m_open, m_close) + abs(np.random.normal(0, noise_amplitude * 0.5)))
-                m_low = max(hour_low, min(m_open, m_close) - abs(np.random.normal(0, noise_amplitude * 0.5)))
-                
-                simulated_candles.append({
-                    "date": current_time.isoformat(),
-                    "open": round(float(m_open), 2),
-                    "high": round(float(m_high), 2),
-                    "low": round(float(m_low), 2),
-                    "close": round(float(m_close), 2),
-                    "volume": base_vol + int(abs(np.random.normal(0, base_vol * 0.5)))
-                })
-                
-        return simulated_candles
+
+        # Extrapolate one 1-minute candle per minute of each base candle
+        candles = await run_in_threadpool(simulation.simulate_minute_candles, hist, steps=steps, seed=seed)
+    except (HTTPException, upstream.UpstreamUnavailable):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Simulation failed: {str(e)}")
+
+    return await run_in_threadpool(encoding.candle_response, candles, fmt)
@@ -1,32 +1,109 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from sqlmodel import Session, select
-from typing import List, Optional
-from backend.database import get_session
+from typing import List, Literal, Optional, Set, Tuple
+from datetime import datetime
+from backend.database import engine, get_session
+from backend import bulk, portfolio
+from backend.pagination import DEFAULT_LIMIT, MAX_LIMIT, date_range, keyset, next_page
 from backend.models import Trade
 
 router = APIRouter(prefix="/trades", tags=["trades"])
 
 @router.post("/", response_model=Trade)
 def create_trade(trade: Trade, session: Session = Depends(get_session)):
+    # Table models skip validation as request bodies; FIFO replay compares real datetimes
+    trade = Trade.model_validate(trade, from_attributes=True)
+    try:
+        portfolio.trade_side(trade.type)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     # Auto-detect market if not specified
     if not trade.market:
-        if trade.stock_name.endswith('.KS') or trade.stock_name.endswith('.KQ'):
-            trade.market = "KR"
-        else:
-            trade.market = "US"
+        trade.market = portfolio.market_for(trade.stock_name)
     
     session.add(trade)
+    session.flush()
+    try:
+        portfolio.apply_trade(session, trade)
+    except portfolio.OversellError as e:
+        session.rollback()
+        raise HTTPException(status_code=409, detail=str(e))
     session.commit()
     session.refresh(trade)
     return trade
 
 @router.get("/", response_model=List[Trade])
-def read_trades(market: Optional[str] = None, session: Session = Depends(get_session)):
+def read_trades(
+    request: Request,
+    response: Response,
+    market: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    order: Literal["asc", "desc"] = "asc",
+    session: Session = Depends(get_session),
+):
+    """Trades by trade_date; follow the X-Next-Cursor header (or Link rel=next) for more pages"""
     query = select(Trade)
     if market:
         query = query.where(Trade.market == market)
+    query = keyset(query, Trade.trade_date, Trade.id, limit, cursor, start, end, descending=order == "desc")
     trades = session.exec(query).all()
-    return trades
+    return next_page(trades, limit, "trade_date", request, response)
+
+def _rebuild_positions(keys: Set[Tuple[str, str]]) -> List[dict]:
+    """Rebuild positions; returns the ones with sells beyond holdings (recorded as unmatched)."""
+    oversold = []
+    with Session(engine) as session:
+        for symbol, market in sorted(keys):
+            unmatched = portfolio.rebuild_symbol(session, symbol, market)
+            if unmatched:
+                oversold.append({"symbol": symbol, "market": market, "unmatched_quantity": unmatched})
+        session.commit()
+    return oversold
+
+@router.post("/bulk")
+async def import_trades(request: Request, format: Optional[str] = None):
+    """
+    Import trades from a streamed CSV (header row) or NDJSON body, in batched
+    transactions; returns counts and the line number and reason of each
+    rejected row. Positions of every imported symbol are rebuilt afterwards;
+    symbols whose sells exceed their holdings are listed under "oversold".
+    """
+    touched: Set[Tuple[str, str]] = set()
+    oversold: List[dict] = []
+
+    def prepare(fields: dict):
+        portfolio.trade_side(fields.get("type"))
+        if not fields.get("market") and isinstance(fields.get("stock_name"), str):
+            fields["market"] = portfolio.market_for(fields["stock_name"])
+
+    try:
+        report = await bulk.import_rows(
+            request, Trade, format, prepare=prepare,
+            on_batch=lambda rows: touched.update((row["stock_name"], row["market"]) for row in rows),
+        )
+    finally:
+        # Also after a failed upload, so committed batches are never left unbooked
+        if touched:
+            oversold = await run_in_threadpool(_rebuild_positions, touched)
+    return {**report.as_dict(), "positions_rebuilt": len(touched), "oversold": oversold}
+
+@router.get("/export")
+def export_trades(
+    format: str = "csv",
+    market: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+):
+    """Every matching trade by trade_date, streamed as csv, ndjson or parquet"""
+    query = select(*Trade.__table__.columns)
+    if market:
+        query = query.where(Trade.market == market)
+    query = date_range(query, Trade.trade_date, start, end)
+    return bulk.export_response(query.order_by(Trade.trade_date, Trade.id), Trade, format, "trades")
 
 @router.get("/{trade_id}", response_model=Trade)
 def read_trade(trade_id: int, session: Session = Depends(get_session)):
@@ -41,5 +118,11 @@ def delete_trade(trade_id: int, session: Session = Depends(get_session)):
     if not trade:
         raise HTTPException(status_code=404, detail="Trade not found")
     session.delete(trade)
+    session.flush()
+    try:
+        portfolio.remove_trade(session, trade)
+    except portfolio.OversellError as e:
+        session.rollback()
+        raise HTTPException(status_code=409, detail=f"Deleting this trade would leave a later sell uncovered: {e}")
     session.commit()
     return {"ok": True}
@@ -0,0 +1,213 @@
+"""
+Universe-wide AntiGravity screener: the latest-bar signal, regime, volume
+status and risk figures for every loaded instrument.
+
+A run downloads the universe in bulk batches (a few in flight at once) and
+hands each downloaded batch to a process pool, so the signal maths for one
+batch overlaps the download of the next. Results are stored per run
+(ScreenerRun / ScreenerResult) as each batch completes and served by
+/screener from the database.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import insert, update
+from sqlmodel import Session, select
+
+from backend import cluster, market_data, metrics
+from backend.database import engine
+from backend.indicator_engine import HISTORY_PERIODS
+from backend.models import ScreenerResult, ScreenerRun
+from backend.portfolio import TRADE_MARKETS, market_for
+from backend.strategy import DEFAULT_CONFIG, MIN_HISTORY, compute_signal_frame, resolve_signal
+
+SCREENER_WORKERS = int(os.getenv("SCREENER_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+SCREENER_BATCH_SIZE = int(os.getenv("SCREENER_BATCH_SIZE", "50"))  # Symbols per bulk download
+SCREENER_FETCH_CONCURRENCY = int(os.getenv("SCREENER_FETCH_CONCURRENCY", "2"))  # Downloads in flight
+
+# Values each result column can take; the screener always evaluates a flat position,
+# so the PYRAMID_* signals never occur
+SIGNALS = ("STRONG_BUY", "STRONG_SELL", "EXIT_LONG", "EXIT_SHORT", "HOLD")
+REGIMES = ("BULL", "BEAR", "RANGING")
+MARKET_BIASES = ("BULLISH", "BEARISH", "NEUTRAL")
+VOLUME_STATUSES = ("ACCUMULATION", "DIVERGENCE")
+RISK_HEATS = ("HIGH", "NORMAL", "LOW")
+RESULT_MARKETS = TRADE_MARKETS  # Same codes as Trade.market, so results join trades and /portfolio
+
+_running: Optional[int] = None  # Id of the run in progress, if any
+_lock = cluster.FileLock("screener")  # Held for the whole run in cluster mode, so one worker screens at a time
+
+
+def _risk_heat(position_size: float) -> str:
+    return "HIGH" if position_size > 0.8 else "NORMAL" if position_size > 0.4 else "LOW"
+
+
+def screen_symbol(symbol: str, hist: pd.DataFrame) -> Optional[dict]:
+    """AntiGravityStrategy.generateSignal on the last bar (flat position), as a ScreenerResult row."""
+    hist = hist.dropna(subset=["Open", "High", "Low", "Close"])
+    if len(hist) < MIN_HISTORY:
+        return None
+    last = compute_signal_frame(hist, DEFAULT_CONFIG).iloc[-1]
+    close, atr, sma20 = float(last["close"]), float(last["atr"]), float(last["sma20"])
+    if not (atr > 0 and np.isfinite(sma20)):
+        return None
+
+    position_size = min(1.0, 0.01 / (atr / close))
+    if last["regime_confidence"] < 0.3:
+        position_size *= 0.5
+    entry = DEFAULT_CONFIG.entry_multiplier * (1.5 if last["regime"] == "RANGING" else 1.0)
+    above = close > sma20
+    stop = float(last["stop_loss_multiplier"])
+    return {
+        "symbol": symbol,
+        "market": market_for(symbol),
+        "as_of": hist.index[-1].to_pydatetime().replace(tzinfo=None),
+        "price": round(close, 2),
+        "atr": round(atr, 2),
+        "signal": resolve_signal(
+            last["long_1"], last["long_2"], last["short_1"], last["short_2"], last["long_exit"], last["short_exit"]
+        ),
+        "strength": round((close - sma20) / atr, 3),
+        "regime": str(last["regime"]),
+        "regime_confidence": round(float(last["regime_confidence"]), 2),
+        "market_bias": "BULLISH" if last["is_bullish"] else "BEARISH" if last["is_bearish"] else "NEUTRAL",
+        "volume_status": "ACCUMULATION" if last["is_volume_trending"] else "DIVERGENCE",
+        "risk_heat": _risk_heat(position_size),
+        "position_size": round(position_size, 2),
+        "risk_reward": round(float(last["adaptive_pt"]) / stop, 2),
+        "entry_long": round(sma20 + atr * entry, 2),
+        "entry_short": round(sma20 - atr * entry, 2),
+        "stop_loss": round(close - atr * stop if above else close + atr * stop, 2),
+        "chandelier_stop": round(float(last["chandelier_long"] if above else last["chandelier_short"]), 2),
+    }
+
+
+def screen_batch(frames: Dict[str, pd.DataFrame]) -> List[dict]:
+    """Process-pool entry point: screen one downloaded batch."""
+    rows = []
+    for symbol, hist in frames.items():
+        try:
+            row = screen_symbol(symbol, hist)
+        except Exception as e:
+            print(f"⚠️ [Screener] {symbol} failed: {e}")
+            continue
+        if row is not None:
+            rows.append(row)
+    return rows
+
+
+def _start_run(symbols: int, interval: str) -> int:
+    with Session(engine) as session:
+        run = ScreenerRun(symbols=symbols, interval=interval)
+        session.add(run)
+        session.commit()
+        return run.id
+
+
+def _record_batch(run_id: int, rows: List[dict], failed: int):
+    """Store one batch's results and advance the run's progress counters."""
+    with Session(engine) as session:
+        if rows:
+            session.execute(insert(ScreenerResult), [{**row, "run_id": run_id} for row in rows])
+        session.execute(
+            update(ScreenerRun).where(ScreenerRun.id == run_id)
+            .values(screened=ScreenerRun.screened + len(rows), failed=ScreenerRun.failed + failed)
+        )
+        session.commit()
+
+
+def _finish_run(run_id: int, seconds: float, error: Optional[str] = None):
+    with Session(engine) as session:
+        run = session.get(ScreenerRun, run_id)
+        run.status = "failed" if error else "finished"
+        run.error = error
+        run.finished_at = datetime.utcnow()
+        run.seconds = round(seconds, 2)
+        session.add(run)
+        session.commit()
+
+
+def is_running() -> Optional[int]:
+    return _running
+
+
+async def _execute(run_id: int, symbols: List[str], interval: str):
+    global _running
+    started = time.perf_counter()
+    print(f"🔎 [Screener] Run {run_id}: {len(symbols)} symbols on {SCREENER_WORKERS} workers")
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(SCREENER_FETCH_CONCURRENCY)
+    # Same window the indicator engine seeds from, so both read the same stored series
+    period = HISTORY_PERIODS[interval]
+
+    async def run_batch(pool: ProcessPoolExecutor, batch: List[str]) -> int:
+        async with semaphore:
+            try:
+                frames = await market_data.get_history_many(batch, period=period, interval=interval)
+            except Exception as e:
+                print(f"⚠️ [Screener] Batch of {len(batch)} failed ({batch[0]}..): {e}")
+                frames = {}
+        frames = {s: h[["Open", "High", "Low", "Close", "Volume"]] for s, h in frames.items() if h is not None and not h.empty}
+        rows = await loop.run_in_executor(pool, screen_batch, frames) if frames else []
+        # Written per batch, so GET /screener/runs/{id} shows progress while the run goes on
+        await asyncio.to_thread(_record_batch, run_id, rows, len(batch) - len(frames))
+        return len(rows)
+
+    try:
+        with metrics.track_task("screener"):
+            # spawn, not fork: the server process has live threads (upstream pool, event loop)
+            with ProcessPoolExecutor(SCREENER_WORKERS, mp_context=multiprocessing.get_context("spawn")) as pool:
+                batches = [symbols[i:i + SCREENER_BATCH_SIZE] for i in range(0, len(symbols), SCREENER_BATCH_SIZE)]
+                screened = sum(await asyncio.gather(*(run_batch(pool, batch) for batch in batches)))
+        seconds = time.perf_counter() - started
+        await asyncio.to_thread(_finish_run, run_id, seconds)
+        print(f"✅ [Screener] Run {run_id}: {screened}/{len(symbols)} symbols screened in {seconds:.1f}s")
+    except Exception as e:
+        print(f"❌ [Screener] Run {run_id} failed: {e}")
+        await asyncio.to_thread(_finish_run, run_id, time.perf_counter() - started, str(e))
+    finally:
+        _running = None
+        _lock.release()
+
+
+async def start_screener(symbols: List[str], interval: str = "1d") -> Tuple[int, asyncio.Task]:
+    """Record a new run and start screening symbols in the background; returns (run id, task)."""
+    global _running
+    if interval not in HISTORY_PERIODS:
+        raise ValueError(f"Unsupported interval: {interval}")
+    if _running is not None:
+        raise RuntimeError(f"Screener run {_running} is still in progress")
+    if cluster.CLUSTER_MODE and not _lock.acquire():
+        raise RuntimeError("A screener run is in progress in another worker")
+    symbols = list(dict.fromkeys(s for s in symbols if s))
+    _running = -1  # Claimed before the await so concurrent starts are refused
+    try:
+        run_id = await asyncio.to_thread(_start_run, len(symbols), interval)
+    except Exception:
+        _running = None
+        _lock.release()
+        raise
+    _running = run_id
+    return run_id, asyncio.create_task(_execute(run_id, symbols, interval))
+
+
+async def run_screener(symbols: List[str], interval: str = "1d") -> int:
+    """start_screener and wait for it to finish."""
+    run_id, task = await start_screener(symbols, interval)
+    await task
+    return run_id
+
+
+def latest_run_id() -> Optional[int]:
+    with Session(engine) as session:
+        return session.exec(
+            select(ScreenerRun.id).where(ScreenerRun.status == "finished").order_by(ScreenerRun.id.desc())
+        ).first()
@@ -0,0 +1,158 @@
+import bisect
+import heapq
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Dict, Iterable, List, Set, Tuple
+
+# Hangul syllables U+AC00..U+D7A3 decompose as (initial * 21 + medial) * 28 + final
+_HANGUL_BASE = 0xAC00
+_HANGUL_LAST = 0xD7A3
+_CHOSEONG = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+_CHOSEONG_SET = set(_CHOSEONG)
+_NON_WORD = re.compile(r"[\W_]+", re.UNICODE)
+# NFKC turns typed initials (compatibility jamo, e.g. ㅅ) into conjoining jamo; map them back
+_CONJOINING_TO_CHOSEONG = {0x1100 + k: ch for k, ch in enumerate(_CHOSEONG)}
+
+# Rank tiers, best first
+EXACT, SYMBOL_PREFIX, NAME_PREFIX, SUBSTRING = range(4)
+
+
+def normalize(text: str) -> str:
+    """
+    NFKC (folds full-width letters, recomposes decomposed Hangul from some
+    IMEs/macOS into syllables), upper-cased.
+    """
+    return unicodedata.normalize("NFKC", text or "").translate(_CONJOINING_TO_CHOSEONG).upper().strip()
+
+
+def compact(text: str) -> str:
+    """Normalized text without spaces or punctuation, so "삼성 전자" matches "삼성전자"."""
+    return _NON_WORD.sub("", normalize(text))
+
+
+def choseong(text: str) -> str:
+    """Initial consonants of the Hangul syllables in text ("삼성전자" -> "ㅅㅅㅈㅈ")."""
+    return "".join(
+        _CHOSEONG[(ord(ch) - _HANGUL_BASE) // 588]
+        for ch in text
+        if _HANGUL_BASE <= ord(ch) <= _HANGUL_LAST
+    )
+
+
+def _grams(text: str) -> Set[str]:
+    """Unigrams and bigrams; every query of length >= 2 is covered by its bigrams."""
+    grams = set(text)
+    grams.update(text[i:i + 2] for i in range(len(text) - 1))
+    return grams
+
+
+class SymbolIndex:
+    """
+    Prebuilt search over instruments ({"symbol", "name", ...} dicts).
+
+    Built once per universe load: sorted symbol and name-word arrays answer
+    prefix queries by bisection, and a 1/2-gram inverted index over compacted
+    symbols, names and Hangul initials answers substring queries. Results rank
+    exact symbol > symbol prefix > name (word) prefix > substring.
+    """
+
+    def __init__(self, instruments: Iterable[dict] = ()):
+        self.build(instruments)
+
+    def build(self, instruments: Iterable[dict]):
+        self.instruments: List[dict] = []
+        self._symbols: List[Tuple[str, int]] = []
+        self._words: List[Tuple[str, int]] = []
+        self._texts: List[str] = []
+        self._initials: List[str] = []
+        self._grams: Dict[str, List[int]] = defaultdict(list)
+        self._initial_grams: Dict[str, List[int]] = defaultdict(list)
+        self._exact: Dict[str, int] = {}
+
+        seen = set()
+        for item in instruments:
+            symbol = normalize(item.get("symbol", ""))
+            if not symbol or symbol in seen:
+                continue
+            seen.add(symbol)
+            i = len(self.instruments)
+            self.instruments.append(item)
+
+            name = item.get("name") or ""
+            self._exact[symbol] = i
+            self._symbols.append((symbol, i))
+            self._words.extend((word, i) for word in set(_NON_WORD.split(normalize(name))) if word)
+
+            text = compact(symbol) + "\x00" + compact(name)
+            self._texts.append(text)
+            for gram in _grams(text):
+                self._grams[gram].append(i)
+
+            initials = choseong(normalize(name))
+            self._initials.append(initials)
+            for gram in _grams(initials):
+                self._initial_grams[gram].append(i)
+
+        self._symbols.sort()
+        self._words.sort()
+
+    def __len__(self):
+        return len(self.instruments)
+
+    @staticmethod
+    def _prefixed(entries: List[Tuple[str, int]], prefix: str) -> Iterable[int]:
+        for pos in range(bisect.bisect_left(entries, (prefix,)), len(entries)):
+            key, i = entries[pos]
+            if not key.startswith(prefix):
+                break
+            yield i
+
+    @staticmethod
+    def _candidates(postings: Dict[str, List[int]], query: str) -> List[int]:
+        lists = [postings.get(gram) for gram in (_grams(query) if len(query) > 1 else {query})]
+        if not lists or any(not p for p in lists):
+            return []
+        lists.sort(key=len)
+        result = set(lists[0])
+        for p in lists[1:]:
+            result.intersection_update(p)
+            if not result:
+                break
+        return sorted(result)
+
+    def search(self, q: str, limit: int = 10) -> List[dict]:
+        query = normalize(q)
+        if not query:
+            return []
+
+        ranked: Dict[int, Tuple[int, int, int]] = {}
+
+        def add(i: int, tier: int):
+            best = ranked.get(i)
+            rank = (tier, len(self.instruments[i]["symbol"]), i)
+            if best is None or rank < best:
+                ranked[i] = rank
+
+        if query in self._exact:
+            add(self._exact[query], EXACT)
+        for i in self._prefixed(self._symbols, query):
+            add(i, SYMBOL_PREFIX)
+        if len(ranked) < limit:
+            # Every hit is ranked before the cut: alphabetical order says nothing about rank within the tier
+            for i in self._prefixed(self._words, query):
+                add(i, NAME_PREFIX)
+
+        if len(ranked) < limit:
+            needle = compact(query)
+            if needle and all(ch in _CHOSEONG_SET for ch in needle):
+                for i in self._candidates(self._initial_grams, needle):
+                    if needle in self._initials[i]:
+                        add(i, NAME_PREFIX if self._initials[i].startswith(needle) else SUBSTRING)
+            elif needle:
+                for i in self._candidates(self._grams, needle):
+                    if needle in self._texts[i]:
+                        add(i, SUBSTRING)
+
+        best = heapq.nsmallest(limit, ranked.values())
+        return [self.instruments[i] for _, _, i in best]
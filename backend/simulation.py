@@ -0,0 +1,57 @@
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+# Minutes per base bar for the intervals we can extrapolate 1-minute candles from
+BASE_INTERVAL_MINUTES = {"2m": 2, "5m": 5, "15m": 15, "30m": 30, "60m": 60, "90m": 90, "1h": 60}
+
+
+def simulate_minute_candles(hist: pd.DataFrame, steps: int = 60, seed: Optional[int] = None) -> pd.DataFrame:
+    """
+    Extrapolate `steps` synthetic 1-minute candles inside every base bar of hist.
+
+    Each base bar gets a noisy linear walk from its open to its close, clamped to
+    its high/low, plus wick and volume noise. Everything is drawn as one
+    (bars x steps) matrix so the cost is a handful of NumPy calls regardless of
+    length; pass seed for a reproducible path.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(hist)
+
+    bar_open = hist["Open"].to_numpy(dtype=float)[:, None]
+    bar_high = hist["High"].to_numpy(dtype=float)[:, None]
+    bar_low = hist["Low"].to_numpy(dtype=float)[:, None]
+    bar_close = hist["Close"].to_numpy(dtype=float)[:, None]
+    base_vol = (hist["Volume"].to_numpy(dtype=np.int64) // steps)[:, None]
+
+    # Linear interpolation with a random walk bounded by H/L; endpoints match the base bar
+    weights = np.linspace(0.0, 1.0, steps)[None, :]
+    noise_amplitude = (bar_high - bar_low) * 0.2
+    path = bar_open + (bar_close - bar_open) * weights + rng.normal(0.0, 1.0, (n, steps)) * noise_amplitude
+    path[:, 0] = bar_open[:, 0]
+    path[:, -1] = bar_close[:, 0]
+    path = np.clip(path, bar_low, bar_high)
+
+    # Each minute opens at the previous minute's close
+    m_close = path
+    m_open = np.empty_like(path)
+    m_open[:, 0] = path[:, 0]
+    m_open[:, 1:] = path[:, :-1]
+
+    wick_amplitude = noise_amplitude * 0.5
+    m_high = np.minimum(bar_high, np.maximum(m_open, m_close) + np.abs(rng.normal(0.0, 1.0, (n, steps))) * wick_amplitude)
+    m_low = np.maximum(bar_low, np.minimum(m_open, m_close) - np.abs(rng.normal(0.0, 1.0, (n, steps))) * wick_amplitude)
+    m_volume = base_vol + np.abs(rng.normal(0.0, 1.0, (n, steps)) * base_vol * 0.5).astype(np.int64)
+
+    index = pd.DatetimeIndex(np.repeat(hist.index, steps)) + pd.to_timedelta(np.tile(np.arange(steps), n), unit="min")
+    return pd.DataFrame(
+        {
+            "Open": m_open.ravel(),
+            "High": m_high.ravel(),
+            "Low": m_low.ravel(),
+            "Close": m_close.ravel(),
+            "Volume": m_volume.ravel(),
+        },
+        index=index,
+    )
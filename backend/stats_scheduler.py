@@ -0,0 +1,197 @@
+import asyncio
+import os
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from backend import indicators, market_data
+from backend.database import engine, upsert_insert
+from backend.models import StockDailyStat, Trade
+
+# Symbol universe: STATS_SYMBOLS plus (optionally) every symbol in the trade journal
+DEFAULT_SYMBOLS = "ES=F,AAPL,NVDA,TSLA"
+STATS_SYMBOLS = [s.strip().upper() for s in os.getenv("STATS_SYMBOLS", DEFAULT_SYMBOLS).split(",") if s.strip()]
+STATS_INCLUDE_TRADED = os.getenv("STATS_INCLUDE_TRADED", "1").lower() in ("1", "true", "yes")
+
+BATCH_SIZE = int(os.getenv("STATS_BATCH_SIZE", "50"))  # Symbols per bulk download
+CONCURRENCY = int(os.getenv("STATS_CONCURRENCY", "4"))  # Batches in flight
+BACKFILL_DAYS = int(os.getenv("STATS_BACKFILL_DAYS", "30"))  # Window recorded for symbols never seen before
+MAX_BACKFILL_DAYS = int(os.getenv("STATS_MAX_BACKFILL_DAYS", "730"))
+SETTLE_MINUTES = int(os.getenv("STATS_SETTLE_MINUTES", "20"))  # Wait after the close for final daily bars
+
+ATR_PERIOD = 14
+# Calendar days fetched before the first missing day: ~140 sessions (10 ATR periods),
+# after which the Wilder ATR seed weighs (13/14)^140 < 0.01% and rounds away
+WARMUP_DAYS = 200
+PERIOD_STEP_DAYS = 30  # Fetch windows are rounded up to this, so batches share cache entries
+
+# Regular session close per market, in exchange time
+MARKETS: Dict[str, Tuple[ZoneInfo, time]] = {
+    "US": (ZoneInfo("America/New_York"), time(16, 0)),
+    "KRX": (ZoneInfo("Asia/Seoul"), time(15, 30)),
+}
+
+
+def market_of(symbol: str) -> str:
+    return "KRX" if symbol.endswith((".KS", ".KQ")) else "US"
+
+
+def tracked_symbols() -> List[str]:
+    """Configured symbols plus traded ones, in a stable order."""
+    symbols = list(STATS_SYMBOLS)
+    if STATS_INCLUDE_TRADED:
+        with Session(engine) as session:
+            symbols += session.exec(select(Trade.stock_name).distinct()).all()
+    return list(dict.fromkeys(s.strip().upper() for s in symbols if s and s.strip()))
+
+
+def next_run(now: Optional[datetime] = None) -> Tuple[str, datetime]:
+    """(market, UTC time) of the next post-close run across MARKETS; weekends are skipped."""
+    now = now or datetime.now(timezone.utc)
+    runs = []
+    for market, (tz, close) in MARKETS.items():
+        local = now.astimezone(tz)
+        day = local.date()
+        while True:
+            at = datetime.combine(day, close, tzinfo=tz) + timedelta(minutes=SETTLE_MINUTES)
+            if day.weekday() < 5 and at > local:
+                break
+            day += timedelta(days=1)
+        runs.append((at.astimezone(timezone.utc), market))
+    at, market = min(runs)
+    return market, at
+
+
+def last_recorded(symbols: List[str]) -> Dict[str, date]:
+    """Latest recorded day per symbol (one grouped query over the (symbol, date) index)."""
+    with Session(engine) as session:
+        rows = session.exec(
+            select(StockDailyStat.symbol, func.max(StockDailyStat.date))
+            .where(StockDailyStat.symbol.in_(symbols))
+            .group_by(StockDailyStat.symbol)
+        ).all()
+    return {symbol: last.date() for symbol, last in rows if last is not None}
+
+
+def _period_for(days: int) -> str:
+    return f"{-(-days // PERIOD_STEP_DAYS) * PERIOD_STEP_DAYS}d"
+
+
+def session_date(symbol: str, now: Optional[datetime] = None) -> date:
+    """Today's date at the symbol's exchange."""
+    tz, _ = MARKETS[market_of(symbol)]
+    return (now or datetime.now(timezone.utc)).astimezone(tz).date()
+
+
+def _missing_rows(symbol: str, hist: pd.DataFrame, since: date, today: date, recorded_at: datetime) -> List[dict]:
+    """
+    StockDailyStat rows for every bar dated `since`..`today` in exchange time.
+    The last recorded day is rewritten too, in case it was stored mid-session.
+    """
+    hist = hist.dropna(subset=["Open", "High", "Low", "Close"])
+    if hist.empty:
+        return []
+    high, low, close = (hist[c].to_numpy(dtype=float) for c in ("High", "Low", "Close"))
+    atr = indicators.wilder_atr(high, low, close, ATR_PERIOD)
+    prev_close = np.concatenate(([np.nan], close[:-1]))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change_percent = np.where(prev_close > 0, (close - prev_close) / prev_close * 100, 0.0)
+    volume = hist["Volume"].fillna(0).to_numpy()
+    opens = hist["Open"].to_numpy(dtype=float)
+
+    # Bulk downloads across exchanges come back on a UTC index; date bars where they traded
+    index = hist.index if hist.index.tz is not None else hist.index.tz_localize("UTC")
+    days = index.tz_convert(MARKETS[market_of(symbol)][0]).date
+
+    rows = []
+    for i, day in enumerate(days):
+        if day < since or day > today:
+            continue
+        rows.append({
+            "symbol": symbol,
+            "date": datetime.combine(day, time.min),
+            "price": round(float(close[i]), 2),
+            "change_percent": round(float(np.nan_to_num(change_percent[i])), 2),
+            "volume": int(volume[i]),
+            "atr": round(float(atr[i]), 2) if i >= ATR_PERIOD - 1 else None,
+            "open": round(float(opens[i]), 2),
+            "high": round(float(high[i]), 2),
+            "low": round(float(low[i]), 2),
+            "recorded_at": recorded_at,
+        })
+    return rows
+
+
+def upsert_daily_stats(rows: List[dict]) -> int:
+    """One bulk insert; a re-recorded (symbol, date) replaces the stored values (e.g. a partial session bar)."""
+    if not rows:
+        return 0
+    stmt = upsert_insert(StockDailyStat)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["symbol", "date"],
+        set_={col: stmt.excluded[col] for col in
+              ("price", "change_percent", "volume", "atr", "open", "high", "low", "recorded_at")},
+    )
+    with Session(engine) as session:
+        session.execute(stmt, rows)
+        session.commit()
+    return len(rows)
+
+
+async def _collect_batch(symbols: List[str], last: Dict[str, date], now: datetime, recorded_at: datetime) -> List[dict]:
+    today = {symbol: session_date(symbol, now) for symbol in symbols}
+    since = {
+        symbol: max(
+            last.get(symbol, today[symbol] - timedelta(days=BACKFILL_DAYS)),
+            today[symbol] - timedelta(days=MAX_BACKFILL_DAYS),
+        )
+        for symbol in symbols
+    }
+    # From the earliest missing day minus the ATR warm-up, not a fixed multi-year window
+    days = max((today[symbol] - since[symbol]).days for symbol in symbols) + WARMUP_DAYS
+    frames = await market_data.get_history_many(symbols, period=_period_for(days), interval="1d")
+
+    def build() -> List[dict]:
+        rows = []
+        for symbol in symbols:
+            hist = frames.get(symbol)
+            if hist is not None and not hist.empty:
+                rows.extend(_missing_rows(symbol, hist, since[symbol], today[symbol], recorded_at))
+        return rows
+
+    return await asyncio.to_thread(build)
+
+
+async def record_daily_stats(symbols: Iterable[str]) -> int:
+    """
+    Fill every missing trading day for symbols since each one's last recorded
+    day: batches are fetched concurrently (one bulk download each) and all
+    rows are written in a single upsert. Returns the number of rows written.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    if not symbols:
+        return 0
+    last = await asyncio.to_thread(last_recorded, symbols)
+    now = datetime.now(timezone.utc)
+    recorded_at = now.replace(tzinfo=None)
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def run(batch: List[str]) -> List[dict]:
+        async with semaphore:
+            try:
+                return await _collect_batch(batch, last, now, recorded_at)
+            except Exception as e:
+                print(f"⚠️ [ATR Task] Batch of {len(batch)} failed ({batch[0]}..): {e}")
+                return []
+
+    batches = [symbols[i:i + BATCH_SIZE] for i in range(0, len(symbols), BATCH_SIZE)]
+    rows = [row for batch_rows in await asyncio.gather(*(run(batch) for batch in batches)) for row in batch_rows]
+    written = await asyncio.to_thread(upsert_daily_stats, rows)
+    filled = len({row["symbol"] for row in rows})
+    print(f"✅ [ATR Task] Recorded {written} daily stats across {filled}/{len(symbols)} symbols")
+    return written
@@ -0,0 +1,146 @@
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel
+
+from backend.indicators import ema, wilder_atr
+
+
+class StrategyConfig(BaseModel):
+    """Anti-Gravity parameters, mirroring DEFAULT_CONFIG in frontend/app/utils/strategy.ts"""
+    atr_period: int = 14
+    entry_multiplier: float = 1.0
+    entry_2_multiplier: float = 1.5  # Pyramiding level
+    chandelier_multiplier: float = 3.0
+    stop_loss_multiplier: float = 1.0
+    volume_threshold: float = 1.1
+    ema_trend_period: int = 200  # Macro Trend
+    ema_fast_period: int = 50  # Signal Verification
+    volume_ema_fast: int = 5
+    volume_ema_slow: int = 20
+    profit_take_multiplier: float = 2.5
+
+
+DEFAULT_CONFIG = StrategyConfig()
+
+MIN_HISTORY = 200  # Bars needed before the strategy emits signals (stable EMA200)
+SLOPE_LOOKBACK = 5  # Trend EMA slope is measured over this many bars
+CHANNEL_PERIOD = 20  # SMA centerline
+CHANDELIER_LOOKBACK = 22
+
+
+def compute_signal_frame(hist: pd.DataFrame, config: StrategyConfig = DEFAULT_CONFIG) -> pd.DataFrame:
+    """
+    Evaluate AntiGravityStrategy.generateSignal for every bar at once.
+
+    Row i holds what the frontend strategy would compute on candles[0..i]:
+    indicators, regime, and the raw entry/exit conditions. Conditions that
+    depend on the open position (pyramiding vs. first entry) are resolved by
+    the caller's position state machine.
+    """
+    high = hist["High"].to_numpy(dtype=float)
+    low = hist["Low"].to_numpy(dtype=float)
+    close = hist["Close"].to_numpy(dtype=float)
+    volume = hist["Volume"].to_numpy(dtype=float)
+    n = len(close)
+
+    atr = wilder_atr(high, low, close, config.atr_period)
+    ema_fast = ema(close, config.ema_fast_period)
+    ema_trend = ema(close, config.ema_trend_period)
+
+    # Regime from the % change of the trend EMA over the last few bars
+    ema_trend_prev = np.zeros(n)
+    ema_trend_prev[SLOPE_LOOKBACK:] = ema_trend[:-SLOPE_LOOKBACK]
+    has_slope = np.arange(n) >= config.ema_trend_period + SLOPE_LOOKBACK - 1
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = np.where(has_slope, (ema_trend - ema_trend_prev) / ema_trend_prev * 100, 0.0)
+    # Without enough history for a slope, the strategy reports no trend EMA at all
+    ema_trend = np.where(has_slope, ema_trend, 0.0)
+    regime = np.where(slope > 0.05, "BULL", np.where(slope < -0.05, "BEAR", "RANGING"))
+    regime_confidence = np.minimum(1.0, np.abs(slope) / 0.2)
+
+    # Adaptive sub-daily scaling: widen stops and shrink targets when ATR < 0.4% of price
+    with np.errstate(divide="ignore", invalid="ignore"):
+        relative_vol = atr / close
+        time_frame_scale = np.where(
+            (relative_vol > 0) & (relative_vol < 0.004), np.minimum(2.0, 0.004 / relative_vol), 1.0
+        )
+    stop_loss_multiplier = config.stop_loss_multiplier * time_frame_scale
+    profit_take_multiplier = np.where(
+        time_frame_scale != 1.0,
+        np.maximum(1.2, config.profit_take_multiplier / time_frame_scale),
+        config.profit_take_multiplier,
+    )
+    adaptive_pt = np.where(regime_confidence > 0.7, profit_take_multiplier * 1.5, profit_take_multiplier)
+
+    is_bullish = (close > ema_trend) & (close > ema_fast) & (ema_fast > ema_trend)
+    is_bearish = (close < ema_trend) & (close < ema_fast) & (ema_fast < ema_trend)
+
+    vol_fast = ema(volume, config.volume_ema_fast)
+    vol_slow = ema(volume, config.volume_ema_slow)
+    is_volume_trending = vol_fast > vol_slow
+    is_volume_spike = volume > vol_slow * max(config.volume_threshold, 1.5)
+
+    # Ranging markets need a wider breakout before entering
+    ranging_scale = np.where(regime == "RANGING", 1.5, 1.0)
+    entry_1 = config.entry_multiplier * ranging_scale
+    entry_2 = config.entry_2_multiplier * ranging_scale
+
+    # Minimum expected value: targets under 3 points are eaten by round-trip costs
+    is_ev_viable = atr * adaptive_pt > 3.0
+
+    sma20 = pd.Series(close).rolling(CHANNEL_PERIOD).mean().to_numpy()
+    confirmed = is_volume_trending & is_volume_spike & is_ev_viable
+    long_1 = (close > sma20 + atr * entry_1) & confirmed & is_bullish
+    long_2 = (close > sma20 + atr * entry_2) & confirmed & is_bullish
+    short_1 = (close < sma20 - atr * entry_1) & confirmed & is_bearish
+    short_2 = (close < sma20 - atr * entry_2) & confirmed & is_bearish
+
+    recent_high = pd.Series(high).rolling(CHANDELIER_LOOKBACK, min_periods=1).max().to_numpy()
+    recent_low = pd.Series(low).rolling(CHANDELIER_LOOKBACK, min_periods=1).min().to_numpy()
+    chandelier_long = recent_high - atr * config.chandelier_multiplier
+    chandelier_short = recent_low + atr * config.chandelier_multiplier
+
+    return pd.DataFrame(
+        {
+            "close": close,
+            "atr": atr,
+            "ema_fast": ema_fast,
+            "ema_trend": ema_trend,
+            "slope": slope,
+            "regime": regime,
+            "regime_confidence": regime_confidence,
+            "sma20": sma20,
+            "stop_loss_multiplier": stop_loss_multiplier,
+            "adaptive_pt": adaptive_pt,
+            "is_bullish": is_bullish,
+            "is_bearish": is_bearish,
+            "is_volume_trending": is_volume_trending,
+            "long_1": long_1,
+            "long_2": long_2,
+            "short_1": short_1,
+            "short_2": short_2,
+            "chandelier_long": chandelier_long,
+            "chandelier_short": chandelier_short,
+            "long_exit": close < chandelier_long,
+            "short_exit": close > chandelier_short,
+            "ready": np.arange(n) >= MIN_HISTORY - 1,
+        },
+        index=hist.index,
+    )
+
+
+def resolve_signal(long_1, long_2, short_1, short_2, long_exit, short_exit, current_weight: float = 0) -> str:
+    """Signal differentiation for one bar given the current position weight."""
+    if long_2 and 0 < current_weight < 1.0:
+        return "PYRAMID_BUY"
+    if long_1 and current_weight == 0:
+        return "STRONG_BUY"
+    if short_2 and 0 < current_weight < 1.0:
+        return "PYRAMID_SELL"
+    if short_1 and current_weight == 0:
+        return "STRONG_SELL"
+    if long_exit:
+        return "EXIT_LONG"
+    if short_exit:
+        return "EXIT_SHORT"
+    return "HOLD"
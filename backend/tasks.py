@@ -1,109 +1,88 @@
 import asyncio
-import yfinance as yf
-import pandas as pd
-from datetime import datetime, time
-from sqlmodel import Session, select
-from backend.ws_manager import manager
-from backend.database import engine
-from backend.models import StockDailyStat
+from datetime import datetime, timezone
+import time
+from backend import cluster, indicator_engine, market_data, metrics, providers, stats_scheduler, upstream
 
 async def auto_record_daily_stats():
-    """Background task to record daily ATR and price stats for key symbols"""
-    symbols = ['ES=F', 'AAPL', 'NVDA', 'TSLA']
-    print(f"🕒 Starting ATR Persistence task for: {symbols}")
-    
+    """
+    Background task recording daily price/ATR stats for the tracked universe.
+    Catches up on startup (backfilling days missed while down), then runs
+    shortly after each US/KRX close for that market's symbols.
+    """
+    symbols = await asyncio.to_thread(stats_scheduler.tracked_symbols)
+    print(f"🕒 Starting ATR Persistence task for {len(symbols)} symbols")
+    market = None
+
     while True:
         try:
-            for symbol in symbols:
-                # 1. Fetch 30d history for ATR calculation
-                ticker = yf.Ticker(symbol)
-                hist = ticker.history(period="30d")
-                if hist.empty:
-                    continue
-                
-                # 2. Calculate ATR(14) using Wilder's Smoothing (EMA with alpha = 1/period)
-                hist['HL'] = hist['High'] - hist['Low']
-                hist['HCp'] = abs(hist['High'] - hist['Close'].shift(1))
-                hist['LCp'] = abs(hist['Low'] - hist['Close'].shift(1))
-                hist['TR'] = hist[['HL', 'HCp', 'LCp']].max(axis=1)
-                
-                # Wilder's Smoothing: ewm with alpha=1/14 is equivalent to Wilder's ATR math
-                atr_series = hist['TR'].ewm(alpha=1/14, adjust=False).mean()
-                atr = atr_series.iloc[-1]
-                
-                last_item = hist.iloc[-1]
-                date_only = last_item.name.date()
-                
-                # 3. Check for existing record for today (avoid duplicates)
-                with Session(engine) as session:
-                    start_of_day = datetime.combine(date_only, time.min)
-                    end_of_day = datetime.combine(date_only, time.max)
-                    
-                    existing = session.exec(
-                        select(StockDailyStat)
-                        .where(StockDailyStat.symbol == symbol)
-                        .where(StockDailyStat.date >= start_of_day)
-                        .where(StockDailyStat.date <= end_of_day)
-                    ).first()
-                    
-                    if not existing:
-                        change = last_item['Close'] - hist.iloc[-2]['Close'] if len(hist) > 1 else 0
-                        change_percent = (change / hist.iloc[-2]['Close'] * 100) if len(hist) > 1 and hist.iloc[-2]['Close'] != 0 else 0
-                        
-                        stat = StockDailyStat(
-                            symbol=symbol,
-                            date=start_of_day,
-                            price=round(float(last_item['Close']), 2),
-                            change_percent=round(float(change_percent), 2),
-                            volume=int(last_item['Volume']),
-                            atr=round(float(atr), 2) if not pd.isna(atr) else None,
-                            open=round(float(last_item['Open']), 2),
-                            high=round(float(last_item['High']), 2),
-                            low=round(float(last_item['Low']), 2)
-                        )
-                        session.add(stat)
-                        session.commit()
-                        print(f"✅ [ATR Task] Recorded stats for {symbol} on {date_only}")
-                
-            # Sleep for 12 hours before next check
-            await asyncio.sleep(12 * 3600)
+            if market is not None:
+                symbols = [
+                    s for s in await asyncio.to_thread(stats_scheduler.tracked_symbols)
+                    if stats_scheduler.market_of(s) == market
+                ]
+            with metrics.track_task("record_daily_stats"):
+                await stats_scheduler.record_daily_stats(symbols)
+
+            market, at = stats_scheduler.next_run()
+            print(f"🕒 [ATR Task] Next {market} run at {at.isoformat()}")
+            await asyncio.sleep(max(0.0, (at - datetime.now(timezone.utc)).total_seconds()))
         except Exception as e:
             print(f"❌ [ATR Task] Error: {e}")
             await asyncio.sleep(300) # Retry after 5 mins on error
 
+QUOTE_POLL_INTERVAL = 5  # Seconds between poll cycles
+
+async def _refresh_indicators(symbols):
+    try:
+        with metrics.track_task("refresh_indicators"):
+            await indicator_engine.engine.ensure(symbols, "1d")
+    except Exception as e:
+        print(f"⚠️ [Market Feed] Indicator refresh failed: {e}")
+
 async def broadcast_market_updates():
-    """Background task to fetch prices and broadcast via WebSocket"""
+    """Background task to poll quotes for every subscribed symbol (across all workers) and push them via WebSocket"""
+    refresh = None
     while True:
-        if not manager.active_connections:
-            await asyncio.sleep(5)
+        symbols = cluster.subscribed_symbols()
+        if not symbols:
+            await asyncio.sleep(QUOTE_POLL_INTERVAL)
             continue
-            
-        # Symbols to monitor
-        symbols = ['005930.KS', '000660.KS', 'AAPL', 'NVDA', 'TSLA']
-        
-        for symbol in symbols:
-            if not manager.active_connections: break
-            try:
-                loop = asyncio.get_event_loop()
-                def fetch_fast():
-                    ticker = yf.Ticker(symbol)
-                    return ticker.fast_info
-                
-                info = await loop.run_in_executor(None, fetch_fast)
-                
-                update = {
-                    "type": "stock_update",
-                    "symbol": symbol,
-                    "price": round(float(info['lastPrice']), 2),
-                    "change": round(float(info['lastPrice'] - info['previousClose']), 2) if 'previousClose' in info else 0,
-                    "change_percent": round(float((info['lastPrice'] - info['previousClose']) / info['previousClose'] * 100), 2) if 'previousClose' in info and info['previousClose'] != 0 else 0,
-                    "timestamp": datetime.utcnow().isoformat()
-                }
-                await manager.broadcast(update)
-                await asyncio.sleep(1) # Rate limiting
-            except Exception as e:
-                if "rate limit" in str(e).lower():
-                    await asyncio.sleep(10)
-                continue
-        
-        await asyncio.sleep(5)
+
+        # Seed/extend daily indicator states in the background so a slow seed never delays quotes
+        if refresh is None or refresh.done():
+            refresh = asyncio.create_task(_refresh_indicators(sorted(symbols)))
+
+        rate_limited = False
+        started = time.perf_counter()
+        try:
+            quotes, errors = await market_data.get_quotes(sorted(symbols))
+            # Ticks advance the forming daily bar; indicator fields ride along as quote fields
+            for symbol, values in indicator_engine.engine.on_quotes(quotes).items():
+                quotes[symbol] = {**quotes[symbol], **values}
+            await cluster.publish_quotes(quotes)
+            rate_limited = upstream.breaker.state != "closed" or any(upstream.is_rate_limit(e) for e in errors.values())
+            if rate_limited:
+                print("⚠️ [Market Feed] Upstream rate limited; serving cached quotes and backing off")
+        except Exception as e:
+            print(f"❌ [Market Feed] Error: {e}")
+        metrics.market_poll_latency.observe(time.perf_counter() - started)
+
+        await asyncio.sleep(10 if rate_limited else QUOTE_POLL_INTERVAL)
+
+async def replay_market_feed():
+    """Background task streaming a recording's ticks into the WebSocket feed at MARKET_DATA_REPLAY_SPEED x real time"""
+    provider = providers.get_provider()
+    speed = providers.REPLAY_SPEED
+    print(f"▶️ [Replay] Streaming {provider.directory} at {speed:g}x")
+    try:
+        async for ticks in provider.ticks(speed):
+            quotes = {}
+            for symbol, tick in ticks.items():
+                quotes[symbol] = market_data.quote_fields(tick["price"], tick["previous_close"])
+                market_data.quote_cache.set(symbol, quotes[symbol])  # REST reads see the replay clock too
+            for symbol, values in indicator_engine.engine.on_quotes(quotes).items():
+                quotes[symbol] = {**quotes[symbol], **values}
+            await cluster.publish_quotes(quotes)
+    except Exception as e:
+        print(f"❌ [Replay] Error: {e}")
+    print("⏹️ [Replay] Recording finished")
@@ -0,0 +1,172 @@
+"""
+Instrument universe (S&P 500 plus KOSPI leaders) behind search and the
+screener.
+
+Boot loads the last good universe from a local JSON snapshot, which is
+instant and needs no network; a fresh checkout falls back to the seed
+snapshot shipped next to this module. A background task refreshes it from the
+upstream list once the snapshot is older than UNIVERSE_MAX_AGE_HOURS and
+rewrites the snapshot atomically. In cluster mode one worker fetches and
+the others pick up the new file.
+"""
+
+import asyncio
+import json
+import os
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from backend import cluster
+
+SNAPSHOT_VERSION = 1  # Bump when the snapshot layout changes; older files are ignored
+_HERE = os.path.dirname(os.path.abspath(__file__))
+UNIVERSE_SNAPSHOT = os.getenv("UNIVERSE_SNAPSHOT", os.path.join(_HERE, "universe_snapshot.json"))
+SEED_SNAPSHOT = os.path.join(_HERE, "universe_seed.json")  # Shipped with the code; refreshed past on first fetch
+UNIVERSE_MAX_AGE_HOURS = float(os.getenv("UNIVERSE_MAX_AGE_HOURS", "24"))
+UNIVERSE_RETRY_SECONDS = 900  # Wait after a failed refresh
+SP500_URL = "https://gist.githubusercontent.com/princefishthrower/30ab8a532b4b281ce5bfe386e1df7a29/raw/sandp500.json"
+
+KOSPI_TOP_10 = [
+    {"symbol": "005930.KS", "name": "Samsung Electronics (삼성전자)", "exchange": "KRX", "type": "EQUITY"},
+    {"symbol": "000660.KS", "name": "SK Hynix (SK하이닉스)", "exchange": "KRX", "type": "EQUITY"},
+    {"symbol": "373220.KS", "name": "LG Energy Solution (LG에너지솔루션)", "exchange": "KRX", "type": "EQUITY"},
+    {"symbol": "207940.KS", "name": "Samsung Biologics (삼성바이오로직스)", "exchange": "KRX", "type": "EQUITY"},
+    {"symbol": "005380.KS", "name": "Hyundai Motor (현대자동차)", "exchange": "KRX", "type": "EQUITY"},
+    {"symbol": "005935.KS", "name": "Samsung Electronics Pref (삼성전자우)", "exchange": "KRX", "type": "EQUITY"},
+    {"symbol": "000270.KS", "name": "Kia (기아)", "exchange": "KRX", "type": "EQUITY"},
+    {"symbol": "068270.KS", "name": "Celltrion (셀트리온)", "exchange": "KRX", "type": "EQUITY"},
+    {"symbol": "105560.KS", "name": "KB Financial Group (KB금융)", "exchange": "KRX", "type": "EQUITY"},
+    {"symbol": "005490.KS", "name": "POSCO Holdings (POSCO홀딩스)", "exchange": "KRX", "type": "EQUITY"},
+]
+
+# What this process currently serves
+state = {"source": "builtin", "fetched_at": None, "loaded_mtime": None, "last_error": None}
+
+
+def _read_snapshot(path: str) -> Optional[dict]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            snapshot = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"⚠️ [Universe] Unreadable snapshot {path}: {e}")
+        return None
+    if snapshot.get("version") != SNAPSHOT_VERSION or not snapshot.get("instruments"):
+        print(f"⚠️ [Universe] Ignoring snapshot {path} (version {snapshot.get('version')})")
+        return None
+    return snapshot
+
+
+def _write_snapshot(instruments: List[dict], fetched_at: datetime):
+    directory = os.path.dirname(os.path.abspath(UNIVERSE_SNAPSHOT))
+    os.makedirs(directory, exist_ok=True)
+    temp = f"{UNIVERSE_SNAPSHOT}.{os.getpid()}.tmp"
+    with open(temp, "w", encoding="utf-8") as f:
+        json.dump(
+            {"version": SNAPSHOT_VERSION, "fetched_at": fetched_at.isoformat(), "source": SP500_URL, "instruments": instruments},
+            f, ensure_ascii=False,
+        )
+    os.replace(temp, UNIVERSE_SNAPSHOT)  # Readers never see a half-written file
+
+
+def _snapshot_mtime() -> Optional[float]:
+    try:
+        return os.path.getmtime(UNIVERSE_SNAPSHOT)
+    except OSError:
+        return None
+
+
+def load() -> List[dict]:
+    """
+    The universe to boot with: the local snapshot if there is a usable one,
+    else the shipped seed, else (seed missing or corrupt) the KOSPI list alone.
+    """
+    snapshot = _read_snapshot(UNIVERSE_SNAPSHOT)
+    if snapshot is not None:
+        state.update(source="snapshot", fetched_at=snapshot["fetched_at"], loaded_mtime=_snapshot_mtime())
+        return snapshot["instruments"]
+    seed = _read_snapshot(SEED_SNAPSHOT)
+    if seed is not None:
+        state.update(source="seed", fetched_at=seed["fetched_at"], loaded_mtime=None)
+        return seed["instruments"]
+    print("⚠️ [Universe] No snapshot or seed; search only covers the built-in KOSPI list")
+    state.update(source="builtin", fetched_at=None, loaded_mtime=None)
+    return list(KOSPI_TOP_10)
+
+
+async def _fetch() -> List[dict]:
+    import httpx  # Only the refresh needs an HTTP client
+
+    async with httpx.AsyncClient(timeout=15) as client:
+        response = await client.get(SP500_URL)
+        response.raise_for_status()
+        data = response.json()
+    sp500 = [
+        {"symbol": item.get("symbol"), "name": item.get("name"), "exchange": "S&P 500", "type": "EQUITY"}
+        for item in data.get("companies", [])
+        if item.get("symbol")
+    ]
+    if not sp500:
+        raise ValueError("Upstream list is empty")
+    return sp500 + KOSPI_TOP_10
+
+
+def _age() -> Optional[timedelta]:
+    if state["fetched_at"] is None:
+        return None
+    return datetime.utcnow() - datetime.fromisoformat(state["fetched_at"])
+
+
+async def refresh(apply) -> bool:
+    """
+    Bring the served universe up to date; `apply` installs a new instrument
+    list. Picks up a snapshot written by another worker, otherwise fetches
+    when the snapshot is missing or stale. Returns whether anything changed.
+    """
+    mtime = _snapshot_mtime()
+    if mtime is not None and mtime != state["loaded_mtime"]:
+        instruments = load()
+        if state["source"] == "snapshot":
+            apply(instruments)
+            print(f"🔄 [Universe] Loaded {len(instruments)} instruments from the refreshed snapshot")
+            return True
+
+    age = _age()
+    if age is not None and age < timedelta(hours=UNIVERSE_MAX_AGE_HOURS):
+        return False
+    with cluster.job_lock("universe") as acquired:
+        if not acquired:
+            return False  # Another worker is fetching; its snapshot is picked up next round
+        try:
+            instruments = await _fetch()
+        except Exception as e:
+            state["last_error"] = str(e)
+            print(f"⚠️ [Universe] Refresh failed, serving {state['source']} universe: {e}")
+            return False
+        fetched_at = datetime.utcnow()
+        await asyncio.to_thread(_write_snapshot, instruments, fetched_at)
+    state.update(source="snapshot", fetched_at=fetched_at.isoformat(), loaded_mtime=_snapshot_mtime(), last_error=None)
+    apply(instruments)
+    print(f"✅ [Universe] Refreshed {len(instruments)} instruments")
+    return True
+
+
+async def keep_fresh(apply):
+    """Background task: refresh right away if needed, then check periodically."""
+    while True:
+        try:
+            await refresh(apply)
+        except Exception as e:
+            print(f"❌ [Universe] Error: {e}")
+        await asyncio.sleep(UNIVERSE_RETRY_SECONDS if state["last_error"] else 3600)
+
+
+def stats() -> dict:
+    age = _age()
+    return {
+        "source": state["source"],
+        "fetched_at": state["fetched_at"],
+        "age_hours": round(age.total_seconds() / 3600, 1) if age is not None else None,
+        "last_error": state["last_error"],
+    }
@@ -0,0 +1,170 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from backend import metrics
+
+# Every blocking upstream (yfinance) call runs here, never on the event loop
+MAX_WORKERS = int(os.getenv("UPSTREAM_MAX_WORKERS", "8"))
+CALL_TIMEOUT = float(os.getenv("UPSTREAM_TIMEOUT", "20"))
+# Circuit breaker: this many rate-limit errors in a row open the circuit for COOLDOWN seconds
+FAILURE_THRESHOLD = int(os.getenv("UPSTREAM_FAILURE_THRESHOLD", "3"))
+COOLDOWN = float(os.getenv("UPSTREAM_COOLDOWN", "60"))
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="upstream")
+
+
+class UpstreamUnavailable(Exception):
+    """Upstream call not made (circuit open) or abandoned (timeout)."""
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def is_rate_limit(error: BaseException) -> bool:
+    message = str(error).lower()
+    return (
+        type(error).__name__ == "YFRateLimitError"
+        or "rate limit" in message
+        or "too many requests" in message
+        or "429" in message
+    )
+
+
+class CircuitBreaker:
+    """closed -> (repeated rate limits) -> open -> (cooldown) -> half-open probe -> closed/open"""
+
+    def __init__(self, threshold: int = FAILURE_THRESHOLD, cooldown: float = COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self.opened_at >= self.cooldown else "open"
+
+    def before_call(self):
+        with self._lock:
+            state = self.state
+            if state == "open" or (state == "half-open" and self.probing):
+                retry_after = max(0.0, self.cooldown - (time.monotonic() - self.opened_at))
+                raise UpstreamUnavailable("Upstream circuit open after repeated rate limits", retry_after)
+            if state == "half-open":
+                self.probing = True
+
+    def record(self, error: Optional[BaseException]):
+        with self._lock:
+            self.probing = False
+            if error is None or not is_rate_limit(error):
+                # Only rate limiting trips the circuit; other errors are the caller's problem
+                if error is None:
+                    self.failures = 0
+                    self.opened_at = None
+                return
+            self.failures += 1
+            if self.failures >= self.threshold or self.opened_at is not None:
+                if self.opened_at is None:
+                    print(f"⛔ [Upstream] Circuit opened after {self.failures} rate-limit errors")
+                self.opened_at = time.monotonic()
+
+
+breaker = CircuitBreaker()
+
+# Per call-kind counters (calls, errors, timeouts, rejected, total seconds)
+call_stats: Dict[str, Dict[str, float]] = {}
+
+
+def _count(kind: str, field: str, amount: float = 1):
+    stats = call_stats.setdefault(kind, {"calls": 0, "errors": 0, "timeouts": 0, "rejected": 0, "seconds": 0.0})
+    stats[field] += amount
+
+
+def _before_call(kind: str):
+    try:
+        breaker.before_call()
+    except UpstreamUnavailable:
+        _count(kind, "rejected")
+        metrics.upstream_calls.inc(kind=kind, outcome="rejected")
+        raise
+
+
+def call(kind: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Make a blocking provider call behind the circuit breaker, from code that
+    already runs on the upstream pool (the candle store). Raises
+    UpstreamUnavailable without calling fn while the circuit is open.
+    """
+    _before_call(kind)
+    started = time.monotonic()
+    _count(kind, "calls")
+    try:
+        result = fn(*args, **kwargs)
+    except Exception as e:
+        _count(kind, "errors")
+        metrics.upstream_calls.inc(kind=kind, outcome="rate_limited" if is_rate_limit(e) else "error")
+        breaker.record(e)
+        raise
+    finally:
+        elapsed = time.monotonic() - started
+        _count(kind, "seconds", elapsed)
+        metrics.upstream_latency.observe(elapsed, kind=kind)
+    metrics.upstream_calls.inc(kind=kind, outcome="ok")
+    breaker.record(None)
+    return result
+
+
+async def run(kind: str, fn: Callable[..., Any], *args, timeout: Optional[float] = None, guarded: bool = True, **kwargs) -> Any:
+    """
+    Run a blocking upstream call on the bounded upstream pool.
+
+    Raises UpstreamUnavailable without calling fn while the circuit is open,
+    or when the call exceeds its timeout (the worker finishes in the
+    background, but the caller is released). With guarded=False the breaker
+    is left to fn, which makes its provider calls through call(); give such
+    wrappers a kind of their own (store_*) so they aren't counted as provider calls.
+    """
+    if guarded:
+        _before_call(kind)
+
+    started = time.monotonic()
+    _count(kind, "calls")
+    future = _executor.submit(fn, *args, **kwargs)
+    try:
+        result = await asyncio.wait_for(asyncio.wrap_future(future), timeout or CALL_TIMEOUT)
+    except asyncio.TimeoutError:
+        _count(kind, "timeouts")
+        metrics.upstream_calls.inc(kind=kind, outcome="timeout")
+        if guarded:
+            breaker.record(TimeoutError())
+        raise UpstreamUnavailable(f"Upstream {kind} call timed out after {timeout or CALL_TIMEOUT:g}s")
+    except Exception as e:
+        _count(kind, "errors")
+        metrics.upstream_calls.inc(kind=kind, outcome="rate_limited" if is_rate_limit(e) else "error")
+        if guarded:
+            breaker.record(e)
+        raise
+    finally:
+        elapsed = time.monotonic() - started
+        _count(kind, "seconds", elapsed)
+        metrics.upstream_latency.observe(elapsed, kind=kind)
+    metrics.upstream_calls.inc(kind=kind, outcome="ok")
+    if guarded:
+        breaker.record(None)
+    return result
+
+
+def stats() -> dict:
+    return {
+        "max_workers": MAX_WORKERS,
+        "timeout": CALL_TIMEOUT,
+        "circuit": breaker.state,
+        "calls": call_stats,
+    }
@@ -1,30 +1,282 @@
 from fastapi import WebSocket
-from typing import Set
+from typing import Deque, Dict, Iterable, Optional, Set
+from collections import deque
+from datetime import datetime
 import json
 import asyncio
+import time
+
+from backend import metrics
+from backend.live_bars import LIVE_INTERVALS
+
+# Symbols streamed to clients that never send a subscribe message
+DEFAULT_SYMBOLS = ['005930.KS', '000660.KS', 'AAPL', 'NVDA', 'TSLA']
+MAX_SYMBOLS_PER_CLIENT = 200
+
+OUTBOX_SIZE = 64  # Messages queued per client before the oldest are dropped
+SEND_TIMEOUT = 5.0  # Seconds a single send may take before the client counts as stuck
+STUCK_AFTER = 30.0  # Seconds a client may keep its outbox full before it is disconnected
+
+class ClientConnection:
+    """
+    One socket with its own bounded outbox and writer task, so a slow client
+    only ever delays itself. Market updates still waiting in the outbox absorb
+    newer ticks instead of queueing behind them.
+    """
+    def __init__(self, websocket: WebSocket, manager: "ConnectionManager"):
+        self.websocket = websocket
+        self.manager = manager
+        # None until the client subscribes explicitly, then its own symbol set
+        self.symbols: Optional[Set[str]] = None
+        # Last quote fields queued for this client, per symbol, for delta updates
+        self.last_sent: Dict[str, dict] = {}
+        self.outbox: Deque[dict] = deque()
+        self.pending_update: Optional[dict] = None  # Queued market_update that can still absorb ticks
+        self.bar_intervals: Set[str] = set()  # Live bar intervals the client asked for
+        self.pending_bars: Optional[dict] = None  # Queued bar_update that can still absorb newer bars
+        self.dropped = 0
+        self.full_since: Optional[float] = None
+        self.ready = asyncio.Event()
+        self.writer = asyncio.create_task(self._write_loop())
+
+    def enqueue(self, message: dict):
+        if len(self.outbox) >= OUTBOX_SIZE:
+            oldest = self.outbox.popleft()
+            if oldest is self.pending_update:
+                self.pending_update = None
+            elif oldest is self.pending_bars:
+                self.pending_bars = None
+            if oldest.get("type") == "market_update":
+                # Its fields never reached the client; the next tick must send those symbols in full
+                for symbol in oldest["updates"]:
+                    self.last_sent.pop(symbol, None)
+            self.dropped += 1
+            self.manager.dropped_messages += 1
+            self.full_since = self.full_since or time.monotonic()
+            if time.monotonic() - self.full_since > STUCK_AFTER:
+                self.manager.drop_slow(self, reason="outbox full")
+                return
+        self.outbox.append(message)
+        self.ready.set()
+
+    def enqueue_update(self, updates: Dict[str, dict], timestamp: str):
+        if self.pending_update is not None:
+            # Merge into the tick that hasn't gone out yet; newer fields win
+            for symbol, fields in updates.items():
+                self.pending_update["updates"].setdefault(symbol, {}).update(fields)
+            self.pending_update["timestamp"] = timestamp
+            return
+        self.pending_update = {"type": "market_update", "timestamp": timestamp, "updates": updates}
+        self.enqueue(self.pending_update)
+
+    def enqueue_bars(self, closed: Dict[str, dict], updated: Dict[str, dict], timestamp: str):
+        if closed:
+            # Closed bars are final: never merged, never absorbed
+            self.enqueue({"type": "bar_close", "timestamp": timestamp, "bars": closed})
+            if self.pending_bars is not None:
+                # The queued forming bar must not arrive after its close
+                for symbol, intervals in list(self.pending_bars["bars"].items()):
+                    for interval in closed.get(symbol, {}):
+                        intervals.pop(interval, None)
+                    if not intervals:
+                        del self.pending_bars["bars"][symbol]
+                if not self.pending_bars["bars"]:
+                    # Nothing left to send; don't deliver an empty bar_update
+                    stale, self.pending_bars = self.pending_bars, None
+                    self.outbox = deque(m for m in self.outbox if m is not stale)
+        if not updated:
+            return
+        if self.pending_bars is not None and not closed:
+            for symbol, intervals in updated.items():
+                self.pending_bars["bars"].setdefault(symbol, {}).update(intervals)
+            self.pending_bars["timestamp"] = timestamp
+            return
+        self.pending_bars = {"type": "bar_update", "timestamp": timestamp, "bars": updated}
+        self.enqueue(self.pending_bars)
+
+    async def _write_loop(self):
+        try:
+            while True:
+                await self.ready.wait()
+                while self.outbox:
+                    message = self.outbox.popleft()
+                    if message is self.pending_update:
+                        self.pending_update = None
+                    elif message is self.pending_bars:
+                        self.pending_bars = None
+                    await asyncio.wait_for(self.websocket.send_text(json.dumps(message)), SEND_TIMEOUT)
+                self.full_since = None
+                self.ready.clear()
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            self.manager.drop_slow(self, reason="send timed out")
+        except Exception:
+            # Socket already gone; the receive loop will notice too
+            self.manager.disconnect(self.websocket)
+
+    async def close(self, code: int = 1013):
+        try:
+            await asyncio.wait_for(self.websocket.close(code=code), SEND_TIMEOUT)
+        except Exception:
+            pass
+
 
 class ConnectionManager:
     def __init__(self):
         self.active_connections: Set[WebSocket] = set()
+        self.clients: Dict[WebSocket, ClientConnection] = {}
+        self.dropped_messages = 0
+        self.slow_disconnects = 0
 
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
         self.active_connections.add(websocket)
+        self.clients[websocket] = ClientConnection(websocket, self)
 
     def disconnect(self, websocket: WebSocket):
         if websocket in self.active_connections:
             self.active_connections.remove(websocket)
+        client = self.clients.pop(websocket, None)
+        if client is not None and client.writer is not asyncio.current_task():
+            client.writer.cancel()
 
-    async def broadcast(self, message: dict):
-        if not self.active_connections:
+    def drop_slow(self, client: ClientConnection, reason: str):
+        """Disconnect a client that can't keep up, without waiting on it."""
+        if client.websocket not in self.clients:
             return
-        
-        message_json = json.dumps(message)
-        tasks = []
-        for connection in self.active_connections:
-            tasks.append(connection.send_text(message_json))
-        
-        if tasks:
-            await asyncio.gather(*tasks, return_exceptions=True)
+        print(f"⚠️ [WebSocket] Disconnecting slow client ({reason}, {len(client.outbox)} queued, {client.dropped} dropped)")
+        self.slow_disconnects += 1
+        self.disconnect(client.websocket)
+        asyncio.create_task(client.close())
+
+    def symbols_for(self, websocket: WebSocket) -> Set[str]:
+        client = self.clients.get(websocket)
+        if client is None:
+            return set()
+        return set(DEFAULT_SYMBOLS) if client.symbols is None else client.symbols
+
+    def subscribed_symbols(self) -> Set[str]:
+        """Union of every connected client's symbols; what the poller has to fetch."""
+        symbols: Set[str] = set()
+        for websocket in self.active_connections:
+            symbols |= self.symbols_for(websocket)
+        return symbols
+
+    def subscribe(self, websocket: WebSocket, symbols: Iterable[str]) -> Set[str]:
+        client = self.clients[websocket]
+        current = set(client.symbols or set()) | set(symbols)
+        if len(current) > MAX_SYMBOLS_PER_CLIENT:
+            raise ValueError(f"At most {MAX_SYMBOLS_PER_CLIENT} symbols per connection")
+        client.symbols = current
+        return current
+
+    def unsubscribe(self, websocket: WebSocket, symbols: Iterable[str]) -> Set[str]:
+        client = self.clients[websocket]
+        symbols = set(symbols)
+        client.symbols = self.symbols_for(websocket) - symbols
+        for symbol in symbols:
+            client.last_sent.pop(symbol, None)
+        return client.symbols
+
+    async def handle_message(self, websocket: WebSocket, raw: str):
+        """
+        Client protocol:
+          {"action": "subscribe", "symbols": ["AAPL", ...]}
+          {"action": "unsubscribe", "symbols": ["AAPL", ...]}
+        Either may carry "bars": ["1m", "5m", "15m"] to start/stop live bar
+        events (bar_update, bar_close) for the subscribed symbols. Both are
+        acknowledged with {"type": "subscriptions", "symbols": [...], "bars": [...]}.
+        """
+        client = self.clients.get(websocket)
+        if client is None:
+            return
+        try:
+            message = json.loads(raw)
+            action = message.get("action")
+            symbols, bars = message.get("symbols", []), message.get("bars", [])
+            if not isinstance(symbols, list) or not isinstance(bars, list):
+                raise ValueError("symbols and bars must be lists")
+            symbols = [s.strip().upper() for s in symbols if isinstance(s, str) and s.strip()]
+            bars = set(bars)
+            if bars - set(LIVE_INTERVALS):
+                raise ValueError(f"Live bars are available for {', '.join(LIVE_INTERVALS)}")
+            if action == "subscribe":
+                current = self.subscribe(websocket, symbols) if symbols or not bars else self.symbols_for(websocket)
+                client.bar_intervals |= bars
+            elif action == "unsubscribe":
+                current = self.unsubscribe(websocket, symbols) if symbols or not bars else self.symbols_for(websocket)
+                client.bar_intervals -= bars
+            else:
+                raise ValueError(f"Unknown action: {action}")
+        except (ValueError, AttributeError, TypeError) as e:
+            client.enqueue({"type": "error", "detail": str(e)})
+            return
+        client.enqueue({"type": "subscriptions", "symbols": sorted(current), "bars": sorted(client.bar_intervals)})
+
+    async def publish_quotes(self, quotes: Dict[str, dict]):
+        """
+        Queue each client one coalesced message for its own symbols, carrying
+        only the fields that changed since its previous message:
+          {"type": "market_update", "timestamp": ..., "updates": {"AAPL": {"price": ...}}}
+        """
+        started = time.perf_counter()
+        queued = 0
+        timestamp = datetime.utcnow().isoformat()
+        for websocket, client in list(self.clients.items()):
+            updates = {}
+            for symbol in self.symbols_for(websocket):
+                quote = quotes.get(symbol)
+                if quote is None:
+                    continue
+                previous = client.last_sent.get(symbol, {})
+                delta = {k: v for k, v in quote.items() if previous.get(k) != v}
+                if delta:
+                    updates[symbol] = delta
+                    client.last_sent[symbol] = {**previous, **delta}
+            if updates:
+                client.enqueue_update(updates, timestamp)
+                queued += 1
+        metrics.ws_publish_latency.observe(time.perf_counter() - started)
+        metrics.ws_publish_recipients.inc(queued)
+
+    async def publish_bars(self, closed: Dict[str, dict], updated: Dict[str, dict]):
+        """
+        Queue live bar events ({symbol: {interval: bar}}) for clients that asked
+        for those intervals:
+          {"type": "bar_close", "timestamp": ..., "bars": {"AAPL": {"1m": {"time": ..., "open": ...}}}}
+          {"type": "bar_update", ...} for the forming bars, merged while still queued
+        """
+        timestamp = datetime.utcnow().isoformat()
+        for websocket, client in list(self.clients.items()):
+            if not client.bar_intervals:
+                continue
+            wanted = self.symbols_for(websocket)
+
+            def pick(bars: Dict[str, dict]) -> Dict[str, dict]:
+                picked = {}
+                for symbol in wanted & bars.keys():
+                    intervals = {i: bar for i, bar in bars[symbol].items() if i in client.bar_intervals}
+                    if intervals:
+                        picked[symbol] = intervals
+                return picked
+
+            client_closed, client_updated = pick(closed), pick(updated)
+            if client_closed or client_updated:
+                client.enqueue_bars(client_closed, client_updated, timestamp)
+
+    async def broadcast(self, message: dict):
+        for client in list(self.clients.values()):
+            client.enqueue(message)
+
+    def stats(self) -> dict:
+        depths = [len(client.outbox) for client in self.clients.values()]
+        return {
+            "connections": len(self.clients),
+            "queued_messages": sum(depths),
+            "max_queue_depth": max(depths, default=0),
+            "dropped_messages": self.dropped_messages,
+            "slow_disconnects": self.slow_disconnects,
+        }
 
 manager = ConnectionManager()
@@ -5,6 +5,7 @@ import Link from 'next/link';
 import { components } from '../../types/api';
 import Calendar from '../components/Calendar';
 import { isSameDay } from 'date-fns';
+import { fetchAllPages } from '../utils/pagination';
 
 type DiaryEntry = components['schemas']['DiaryEntry'];
 
@@ -14,8 +15,7 @@ export default function DiaryListPage() {
     const [selectedDate, setSelectedDate] = useState<Date | null>(null);
 
     useEffect(() => {
-        fetch('http://localhost:8000/entries/')
-            .then((res) => res.json())
+        fetchAllPages<DiaryEntry>('http://localhost:8000/entries/')
             .then((data) => {
                 setEntries(data);
                 setLoading(false);
@@ -1,6 +1,7 @@
 import { useState, useEffect, useRef, useCallback } from 'react';
 import { API_BASE_URL, WS_BASE_URL } from '../utils/config';
 import { Candle } from '../utils/strategy';
+import { fetchAllPages } from '../utils/pagination';
 
 export interface StockStats {
     symbol: string;
@@ -12,6 +13,12 @@ export interface StockStats {
     high: number;
     low: number;
     open: number;
+    // Streamed with market_update once the backend indicator engine has the symbol
+    ema_fast?: number | null;
+    ema_trend?: number | null;
+    sma20?: number | null;
+    chandelier_long?: number | null;
+    chandelier_short?: number | null;
 }
 
 export const useMarketData = (fixedSymbols: string[], customSymbols: string[]) => {
@@ -24,22 +31,26 @@ export const useMarketData = (fixedSymbols: string[], customSymbols: string[]) =
 
     const fetchStats = useCallback(async (symbols: string[]) => {
         if (typeof window === 'undefined') return;
-        const results: Record<string, StockStats | null> = {};
+        const requested = symbols.filter(Boolean);
+        if (requested.length === 0) return;
+        let results: Record<string, StockStats | null> = {};
         let fetchError = null;
-        for (const symbol of symbols) {
-            if (!symbol) continue;
-            try {
-                const res = await fetch(`${API_BASE_URL}/stocks/stats/${symbol}`);
-                if (res.ok) {
-                    results[symbol] = await res.json();
-                } else {
-                    const errorText = await res.text();
-                    fetchError = `Backend Error (${res.status}): ${errorText || 'Internal Server Error'}`;
-                }
-            } catch (err) {
-                console.error(`Failed to fetch stats for ${symbol}:`, err);
-                fetchError = `Connection Failed: Please check if the backend server is running at ${API_BASE_URL}`;
+        try {
+            // One batch request backed by a single bulk download on the server
+            const res = await fetch(`${API_BASE_URL}/stocks/stats`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify(requested),
+            });
+            if (res.ok) {
+                results = await res.json();
+            } else {
+                const errorText = await res.text();
+                fetchError = `Backend Error (${res.status}): ${errorText || 'Internal Server Error'}`;
             }
+        } catch (err) {
+            console.error('Failed to fetch stats:', err);
+            fetchError = `Connection Failed: Please check if the backend server is running at ${API_BASE_URL}`;
         }
         setStocks(prev => ({ ...prev, ...results }));
         setError(fetchError);
@@ -48,11 +59,8 @@ export const useMarketData = (fixedSymbols: string[], customSymbols: string[]) =
     const fetchHistory = useCallback(async (symbol: string) => {
         if (typeof window === 'undefined') return;
         try {
-            const res = await fetch(`${API_BASE_URL}/stocks/history/${symbol}`);
-            if (res.ok) {
-                const data = await res.json();
-                setHistory(prev => ({ ...prev, [symbol]: data }));
-            }
+            const data = await fetchAllPages<any>(`${API_BASE_URL}/stocks/history/${symbol}`);
+            setHistory(prev => ({ ...prev, [symbol]: data }));
         } catch (err) {
             console.error(`Failed to fetch history for ${symbol}:`, err);
         }
@@ -91,25 +99,46 @@ export const useMarketData = (fixedSymbols: string[], customSymbols: string[]) =
     }, [fetchAllData, fixedSymbols, customSymbols, fetchStats]);
 
     // WebSocket Connection
+    const subscribedSymbols = useRef<string[]>([]);
+
+    const syncSubscriptions = useCallback(() => {
+        const socket = ws.current;
+        if (!socket || socket.readyState !== WebSocket.OPEN) return;
+        const wanted = [...fixedSymbols, ...customSymbols].filter(Boolean);
+        const removed = subscribedSymbols.current.filter(s => !wanted.includes(s));
+        if (removed.length > 0) {
+            socket.send(JSON.stringify({ action: 'unsubscribe', symbols: removed }));
+        }
+        socket.send(JSON.stringify({ action: 'subscribe', symbols: wanted }));
+        subscribedSymbols.current = wanted;
+    }, [fixedSymbols, customSymbols]);
+
+    const syncSubscriptionsRef = useRef(syncSubscriptions);
+    useEffect(() => {
+        syncSubscriptionsRef.current = syncSubscriptions;
+        syncSubscriptions();
+    }, [syncSubscriptions]);
+
     useEffect(() => {
         const connectWS = () => {
             const socket = new WebSocket(`${WS_BASE_URL}/ws/market`);
 
+            socket.onopen = () => {
+                subscribedSymbols.current = [];
+                syncSubscriptionsRef.current();
+            };
+
             socket.onmessage = (event) => {
                 const data = JSON.parse(event.data);
-                if (data.type === 'stock_update') {
+                if (data.type === 'market_update') {
+                    // One message per tick with only the changed fields of our symbols
                     setStocks(prev => {
-                        const current = prev[data.symbol];
-                        if (!current) return prev;
-                        return {
-                            ...prev,
-                            [data.symbol]: {
-                                ...current,
-                                price: data.price,
-                                change: data.change,
-                                change_percent: data.change_percent
-                            }
-                        };
+                        const next = { ...prev };
+                        for (const [symbol, fields] of Object.entries(data.updates as Record<string, Partial<StockStats>>)) {
+                            const current = prev[symbol];
+                            if (current) next[symbol] = { ...current, ...fields };
+                        }
+                        return next;
                     });
                 }
             };
@@ -1,9 +1,44 @@
-import { useState, useEffect, useCallback, useMemo } from 'react';
+import { useState, useEffect, useCallback } from 'react';
 import { components } from '../../types/api';
 import { API_BASE_URL } from '../utils/config';
+import { fetchAllPages } from '../utils/pagination';
 
 type Trade = components['schemas']['Trade'];
 
+interface PortfolioPosition {
+    symbol: string;
+    market: string;
+    quantity: number;
+    cost_basis: number;
+    realized_pnl: number;
+}
+
+interface MarketPnL {
+    buy_cost: number;
+    sell_proceeds: number;
+    turnover: number;
+    realized_pnl: number;
+    unrealized_pnl: number;
+}
+
+export interface PortfolioStats {
+    stats: { buyCosts: number; sellProceeds: number; turnover: number };
+    symbolMap: Record<string, { quantity: number; totalCost: number; realizedPL: number }>;
+    unrealizedPL: number;
+    totalRealizedPL: number;
+    netPL: number;
+    roi: number;
+}
+
+const EMPTY_PORTFOLIO: PortfolioStats = {
+    stats: { buyCosts: 0, sellProceeds: 0, turnover: 0 },
+    symbolMap: {},
+    unrealizedPL: 0,
+    totalRealizedPL: 0,
+    netPL: 0,
+    roi: 0,
+};
+
 export const useTradeData = (market?: string) => {
     const [trades, setTrades] = useState<Trade[]>([]);
     const [loading, setLoading] = useState(true);
@@ -15,11 +50,7 @@ export const useTradeData = (market?: string) => {
             const url = market
                 ? `${API_BASE_URL}/trades/?market=${market}`
                 : `${API_BASE_URL}/trades/`;
-            const res = await fetch(url);
-            if (res.ok) {
-                const data = await res.json();
-                setTrades(data);
-            }
+            setTrades(await fetchAllPages<Trade>(url));
         } catch (err) {
             console.error('Failed to fetch trades:', err);
         } finally {
@@ -53,47 +84,51 @@ export const useTradeData = (market?: string) => {
         updateMarketPrices(uniqueSymbols);
     }, [trades, updateMarketPrices]);
 
-    const portfolioStats = useMemo(() => {
-        const stats = trades.reduce((acc, t) => {
-            const value = t.price * t.quantity;
-            if (t.type === 'Buy') {
-                acc.buyCosts += value;
-            } else {
-                acc.sellProceeds += value;
-            }
-            acc.turnover += value;
-            return acc;
-        }, { buyCosts: 0, sellProceeds: 0, turnover: 0 });
-
-        const symbolMap: Record<string, { quantity: number; totalCost: number; realizedPL: number }> = {};
+    const [portfolioStats, setPortfolioStats] = useState<PortfolioStats>(EMPTY_PORTFOLIO);
 
-        [...trades].sort((a, b) => new Date(a.trade_date || 0).getTime() - new Date(b.trade_date || 0).getTime()).forEach(t => {
-            if (!symbolMap[t.stock_name]) {
-                symbolMap[t.stock_name] = { quantity: 0, totalCost: 0, realizedPL: 0 };
-            }
-            const s = symbolMap[t.stock_name];
-            if (t.type === 'Buy') {
-                s.quantity += t.quantity;
-                s.totalCost += (t.price * t.quantity);
-            } else {
-                const avgCost = s.quantity > 0 ? s.totalCost / s.quantity : 0;
-                s.realizedPL += (t.price - avgCost) * t.quantity;
-                s.quantity -= t.quantity;
-                s.totalCost -= (avgCost * t.quantity);
-            }
-        });
+    // Positions and P&L are maintained server-side (FIFO lots); refresh them whenever trades change
+    const fetchPortfolio = useCallback(async () => {
+        if (typeof window === 'undefined') return;
+        const query = market ? `?market=${market}` : '';
+        try {
+            const [positionsRes, pnlRes] = await Promise.all([
+                fetch(`${API_BASE_URL}/portfolio/positions${query ? `${query}&` : '?'}include_closed=true`),
+                fetch(`${API_BASE_URL}/portfolio/pnl${query}`),
+            ]);
+            if (!positionsRes.ok || !pnlRes.ok) return;
+            const positions: PortfolioPosition[] = await positionsRes.json();
+            const pnl: { markets: Record<string, MarketPnL> } = await pnlRes.json();
 
-        const unrealizedPL = Object.entries(symbolMap).reduce((acc, [symbol, s]) => {
-            const price = currentPrices[symbol] || 0;
-            return acc + (s.quantity * (price - (s.quantity > 0 ? s.totalCost / s.quantity : 0)));
-        }, 0);
+            const symbolMap: PortfolioStats['symbolMap'] = {};
+            positions.forEach(p => {
+                symbolMap[p.symbol] = { quantity: p.quantity, totalCost: p.cost_basis, realizedPL: p.realized_pnl };
+            });
+            const totals = Object.values(pnl.markets).reduce((acc, m) => {
+                acc.buyCosts += m.buy_cost;
+                acc.sellProceeds += m.sell_proceeds;
+                acc.turnover += m.turnover;
+                acc.realized += m.realized_pnl;
+                acc.unrealized += m.unrealized_pnl;
+                return acc;
+            }, { buyCosts: 0, sellProceeds: 0, turnover: 0, realized: 0, unrealized: 0 });
+            const netPL = totals.realized + totals.unrealized;
 
-        const totalRealizedPL = Object.values(symbolMap).reduce((acc, s) => acc + s.realizedPL, 0);
-        const netPL = totalRealizedPL + unrealizedPL;
-        const roi = stats.buyCosts > 0 ? (netPL / stats.buyCosts) * 100 : 0;
+            setPortfolioStats({
+                stats: { buyCosts: totals.buyCosts, sellProceeds: totals.sellProceeds, turnover: totals.turnover },
+                symbolMap,
+                unrealizedPL: totals.unrealized,
+                totalRealizedPL: totals.realized,
+                netPL,
+                roi: totals.buyCosts > 0 ? (netPL / totals.buyCosts) * 100 : 0,
+            });
+        } catch (err) {
+            console.error('Failed to fetch portfolio:', err);
+        }
+    }, [market]);
 
-        return { stats, symbolMap, unrealizedPL, totalRealizedPL, netPL, roi };
-    }, [trades, currentPrices]);
+    useEffect(() => {
+        fetchPortfolio();
+    }, [trades, fetchPortfolio]);
 
     const addTrade = (newTrade: Trade) => {
         setTrades(prev => [newTrade, ...prev]);
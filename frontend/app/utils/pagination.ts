@@ -0,0 +1,20 @@
+/**
+ * Fetches every page of a keyset-paginated list endpoint (trades, entries,
+ * stock history) by following the X-Next-Cursor response header.
+ */
+export async function fetchAllPages<T>(url: string, init?: RequestInit): Promise<T[]> {
+    const items: T[] = [];
+    let cursor: string | null = null;
+    do {
+        const pageUrl = new URL(url);
+        pageUrl.searchParams.set('limit', '1000');
+        if (cursor) pageUrl.searchParams.set('cursor', cursor);
+        const res = await fetch(pageUrl.toString(), init);
+        if (!res.ok) {
+            throw new Error(`Request failed (${res.status}): ${await res.text()}`);
+        }
+        items.push(...(await res.json()));
+        cursor = res.headers.get('X-Next-Cursor');
+    } while (cursor);
+    return items;
+}
@@ -6,6 +6,7 @@ const SYMBOL = 'ES=F';
 const PERIOD = '1mo';
 
 const TIMEFRAMES = [
+    { label: '4 Hour (4h)', interval: '4h' },
     { label: '1 Hour (1h)', interval: '1h' },
     { label: '30 Min (30m)', interval: '30m' }
 ];
@@ -24,11 +25,17 @@ async function main() {
         FUTURES_MULTIPLIER: 50  // $50 per pt
     };
 
+    // One fetch for every timeframe; the server resamples from the finest one
+    const intervals = TIMEFRAMES.map(tf => tf.interval).join(',');
+    const res = await fetch(`${API_BASE}/stocks/candles/multi/${encodeURIComponent(SYMBOL)}?period=${PERIOD}&intervals=${intervals}`);
+    if (!res.ok) {
+        throw new Error(`Failed to fetch ${intervals}: ${res.statusText}`);
+    }
+    const candles: Record<string, any[]> = (await res.json()).candles;
+
     for (const tf of TIMEFRAMES) {
         try {
-            const url = `${API_BASE}/stocks/candles/${SYMBOL}?period=${PERIOD}&interval=${tf.interval}`;
-            const res = await fetch(url);
-            const data = await res.json();
+            const data = candles[tf.interval] ?? [];
 
             console.log(`\n--- RESULTS: ${tf.label} ---`);
             console.log(`>> Received ${data.length} candles.`);
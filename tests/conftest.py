@@ -0,0 +1,113 @@
+"""
+Shared fixtures. The backend reads its configuration from the environment at
+import time, so the scratch database and cluster directory are set up here,
+before any test module imports backend code.
+"""
+
+import os
+import sys
+import tempfile
+import zlib
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import pytest
+
+_SCRATCH = tempfile.mkdtemp(prefix="portfolio-suite-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_SCRATCH, 'test.db')}"
+os.environ["CLUSTER_DIR"] = os.path.join(_SCRATCH, "cluster")
+os.environ.setdefault("MARKET_DATA_PROVIDER", "yfinance")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlmodel import SQLModel  # noqa: E402
+
+from backend import providers  # noqa: E402
+
+INTERVAL_SECONDS = {"1m": 60, "5m": 300, "15m": 900, "30m": 1800, "1h": 3600, "60m": 3600, "1d": 86400}
+
+
+def make_bars(symbol: str, interval: str = "1d", count: int = 300, end: datetime = None, tz: str = "America/New_York") -> pd.DataFrame:
+    """Deterministic OHLCV bars (a seeded random walk per symbol) ending at `end`."""
+    seconds = INTERVAL_SECONDS[interval]
+    end = end or datetime.now(timezone.utc)
+    last = int(end.timestamp()) // seconds * seconds
+    ts = np.arange(last - (count - 1) * seconds, last + 1, seconds)
+    rng = np.random.default_rng(zlib.crc32(symbol.encode()))
+    close = 100 + np.cumsum(rng.normal(0, 1, count))
+    open_ = close + rng.normal(0, 0.5, count)
+    high = np.maximum(open_, close) + rng.uniform(0.1, 1.5, count)
+    low = np.minimum(open_, close) - rng.uniform(0.1, 1.5, count)
+    volume = rng.integers(1_000, 100_000, count).astype(float)
+    index = pd.to_datetime(ts, unit="s", utc=True).tz_convert(tz)
+    if interval == "1d":
+        # Daily bars open at exchange midnight, like yfinance's
+        index = pd.date_range(end=pd.Timestamp(end).tz_convert(tz).normalize(), periods=count, freq="D")
+    return pd.DataFrame({"Open": open_, "High": high, "Low": low, "Close": close, "Volume": volume}, index=index)
+
+
+class FakeProvider(providers.MarketDataProvider):
+    """In-memory provider that records every call; `delay` widens race windows, `error` fails calls."""
+
+    name = "fake"
+
+    def __init__(self, count: int = 300, delay: float = 0.0):
+        self.count = count
+        self.delay = delay
+        self.error = None
+        self.calls = []
+
+    def _maybe_fail(self):
+        if self.delay:
+            import time
+            time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+
+    def quote(self, symbol: str) -> dict:
+        self.calls.append(("quote", symbol))
+        self._maybe_fail()
+        return {"price": 101.0, "previous_close": 100.0}
+
+    def history(self, symbol, interval, period=None, start=None):
+        self.calls.append(("history", symbol, interval, period, start))
+        self._maybe_fail()
+        hist = make_bars(symbol, interval, self.count)
+        if start is not None:
+            hist = hist[hist.index >= pd.Timestamp(start)]
+        elif period is not None:
+            from backend.candle_store import period_start
+            begin = period_start(period)
+            if begin is not None:
+                hist = hist[hist.index >= pd.Timestamp(begin)]
+        return hist
+
+    def history_many(self, symbols, interval, period=None, start=None):
+        self.calls.append(("history_many", tuple(symbols), interval, period, start))
+        self._maybe_fail()
+        return {symbol: self.history(symbol, interval, period=period, start=start) for symbol in symbols}
+
+    def timezone(self, symbol):
+        return "America/New_York"
+
+
+@pytest.fixture
+def db():
+    """Empty tables for every test."""
+    from backend.database import create_db_and_tables, engine
+    SQLModel.metadata.drop_all(engine)
+    create_db_and_tables()
+    yield engine
+
+
+@pytest.fixture
+def provider():
+    """A FakeProvider installed as the active provider, with caches and the breaker reset."""
+    from backend import market_data, upstream
+    fake = FakeProvider()
+    previous = providers.set_provider(fake)
+    market_data.quote_cache.invalidate()
+    market_data.history_cache.invalidate()
+    upstream.breaker.failures, upstream.breaker.opened_at, upstream.breaker.probing = 0, None, False
+    yield fake
+    providers.set_provider(previous)
@@ -0,0 +1,51 @@
+import json
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.backtest import MIN_CANDLES, run_backtest
+from backend.main import app
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def _bars() -> pd.DataFrame:
+    frame = pd.read_csv(FIXTURES / "backtest_bars.csv", index_col="date", parse_dates=True)
+    return frame.rename(columns=str.capitalize)
+
+
+def _same(actual, expected):
+    if isinstance(expected, dict):
+        assert actual.keys() == expected.keys()
+        for key in expected:
+            _same(actual[key], expected[key])
+    elif isinstance(expected, list):
+        assert len(actual) == len(expected)
+        for a, e in zip(actual, expected):
+            _same(a, e)
+    elif isinstance(expected, str):
+        assert actual[:10] == expected  # Index isoformat vs the candle's date string
+    else:
+        assert actual == pytest.approx(expected, rel=1e-9, abs=1e-9)
+
+
+def test_matches_the_frontend_engine_trade_for_trade():
+    # Covers long and short entries, a pyramid add, partial profit taking,
+    # breakeven exits and a position still open on the last bar
+    expected = json.loads((FIXTURES / "backtest_expected.json").read_text())["result"]
+    _same(run_backtest(_bars()), expected)
+
+
+def test_short_history_returns_an_empty_result():
+    result = run_backtest(_bars().iloc[:MIN_CANDLES - 1])
+    assert result["totalTrades"] == 0 and result["trades"] == [] and result["activePosition"] is None
+
+
+def test_endpoint_backtests_stored_candles(db, provider):
+    response = TestClient(app).get("/backtest/AAPL", params={"period": "1y", "transaction_fee": 0})
+
+    assert response.status_code == 200
+    assert response.json()["totalCosts"] == 0
+    assert provider.calls[0][:3] == ("history", "AAPL", "1d")
@@ -0,0 +1,47 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import indicator_engine, market_data
+from backend.main import app
+from conftest import make_bars
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def downloads(monkeypatch):
+    """Bulk downloads made through market_data; NODATA has no bars upstream."""
+    calls = []
+
+    async def history_many(symbols, period="60d", interval="1d"):
+        calls.append(sorted(symbols))
+        await asyncio.sleep(0)
+        return {s: make_bars(s, interval, 320) for s in symbols if s != "NODATA"}
+
+    monkeypatch.setattr(market_data, "get_history_many", history_many)
+    monkeypatch.setattr(indicator_engine, "engine", indicator_engine.IndicatorEngine())
+    return calls
+
+
+def test_many_symbols_cost_one_bulk_download(downloads):
+    response = client.post("/stocks/stats", json=["AAPL", "MSFT", "NODATA"])
+    stats = response.json()
+
+    assert response.status_code == 200
+    assert downloads == [["AAPL", "MSFT", "NODATA"]]
+    assert stats["NODATA"] is None
+    hist = make_bars("AAPL", "1d", 320)
+    assert stats["AAPL"]["price"] == round(hist["Close"].iloc[-1], 2)
+    assert stats["AAPL"]["change"] == round(hist["Close"].iloc[-1] - hist["Close"].iloc[-2], 2)
+    assert stats["AAPL"]["atr"] > 0
+
+
+def test_single_symbol_stats_share_the_batch_state(downloads):
+    client.post("/stocks/stats", json=["AAPL", "MSFT"])
+    single = client.get("/stocks/stats/MSFT").json()
+
+    assert downloads == [["AAPL", "MSFT"]]  # Served from the state the batch seeded
+    assert single == client.post("/stocks/stats", json=["MSFT"]).json()["MSFT"]
+    assert client.get("/stocks/stats/NODATA").status_code == 404
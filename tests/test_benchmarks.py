@@ -0,0 +1,29 @@
+import json
+
+from backend import benchmarks
+
+
+def test_quick_run_reports_and_gates_on_regressions(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", "sqlite://")  # main() points it at a scratch file
+    output, baseline = tmp_path / "new.json", tmp_path / "baseline.json"
+    argv = ["--quick", "--only", "encoding,indicators,simulation", "--sizes", "200", "--output", str(output)]
+
+    assert benchmarks.main(argv) == 0
+    report = json.loads(output.read_text())
+    assert {r["name"].split(".")[0] for r in report["results"]} >= {"encoding", "indicators", "simulation"}
+    for result in report["results"]:
+        assert 0 <= result["min"] <= result["median"] <= result["max"]
+
+    # A baseline ten times faster than this run fails the gate
+    for result in report["results"]:
+        result["median"] /= 10
+    baseline.write_text(json.dumps(report))
+    assert benchmarks.main(argv + ["--baseline", str(baseline)]) == 1
+    assert json.loads(output.read_text())["regressions"]
+
+
+def test_compare_ignores_benchmarks_missing_from_the_baseline():
+    run = [{"name": "a", "params": {"rows": 1}, "median": 2.0}, {"name": "b", "params": {}, "median": 1.0}]
+    baseline = [{"name": "a", "params": {"rows": 1}, "median": 1.0}]
+    assert [r["name"] for r in benchmarks.compare(run, baseline, 0.25)] == ["a"]
+    assert benchmarks.compare(run, baseline, 1.5) == []
@@ -0,0 +1,79 @@
+import csv
+import io
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import bulk
+from backend.main import app
+
+client = TestClient(app)  # No lifespan: tables come from the db fixture
+
+ENTRIES = "\n".join(
+    json.dumps({"title": f"Entry {i}", "content": "...", "created_at": f"2024-01-{i:02d}T00:00:00"}) for i in range(1, 11)
+)
+
+
+def _ndjson(response):
+    return [json.loads(line) for line in response.text.splitlines() if line]
+
+
+def test_export_window_matches_the_list_endpoint(db):
+    assert client.post("/entries/bulk?format=ndjson", content=ENTRIES).json()["inserted"] == 10
+    # Aware bounds, and an end that falls exactly on a stored timestamp
+    params = {"start": "2024-01-03T09:00:00+09:00", "end": "2024-01-06T00:00:00Z"}
+
+    listed = [e["title"] for e in client.get("/entries/", params=params).json()]
+    exported = [e["title"] for e in _ndjson(client.get("/entries/export", params={**params, "format": "ndjson"}))]
+
+    assert listed == ["Entry 3", "Entry 4", "Entry 5", "Entry 6"]
+    assert exported == listed
+
+
+def test_trade_export_round_trips_through_import(db):
+    body = "stock_name,type,quantity,price,trade_date\nAAPL,Buy,10,100.5,2024-01-02T00:00:00\n005930.KS,Buy,3,70000,2024-01-03T00:00:00\n"
+    assert client.post("/trades/bulk?format=csv", content=body).json()["inserted"] == 2
+
+    exported = client.get("/trades/export", params={"format": "csv", "end": "2024-01-03T00:00:00"})
+    rows = list(csv.DictReader(io.StringIO(exported.text)))
+
+    assert [(r["stock_name"], r["market"], float(r["price"])) for r in rows] == [("AAPL", "US", 100.5), ("005930.KS", "KR", 70000.0)]
+    db_rows = client.get("/trades/").json()
+    assert client.post("/trades/bulk?format=csv", content=exported.text).json()["inserted"] == 2
+    assert len(client.get("/trades/").json()) == 2 * len(db_rows)
+
+
+def test_import_reports_each_rejected_line(db, monkeypatch):
+    OHLC = {"open": 1, "high": 1, "low": 1}
+    monkeypatch.setattr(bulk, "BULK_BATCH_SIZE", 2)
+    body = "\n".join([
+        json.dumps({"symbol": "AAPL", "date": "2024-01-02T00:00:00", "price": 1, "change_percent": 0, "volume": 1, **OHLC}),
+        "{not json",
+        json.dumps({"symbol": "AAPL", "price": "cheap"}),
+        "",
+        json.dumps({"symbol": "AAPL", "date": "2024-01-02T00:00:00", "price": 2, "change_percent": 0, "volume": 1, **OHLC}),
+        json.dumps({"symbol": "AAPL", "date": "2024-01-03T00:00:00", "price": 3, "change_percent": 0, "volume": 1, **OHLC}),
+        "[1, 2]",
+    ])
+    report = client.post("/stocks/stats/bulk?format=ndjson", content=body).json()
+
+    assert report["inserted"] == 2
+    assert report["failed"] == 4
+    assert [e["line"] for e in report["errors"]] == [2, 3, 5, 7]
+    assert "Invalid JSON" in report["errors"][0]["error"]
+    assert "price" in report["errors"][1]["error"]
+    assert "Conflicts" in report["errors"][2]["error"]
+
+
+def test_csv_errors_name_the_first_line_of_a_multiline_record(db):
+    body = 'title,content\n"Multi","line one\nline two"\nShort\n"Open,"quote\n'
+    report = client.post("/entries/bulk", content=body, headers={"Content-Type": "text/csv"}).json()
+
+    assert report["inserted"] == 1
+    assert [e["line"] for e in report["errors"]] == [4, 5]
+
+
+@pytest.mark.parametrize("params,status", [({"format": "xml"}, 400), ({}, 415)])
+def test_import_format_is_required(db, params, status):
+    assert client.post("/entries/bulk", params=params, content="{}").status_code == status
@@ -0,0 +1,97 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import cache, market_data
+from backend.cache import TTLCache
+from backend.main import app
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    return clock
+
+
+def test_entries_expire_after_the_ttl_but_stay_available_as_stale(clock):
+    ttl_cache = TTLCache("t", ttl=5)
+    ttl_cache.set("AAPL", 1)
+    clock.now += 4.9
+    assert ttl_cache.get("AAPL") == 1
+    clock.now += 0.1
+    assert ttl_cache.get("AAPL") is None
+    assert ttl_cache.get_stale("AAPL") == 1
+    assert ttl_cache.stats()["hits"] == 1 and ttl_cache.stats()["misses"] == 1
+
+
+def test_least_recently_used_entries_are_evicted():
+    ttl_cache = TTLCache("t", ttl=60, maxsize=2)
+    ttl_cache.set("a", 1)
+    ttl_cache.set("b", 2)
+    ttl_cache.get("a")
+    ttl_cache.set("c", 3)
+    assert ttl_cache.get_stale("b") is None
+    assert (ttl_cache.get("a"), ttl_cache.get("c")) == (1, 3)
+    assert ttl_cache.stats()["evictions"] == 1
+
+
+def test_concurrent_thread_misses_share_one_load():
+    ttl_cache = TTLCache("t", ttl=60)
+    loads = []
+    start = threading.Barrier(8)
+
+    def loader():
+        loads.append(1)
+        time.sleep(0.05)
+        return "value"
+
+    def lookup(_):
+        start.wait()
+        return ttl_cache.get_or_load("key", loader)
+
+    with ThreadPoolExecutor(8) as pool:
+        assert list(pool.map(lookup, range(8))) == ["value"] * 8
+    assert len(loads) == 1
+    assert ttl_cache.stats()["coalesced"] == 7
+
+
+def test_a_failed_load_reaches_every_waiter_and_is_not_cached():
+    ttl_cache = TTLCache("t", ttl=60)
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise LookupError("no such symbol")
+
+    async def scenario():
+        return await asyncio.gather(*(ttl_cache.aget_or_load("k", loader) for _ in range(3)), return_exceptions=True)
+
+    assert all(isinstance(r, LookupError) for r in asyncio.run(scenario()))
+    assert len(calls) == 1
+    asyncio.run(scenario())
+    assert len(calls) == 2
+
+
+def test_quotes_are_served_from_cache_within_the_ttl(provider):
+    client = TestClient(app)
+    for _ in range(3):
+        assert client.get("/stocks/price/AAPL").json()["price"] == 101.0
+    assert provider.calls.count(("quote", "AAPL")) == 1
+    assert client.get("/stocks/cache").json()["quotes"]["hits"] >= 2
+    market_data.quote_cache.invalidate("AAPL")
+    client.get("/stocks/price/AAPL")
+    assert provider.calls.count(("quote", "AAPL")) == 2
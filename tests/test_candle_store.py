@@ -0,0 +1,78 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlmodel import Session, select
+
+from backend import candle_store
+from backend.models import CandleBar, CandleSeries
+
+
+def test_first_fetch_stores_series_and_serves_from_store(db, provider):
+    first = candle_store.get_history("AAPL", period="60d", interval="1d")
+    second = candle_store.get_history("AAPL", period="60d", interval="1d")
+
+    assert not first.empty
+    assert first.equals(second)
+    assert [c[0] for c in provider.calls] == ["history"]  # Second read came from SQLite
+    with Session(db) as session:
+        series = session.get(CandleSeries, ("AAPL", "1d"))
+        assert series.tz == "America/New_York"
+        assert session.exec(select(CandleBar).where(CandleBar.symbol == "AAPL")).first() is not None
+
+
+def test_concurrent_first_fetches_do_not_collide(db, provider):
+    provider.delay = 0.2  # Both callers miss the series row before either stores it
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        frames = list(pool.map(lambda _: candle_store.get_history("AAPL", period="60d", interval="1d"), range(4)))
+
+    assert all(frame.equals(frames[0]) for frame in frames)
+    assert len([c for c in provider.calls if c[0] == "history"]) == 1
+    with Session(db) as session:
+        assert len(session.exec(select(CandleSeries)).all()) == 1
+
+
+def test_bulk_and_single_loads_of_the_same_series_do_not_collide(db, provider):
+    provider.delay = 0.2
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        single = pool.submit(candle_store.get_history, "MSFT", "60d", "1d")
+        bulk = pool.submit(candle_store.get_history_many, ["AAPL", "MSFT"], "60d", "1d")
+        single, bulk = single.result(), bulk.result()
+
+    assert single.equals(bulk["MSFT"])
+    with Session(db) as session:
+        assert {s.symbol for s in session.exec(select(CandleSeries)).all()} == {"AAPL", "MSFT"}
+
+
+def test_series_row_written_by_another_process_is_kept(db, provider):
+    hist = provider.history("AAPL", "1d", period="60d")
+    now = hist.index[-1].to_pydatetime()
+    with Session(db) as session:
+        session.add(CandleSeries(symbol="AAPL", interval="1d", tz="Asia/Seoul", last_ts=0))
+        session.commit()
+        # Same store as a racing worker would do after missing the row
+        series = candle_store._store_full(session, None, "AAPL", "1d", hist, None, now)
+        session.commit()
+        assert series.tz == "Asia/Seoul"
+        assert series.last_ts == int(hist.index[-1].timestamp())
+
+
+def test_unpriced_forming_bar_is_refetched_by_the_next_tail(db, provider, monkeypatch):
+    history = provider.history
+
+    def forming_bar_without_prices(symbol, interval, period=None, start=None):
+        hist = history(symbol, interval, period=period, start=start).copy()
+        hist.iloc[-1, hist.columns.get_indexer(["Open", "High", "Low", "Close"])] = float("nan")
+        return hist
+
+    monkeypatch.setattr(provider, "history", forming_bar_without_prices)
+    stored = candle_store.get_history("AAPL", period="60d", interval="1h")
+    monkeypatch.setattr(provider, "history", history)
+    monkeypatch.setitem(candle_store.REFRESH_TTL_SECONDS, "1h", 0)
+    refreshed = candle_store.get_history("AAPL", period="60d", interval="1h")
+
+    last_stored = int(stored.index[-1].timestamp())
+    with Session(db) as session:
+        assert session.get(CandleSeries, ("AAPL", "1h")).last_ts == int(refreshed.index[-1].timestamp())
+    tail_start = provider.calls[-1][4]
+    assert int(tail_start.timestamp()) == last_stored  # Not past the bar that was never stored
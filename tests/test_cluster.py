@@ -0,0 +1,110 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from backend import cluster
+
+
+@pytest.fixture
+def cluster_mode(monkeypatch):
+    monkeypatch.setattr(cluster, "CLUSTER_MODE", True)
+    monkeypatch.setattr(cluster, "ELECTION_INTERVAL", 0.05)
+    monkeypatch.setattr(cluster, "role", "starting")
+    yield
+    if cluster.broker is not None and cluster.broker.server is not None:
+        cluster.broker.server.close()
+    cluster.broker = None
+
+
+def test_file_lock_is_exclusive_until_released(cluster_mode):
+    first, second = cluster.FileLock("exclusive"), cluster.FileLock("exclusive")
+    assert first.acquire()
+    assert first.acquire()  # Re-entrant for the holder
+    assert not second.acquire()
+    first.release()
+    assert second.acquire()
+    second.release()
+
+
+def test_file_lock_dies_with_its_process(cluster_mode):
+    # A worker that exits (or crashes) while holding the lock frees it
+    code = (
+        "import fcntl, os, sys; fd = os.open(sys.argv[1], os.O_RDWR | os.O_CREAT); "
+        "fcntl.flock(fd, fcntl.LOCK_EX); print('held', flush=True); sys.stdin.read()"
+    )
+    lock = cluster.FileLock("worker")
+    os.makedirs(cluster.CLUSTER_DIR, exist_ok=True)
+    holder = subprocess.Popen([sys.executable, "-c", code, lock.path], stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+    try:
+        assert holder.stdout.readline().strip() == "held"
+        assert not lock.acquire()
+    finally:
+        holder.communicate("")
+    assert lock.acquire()
+    lock.release()
+
+
+def test_job_lock_runs_a_job_in_one_worker_at_a_time(cluster_mode):
+    with cluster.job_lock("job") as outer:
+        with cluster.job_lock("job") as inner:
+            assert (outer, inner) == (True, False)
+    with cluster.job_lock("job") as again:
+        assert again
+
+
+def test_job_lock_is_a_no_op_outside_cluster_mode():
+    with cluster.job_lock("job") as outer, cluster.job_lock("job") as inner:
+        assert outer and inner
+
+
+def test_follower_takes_over_when_the_leader_lock_frees(cluster_mode):
+    started = []
+    leader = cluster.FileLock("leader")
+    assert leader.acquire()
+
+    async def scenario():
+        election = asyncio.create_task(cluster.run(lambda: started.append(os.getpid())))
+        await asyncio.sleep(0.1)
+        assert (cluster.role, started) == ("follower", [])
+        leader.release()
+        await asyncio.wait_for(election, 1)
+        assert (cluster.role, started) == ("leader", [os.getpid()])
+
+        # Followers report their clients' symbols to the new leader's broker
+        reader, writer = await asyncio.open_unix_connection(cluster.broker.path)
+        writer.write(b'{"type": "symbols", "symbols": ["AAPL", "NVDA"]}\n')
+        await writer.drain()
+        await asyncio.sleep(0.05)
+        assert cluster.broker.symbols() == {"AAPL", "NVDA"}
+        assert cluster.stats()["followers"] == 1
+
+        cluster.broker.publish({"type": "quotes", "time": 1.0, "quotes": {"AAPL": {"price": 1.0}}})
+        assert json.loads(await reader.readline())["quotes"] == {"AAPL": {"price": 1.0}}
+        writer.close()
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        leader.release()
+
+
+def test_broker_drops_a_follower_that_stopped_reading(cluster_mode, monkeypatch):
+    monkeypatch.setattr(cluster, "MAX_PEER_BUFFER", 1024)
+
+    async def scenario():
+        broker = cluster.Broker(os.path.join(cluster.CLUSTER_DIR, "slow.sock"))
+        await broker.start()
+        reader, writer = await asyncio.open_unix_connection(broker.path)
+        await asyncio.sleep(0.05)
+        payload = {"type": "quotes", "quotes": {"AAPL": {"note": "x" * 64 * 1024}}}
+        for _ in range(64):
+            broker.publish(payload)
+        assert broker.peers == {}
+        writer.close()
+        broker.server.close()
+
+    asyncio.run(scenario())
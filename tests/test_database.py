@@ -0,0 +1,61 @@
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+from sqlmodel import Session, select
+
+from backend import database
+from backend.models import StockDailyStat
+
+
+def _stat(symbol, day, price, recorded):
+    return StockDailyStat(
+        symbol=symbol, date=day, price=price, change_percent=0.0, volume=1,
+        open=price, high=price, low=price, recorded_at=recorded,
+    )
+
+
+def test_duplicate_daily_stats_are_removed_once_before_the_unique_index(db, capsys):
+    # A database from before the index, holding two rows for the same day
+    with db.begin() as conn:
+        conn.execute(text(f"DROP INDEX {database.DAILY_STAT_UNIQUE_INDEX}"))
+    day = datetime(2024, 1, 2)
+    with Session(db) as session:
+        session.add(_stat("AAPL", day, 1.0, datetime(2024, 1, 2, 20)))
+        session.add(_stat("AAPL", day, 2.0, datetime(2024, 1, 2, 21)))
+        session.add(_stat("MSFT", day, 3.0, datetime(2024, 1, 2, 21)))
+        session.commit()
+
+    database.create_db_and_tables()
+
+    assert "Removed 1 duplicate daily stat rows" in capsys.readouterr().out
+    with Session(db) as session:
+        rows = session.exec(select(StockDailyStat).order_by(StockDailyStat.symbol)).all()
+        assert [(r.symbol, r.price) for r in rows] == [("AAPL", 2.0), ("MSFT", 3.0)]
+    assert database.DAILY_STAT_UNIQUE_INDEX in {i["name"] for i in inspect(db).get_indexes("stockdailystat")}
+
+
+def test_boot_with_the_index_in_place_skips_the_migration(db, capsys):
+    database.create_db_and_tables()
+    assert "duplicate daily stat" not in capsys.readouterr().out
+
+
+def test_upserts_compile_for_postgresql(monkeypatch):
+    from sqlalchemy.dialects import postgresql
+
+    monkeypatch.setattr(database, "DATABASE_BACKEND", "postgresql")
+    stmt = database.upsert_insert(StockDailyStat).on_conflict_do_nothing(index_elements=["symbol", "date"])
+    assert "ON CONFLICT (symbol, date) DO NOTHING" in str(stmt.compile(dialect=postgresql.dialect()))
+
+
+def test_unsupported_database_url_is_rejected_at_import():
+    import os
+    import subprocess
+    import sys
+
+    env = {**os.environ, "DATABASE_URL": "mysql://user@localhost/portfolio"}
+    result = subprocess.run(
+        [sys.executable, "-c", "import backend.database"], env=env, capture_output=True, text=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    assert result.returncode != 0
+    assert "Unsupported DATABASE_URL backend mysql" in result.stderr
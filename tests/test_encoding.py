@@ -0,0 +1,71 @@
+import io
+import json
+import struct
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import encoding
+from backend.main import app
+
+client = TestClient(app)
+
+
+def _candles(fmt=None, accept=None):
+    params = {"period": "30d", "interval": "1d", "live": "false"}
+    if fmt:
+        params["format"] = fmt
+    return client.get("/stocks/candles/AAPL", params=params, headers={"Accept": accept} if accept else {})
+
+
+def _decode_binary(body: bytes) -> dict:
+    (length,) = struct.unpack_from("<I", body)
+    header = json.loads(body[4:4 + length])
+    offset, columns = 4 + length, {}
+    for column in header["columns"]:
+        if column["dtype"] == "str":
+            columns[column["name"]] = column["values"]
+            continue
+        values = np.frombuffer(body, dtype=column["dtype"], count=header["rows"], offset=offset)
+        offset += values.nbytes
+        columns[column["name"]] = values.tolist()
+    return columns
+
+
+def test_every_format_carries_the_same_candles(db, provider):
+    rows = _candles().json()
+    expected = {key: [row[key] for row in rows] for key in ("open", "high", "low", "close", "volume")}
+    millis = [int(pd.Timestamp(row["date"]).timestamp() * 1000) for row in rows]
+    assert len(rows) > 15
+
+    ndjson = [json.loads(line) for line in _candles("ndjson").text.splitlines()]
+    assert ndjson == rows
+
+    columnar = _candles(accept=encoding.MEDIA_TYPES["columnar"]).json()
+    assert {key: columnar[key] for key in expected} == expected
+    assert columnar["date"] == [row["date"] for row in rows]
+
+    binary = _decode_binary(_candles("binary").content)
+    assert {key: binary[key] for key in expected} == expected
+    assert binary["date"] == millis
+
+    pa = pytest.importorskip("pyarrow")
+    arrow = pa.ipc.open_stream(io.BytesIO(_candles("arrow").content)).read_all().to_pydict()
+    assert {key: arrow[key] for key in expected} == expected
+
+
+def test_unknown_format_is_rejected(db, provider):
+    assert _candles("xml").status_code == 400
+
+
+def test_json_stream_spans_chunks():
+    index = pd.date_range("2024-01-01", periods=2 * encoding.CHUNK_ROWS + 1, freq="min", tz="UTC")
+    frame = pd.DataFrame({"Open": 1.0, "High": 2.0, "Low": 0.5, "Close": 1.5, "Volume": np.nan}, index=index)
+    chunks = list(encoding.stream_candles_json(frame))
+
+    rows = json.loads("".join(chunks))
+    assert len(chunks) == 5  # Bracket, three chunks, bracket
+    assert [row["date"] for row in rows] == [d.isoformat() for d in index]
+    assert rows[0]["volume"] == 0
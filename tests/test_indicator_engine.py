@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from backend import indicator_engine, market_data
+from backend.indicator_engine import IndicatorEngine, IndicatorState
+from backend.strategy import compute_signal_frame
+
+from conftest import make_bars
+
+
+def test_streamed_state_matches_the_batch_strategy_frame():
+    hist = make_bars("AAPL", "1d", 320)
+    state = IndicatorState("AAPL", "1d")
+    state.feed(hist)
+    frame = compute_signal_frame(hist).iloc[-1]
+
+    values = state.indicators()
+    for name in ("atr", "ema_fast", "ema_trend", "sma20", "chandelier_long", "chandelier_short"):
+        assert values[name] == pytest.approx(round(float(frame[name]), 2), abs=0.011), name
+
+
+def test_revising_the_last_bar_matches_feeding_it_once():
+    hist = make_bars("MSFT", "1d", 60)
+    revised = hist.copy()
+    revised.iloc[-1, revised.columns.get_loc("Close")] += 3
+
+    state = IndicatorState("MSFT", "1d")
+    state.feed(hist)
+    state.feed(revised)
+    fresh = IndicatorState("MSFT", "1d")
+    fresh.feed(revised)
+    assert state.indicators() == fresh.indicators()
+    assert state.bars == fresh.bars == 60
+
+
+def test_daily_seed_window_is_about_300_bars():
+    # 450 calendar days hold ~310 sessions: the EMA200 seed plus warm-up, not two years
+    assert indicator_engine.HISTORY_PERIODS["1d"] == "450d"
+
+
+def test_concurrent_first_ensures_seed_once(monkeypatch):
+    loads = []
+
+    async def history_many(symbols, period="60d", interval="1d"):
+        loads.append((list(symbols), period))
+        await asyncio.sleep(0.05)
+        return {symbol: make_bars(symbol, interval, 320) for symbol in symbols}
+
+    monkeypatch.setattr(market_data, "get_history_many", history_many)
+    engine = IndicatorEngine()
+
+    async def scenario():
+        return await asyncio.gather(engine.ensure(["AAPL"]), engine.ensure(["AAPL", "MSFT"]))
+
+    first, second = asyncio.run(scenario())
+    assert loads == [(["AAPL"], "450d"), (["MSFT"], "450d")]
+    assert first["AAPL"] is second["AAPL"] is engine.get("AAPL")
+    assert second["MSFT"].bars == 320
+
+
+def test_waiters_see_the_owners_failure(monkeypatch):
+    async def history_many(symbols, period="60d", interval="1d"):
+        await asyncio.sleep(0.05)
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(market_data, "get_history_many", history_many)
+    engine = IndicatorEngine()
+
+    async def scenario():
+        return await asyncio.gather(engine.ensure(["AAPL"]), engine.ensure(["AAPL"]), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert engine._inflight == {}
@@ -0,0 +1,174 @@
+import asyncio
+import json
+import time
+
+import pandas as pd
+from fastapi.testclient import TestClient
+
+from backend import live_bars
+from backend.live_bars import BarRing, LiveBars, with_live_tail
+from backend.main import app
+from backend.ws_manager import ConnectionManager
+
+T0 = 1_700_000_100  # A 15m boundary
+
+
+def test_ring_overwrites_the_oldest_bar():
+    ring = BarRing(capacity=3)
+    for i in range(5):
+        ring.append(i * 60, float(i))
+    assert ring.count == 3
+    assert ring.ordered()["time"].tolist() == [120, 180, 240]
+    assert ring.last()["close"] == 4.0
+
+
+def test_ticks_open_widen_and_close_bars():
+    live = LiveBars()
+    _, updated = live.tick("AAPL", 10.0, T0 + 1)
+    assert set(updated) == {"1m", "5m", "15m"}
+    live.tick("AAPL", 12.0, T0 + 20)
+    _, updated = live.tick("AAPL", 9.0, T0 + 40)
+    assert updated["1m"] == {"time": T0, "open": 10.0, "high": 12.0, "low": 9.0, "close": 9.0}
+
+    closed, updated = live.tick("AAPL", 11.0, T0 + 61)
+    assert closed == {"1m": {"time": T0, "open": 10.0, "high": 12.0, "low": 9.0, "close": 9.0}}
+    assert updated["1m"]["time"] == T0 + 60
+    assert updated["5m"] == {"time": T0, "open": 10.0, "high": 12.0, "low": 9.0, "close": 11.0}
+
+
+def test_unchanged_and_late_ticks_print_nothing():
+    live = LiveBars()
+    live.tick("AAPL", 10.0, T0)
+    # A closed market repeats its last price: no flat bars
+    assert live.tick("AAPL", 10.0, T0 + 3600) == ({}, {})
+    assert live.rings["AAPL"]["1m"].count == 1
+    # A tick older than the forming bar (another worker's clock) is ignored
+    live.tick("AAPL", 11.0, T0 + 120)
+    closed, updated = live.tick("AAPL", 50.0, T0 + 30)
+    assert closed == {} and "1m" not in updated
+    assert live.rings["AAPL"]["1m"].last()["high"] == 11.0
+
+
+def test_quote_batches_skip_missing_prices_and_prune_idle_symbols(monkeypatch):
+    live = LiveBars()
+    closed, updated = live.on_quotes({"AAPL": {"price": 10}, "NVDA": {"price": None}}, at=T0)
+    assert (closed, set(updated)) == ({}, {"AAPL"})
+
+    monkeypatch.setattr(live_bars, "LIVE_BARS_IDLE_SECONDS", 600)
+    live.last_prune = T0
+    live.on_quotes({"MSFT": {"price": 5}}, at=T0 + live_bars.PRUNE_EVERY + 700)
+    assert set(live.rings) == {"MSFT"}
+    assert live.stats()["rings"] == len(live_bars.LIVE_INTERVALS)
+
+
+def test_frame_is_a_yfinance_style_tail():
+    live = LiveBars()
+    live.tick("AAPL", 10.0, T0)
+    live.tick("AAPL", 11.0, T0 + 60)
+    frame = live.frame("AAPL", "1m", "America/New_York")
+    assert list(frame.columns) == ["Open", "High", "Low", "Close", "Volume"]
+    assert str(frame.index.tz) == "America/New_York"
+    assert frame["Close"].tolist() == [10.0, 11.0]
+    assert live.frame("NVDA", "1m").empty
+
+
+def test_live_tail_widens_the_last_bar_and_appends_newer_ones():
+    index = pd.to_datetime([T0 - 60, T0], unit="s", utc=True)
+    hist = pd.DataFrame({"Open": [1.0, 2.0], "High": [3.0, 3.0], "Low": [1.0, 1.5], "Close": [2.0, 2.5], "Volume": [100.0, 50.0]}, index=index)
+    live = LiveBars()
+    for price, at in ((4.0, T0 + 5), (1.0, T0 + 10), (1.2, T0 + 30), (5.0, T0 + 65)):
+        live.tick("AAPL", price, at)
+
+    merged = with_live_tail(hist, live.frame("AAPL", "1m", "UTC"))
+    assert merged.index.tolist() == index.tolist() + [pd.Timestamp(T0 + 60, unit="s", tz="UTC")]
+    assert merged.loc[index[1]].tolist() == [2.0, 4.0, 1.0, 1.2, 50.0]
+    assert merged.iloc[-1].tolist() == [5.0, 5.0, 5.0, 5.0, 0.0]
+    assert hist["High"].tolist() == [3.0, 3.0]  # Upstream frame left untouched
+    assert with_live_tail(hist, live.frame("NVDA", "1m")) is hist
+
+
+def test_candles_end_with_the_live_bars(db, provider, monkeypatch):
+    live = LiveBars()
+    monkeypatch.setattr(live_bars, "bars", live)
+    now = time.time()
+    live.tick("AAPL", 250.0, now + 120)
+
+    def last_close(params):
+        response = TestClient(app).get("/stocks/candles/multi/AAPL", params={"intervals": "1m,1h", "period": "1d", **params})
+        return {interval: rows[-1]["close"] for interval, rows in response.json()["candles"].items()}
+
+    assert last_close({})["1m"] == 250.0
+    assert last_close({})["1h"] != 250.0  # Only 1m/5m/15m have a live tail
+    assert last_close({"live": "false"})["1m"] != 250.0
+
+
+class OpenSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        self.sent.append(json.loads(text))
+
+    async def close(self, code=1000):
+        pass
+
+
+def test_bar_events_go_to_clients_that_asked_for_the_interval():
+    async def scenario():
+        manager = ConnectionManager()
+        bars_client, quotes_client = OpenSocket(), OpenSocket()
+        for socket in (bars_client, quotes_client):
+            await manager.connect(socket)
+            manager.subscribe(socket, ["AAPL"])
+        await manager.handle_message(bars_client, json.dumps({"action": "subscribe", "bars": ["1m"]}))
+        live = LiveBars()
+        for price, at in ((10.0, T0), (11.0, T0 + 61)):
+            await manager.publish_bars(*live.on_quotes({"AAPL": {"price": price}}, at))
+            await asyncio.sleep(0.01)
+        return bars_client.sent, quotes_client.sent
+
+    bars_sent, quotes_sent = asyncio.run(scenario())
+    assert [m["type"] for m in bars_sent] == ["subscriptions", "bar_update", "bar_close", "bar_update"]
+    assert set(bars_sent[1]["bars"]["AAPL"]) == {"1m"}
+    assert bars_sent[2]["bars"]["AAPL"]["1m"]["time"] == T0
+    assert quotes_sent == []
+
+
+def test_queued_forming_bar_never_arrives_after_its_close():
+    async def scenario():
+        manager = ConnectionManager()
+        socket = OpenSocket()
+        await manager.connect(socket)
+        client = manager.clients[socket]
+        client.bar_intervals = {"1m", "5m"}
+        manager.subscribe(socket, ["AAPL"])
+        live = LiveBars()
+        # Both events are queued before the writer runs
+        await manager.publish_bars(*live.on_quotes({"AAPL": {"price": 10.0}}, T0))
+        await manager.publish_bars(*live.on_quotes({"AAPL": {"price": 11.0}}, T0 + 61))
+        await asyncio.sleep(0.01)
+        return socket.sent
+
+    sent = asyncio.run(scenario())
+    assert [m["type"] for m in sent] == ["bar_update", "bar_close", "bar_update"]
+    assert set(sent[0]["bars"]["AAPL"]) == {"5m"}  # The stale 1m bar was withdrawn
+    assert sent[2]["bars"]["AAPL"]["1m"]["time"] == T0 + 60
+
+
+def test_forming_bar_emptied_by_its_close_is_not_sent():
+    async def scenario():
+        manager = ConnectionManager()
+        socket = OpenSocket()
+        await manager.connect(socket)
+        manager.clients[socket].bar_intervals = {"1m"}
+        manager.subscribe(socket, ["AAPL"])
+        live = LiveBars()
+        await manager.publish_bars(*live.on_quotes({"AAPL": {"price": 10.0}}, T0))
+        await manager.publish_bars(*live.on_quotes({"AAPL": {"price": 11.0}}, T0 + 61))
+        await asyncio.sleep(0.01)
+        return socket.sent
+
+    assert [m["type"] for m in asyncio.run(scenario())] == ["bar_close", "bar_update"]
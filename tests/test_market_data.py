@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+
+from backend import candle_store, market_data, upstream
+
+
+def test_concurrent_bulk_loads_share_in_flight_symbols(db, provider, monkeypatch):
+    provider.delay = 0.2
+    loads = []
+    real = candle_store.get_history_many
+
+    def counting(symbols, period="60d", interval="1d"):
+        loads.append(list(symbols))
+        return real(symbols, period=period, interval=interval)
+
+    monkeypatch.setattr(candle_store, "get_history_many", counting)
+
+    async def scenario():
+        return await asyncio.gather(
+            market_data.get_history_many(["AAPL", "MSFT"]),
+            market_data.get_history_many(["MSFT", "AAPL", "NVDA"]),
+        )
+
+    first, second = asyncio.run(scenario())
+
+    assert sorted(symbol for batch in loads for symbol in batch) == ["AAPL", "MSFT", "NVDA"]
+    assert first["AAPL"] is second["AAPL"]
+    assert list(second) == ["MSFT", "AAPL", "NVDA"]
+
+
+def test_bulk_load_serves_cached_frames_without_the_store(db, provider):
+    async def scenario():
+        single = await market_data.get_history("AAPL")
+        bulk = await market_data.get_history_many(["AAPL"])
+        return single, bulk
+
+    single, bulk = asyncio.run(scenario())
+    assert bulk["AAPL"] is single
+    assert market_data.history_cache.stats()["hits"] >= 1
+
+
+def test_bulk_load_falls_back_to_stale_frames_when_upstream_is_unavailable(db, provider, monkeypatch):
+    stale = asyncio.run(market_data.get_history_many(["AAPL"]))["AAPL"]
+    monkeypatch.setattr(market_data.history_cache, "ttl", 0)
+
+    async def unavailable(*args, **kwargs):
+        raise upstream.UpstreamUnavailable("circuit open")
+
+    monkeypatch.setattr(upstream, "run", unavailable)
+    assert asyncio.run(market_data.get_history_many(["AAPL"]))["AAPL"] is stale
+    with pytest.raises(upstream.UpstreamUnavailable):
+        asyncio.run(market_data.get_history_many(["MSFT"]))
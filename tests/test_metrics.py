@@ -0,0 +1,52 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import metrics
+from backend.main import app
+
+
+def test_metrics_must_implement_samples():
+    class Bare(metrics.Metric):
+        pass
+
+    with pytest.raises(TypeError, match="samples"):
+        Bare("bare", "No samples")
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = metrics.Histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value, route="/a")
+
+    assert histogram.render().splitlines()[2:] == [
+        'latency_seconds_bucket{route="/a",le="0.1"} 2',
+        'latency_seconds_bucket{route="/a",le="1"} 3',
+        'latency_seconds_bucket{route="/a",le="+Inf"} 4',
+        'latency_seconds_sum{route="/a"} 2.65',
+        'latency_seconds_count{route="/a"} 4',
+    ]
+
+
+def test_label_values_are_escaped():
+    counter = metrics.Counter("hits_total", "Hits", ("path",))
+    counter.inc(path='a"b\\c')
+    assert list(counter.samples()) == ['hits_total{path="a\\"b\\\\c"} 1']
+
+
+def test_requests_are_counted_by_route_template(db):
+    client = TestClient(app)
+    key = ("GET", "/trades/{trade_id}", "404")
+    before = metrics.http_requests.values.get(key, 0)
+    client.get("/trades/12345")
+    client.get("/trades/67890")
+
+    assert metrics.http_requests.values[key] == before + 2
+    assert "/trades/12345" not in client.get("/metrics").text
+
+
+def test_a_failing_collector_does_not_break_the_scrape(monkeypatch):
+    def broken():
+        raise RuntimeError("gone")
+
+    monkeypatch.setattr(metrics, "REGISTRY", [metrics.Collected("broken", "Broken", "gauge", broken), metrics.Gauge("ok", "Fine")])
+    assert metrics.render() == "# broken unavailable: gone\n# HELP ok Fine\n# TYPE ok gauge\n"
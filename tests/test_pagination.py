@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from backend.main import app
+from backend.models import DiaryEntry, StockDailyStat
+from backend.pagination import DEFAULT_LIMIT, NEXT_CURSOR_HEADER
+
+client = TestClient(app)
+START = datetime(2024, 1, 1)
+
+
+def _entries(engine, count):
+    with Session(engine) as session:
+        # Pairs share a timestamp, so pages must break ties on id
+        for i in range(count):
+            session.add(DiaryEntry(title=f"Entry {i}", content="...", created_at=START + timedelta(hours=i // 2)))
+        session.commit()
+
+
+def _walk(path, **params):
+    pages, cursor = [], None
+    while True:
+        response = client.get(path, params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        pages.append(response.json())
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            return pages
+        assert f"cursor={cursor}" in response.headers["link"]
+
+
+def test_lists_default_to_one_page_of_100(db):
+    _entries(db, 150)
+    response = client.get("/entries/")
+
+    assert DEFAULT_LIMIT == 100
+    assert len(response.json()) == 100
+    assert NEXT_CURSOR_HEADER in response.headers
+
+
+def test_cursor_walk_visits_every_row_once_in_order(db):
+    _entries(db, 25)
+    for order in ("asc", "desc"):
+        pages = _walk("/entries/", limit=7, order=order)
+        ids = [entry["id"] for page in pages for entry in page]
+        assert [len(page) for page in pages] == [7, 7, 7, 4]
+        assert ids == sorted(range(1, 26), reverse=order == "desc")
+
+
+def test_last_full_page_has_no_cursor(db):
+    _entries(db, 10)
+    assert [len(page) for page in _walk("/entries/", limit=5)] == [5, 5]
+
+
+def test_invalid_cursor_is_rejected(db):
+    assert client.get("/entries/", params={"cursor": "not-a-cursor"}).status_code == 400
+    assert client.get("/entries/", params={"limit": 0}).status_code == 422
+
+
+def test_stock_history_pages_by_date(db):
+    with Session(db) as session:
+        for day in range(12):
+            session.add(StockDailyStat(symbol="AAPL", date=START + timedelta(days=day), price=100 + day,
+                                       change_percent=0, volume=1, open=1, high=1, low=1))
+        session.add(StockDailyStat(symbol="MSFT", date=START, price=1, change_percent=0, volume=1, open=1, high=1, low=1))
+        session.commit()
+
+    pages = _walk("/stocks/history/AAPL", limit=5, start="2024-01-03T00:00:00Z")
+    assert [row["price"] for page in pages for row in page] == [102 + day for day in range(10)]
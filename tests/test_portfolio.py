@@ -0,0 +1,188 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+
+from backend import portfolio
+from backend.main import app
+from backend.models import LotClose, Position, Trade
+
+client = TestClient(app)  # No lifespan: tables come from the db fixture
+DAY = datetime(2024, 1, 2)
+
+
+def _trade(type, quantity, price, day, symbol="AAPL"):
+    response = client.post("/trades/", json={
+        "stock_name": symbol, "type": type, "quantity": quantity, "price": price,
+        "trade_date": (DAY + timedelta(days=day)).isoformat(),
+    })
+    return response
+
+
+def _state(engine):
+    """Positions with their open lots, plus every lot close, for comparing booking paths."""
+    positions = portfolio.load_positions(include_closed=True, include_lots=True)
+    with Session(engine) as session:
+        closes = sorted(
+            (c.sell_trade_id, c.quantity, c.buy_price, c.sell_price, round(c.realized_pnl, 6))
+            for c in session.exec(select(LotClose)).all()
+        )
+    return positions, closes
+
+
+def _rebuilt(engine):
+    with Session(engine) as session:
+        portfolio.rebuild_all(session)
+        session.commit()
+    return _state(engine)
+
+
+def test_fifo_lots_and_realized_pnl(db):
+    assert _trade("Buy", 10, 100.0, 0).status_code == 200
+    assert _trade("buy", 10, 110.0, 1).status_code == 200
+    assert _trade("SELL", 15, 120.0, 2).status_code == 200
+
+    [position] = portfolio.load_positions(include_lots=True)
+    assert position["quantity"] == 5
+    assert position["realized_pnl"] == pytest.approx(10 * 20 + 5 * 10)
+    assert position["cost_basis"] == pytest.approx(5 * 110)
+    assert position["avg_cost"] == pytest.approx(110)
+    assert [lot["remaining"] for lot in position["lots"]] == [5]
+
+
+def test_incremental_booking_matches_a_full_rebuild(db):
+    rng = random.Random(7)
+    held = {"AAPL": 0, "MSFT": 0}
+    for day in range(60):
+        symbol = rng.choice(list(held))
+        if held[symbol] and rng.random() < 0.4:
+            quantity = rng.randint(1, held[symbol])
+            held[symbol] -= quantity
+            assert _trade("Sell", quantity, rng.uniform(90, 130), day, symbol).status_code == 200
+        else:
+            quantity = rng.randint(1, 20)
+            held[symbol] += quantity
+            assert _trade("Buy", quantity, rng.uniform(90, 130), day, symbol).status_code == 200
+
+    incremental = _state(db)
+    assert {p["symbol"]: p["quantity"] for p in incremental[0]} == held
+    assert _rebuilt(db) == incremental
+
+
+def test_backdated_insert_replays_the_symbol(db):
+    _trade("Buy", 10, 100.0, 0)
+    _trade("Sell", 5, 120.0, 5)
+    assert _trade("Buy", 10, 90.0, -1).status_code == 200  # Before everything else
+
+    [position] = portfolio.load_positions(include_lots=True)
+    assert position["realized_pnl"] == pytest.approx(5 * (120 - 90))  # FIFO now sells the older lot
+    assert position["quantity"] == 15
+    assert _rebuilt(db) == _state(db)
+
+
+def test_deletes_match_a_full_rebuild(db):
+    ids = [_trade(*args).json()["id"] for args in (
+        ("Buy", 10, 100.0, 0), ("Buy", 5, 105.0, 1), ("Sell", 8, 110.0, 2), ("Buy", 4, 95.0, 3), ("Sell", 3, 120.0, 4),
+    )]
+    assert client.delete(f"/trades/{ids[-1]}").status_code == 200  # Latest: incremental undo
+    assert client.delete(f"/trades/{ids[1]}").status_code == 200  # Earlier buy: replay
+    state = _state(db)
+    assert state[0][0]["quantity"] == 10 + 4 - 8
+    assert _rebuilt(db) == state
+
+
+def test_replayed_lots_get_database_ids(db):
+    for type, quantity, day in (("buy", 10, 0), ("buy", 10, 1), ("sell", 15, 2)):
+        _trade(type, quantity, 100.0 + day, day)
+    with Session(db) as session:
+        portfolio.rebuild_all(session)
+        session.commit()
+    # Booking after a replay must not collide with the replayed lot ids
+    assert _trade("buy", 5, 105.0, 3).status_code == 200
+    assert _trade("sell", 8, 106.0, 4).status_code == 200
+
+    with Session(db) as session:
+        lots = {lot.id: lot for lot in session.exec(select(portfolio.PositionLot)).all()}
+        closes = session.exec(select(LotClose)).all()
+    assert len(lots) == 3
+    assert all(lots[c.lot_id].price == c.buy_price for c in closes)
+    assert sorted(lot.remaining for lot in lots.values()) == [0, 0, 2]
+
+
+def test_unknown_trade_type_is_rejected(db):
+    response = _trade("Short", 10, 100.0, 0)
+    assert response.status_code == 422
+    with Session(db) as session:
+        assert session.exec(select(Trade)).all() == []
+
+
+def test_oversell_is_rejected_and_nothing_is_stored(db):
+    _trade("Buy", 10, 100.0, 0)
+    response = _trade("Sell", 15, 120.0, 1)
+
+    assert response.status_code == 409
+    with Session(db) as session:
+        assert len(session.exec(select(Trade)).all()) == 1
+    assert portfolio.load_positions()[0]["quantity"] == 10
+
+
+def test_backdated_sell_that_oversells_a_later_sell_is_rejected(db):
+    _trade("Buy", 10, 100.0, 0)
+    _trade("Sell", 10, 120.0, 5)
+    assert _trade("Sell", 5, 110.0, 2).status_code == 409  # Leaves the later sell uncovered
+    assert portfolio.load_positions(include_closed=True)[0]["realized_pnl"] == pytest.approx(200)
+
+
+def test_deleting_a_buy_a_later_sell_needs_is_rejected(db):
+    buy = _trade("Buy", 10, 100.0, 0).json()["id"]
+    _trade("Sell", 10, 120.0, 1)
+    assert client.delete(f"/trades/{buy}").status_code == 409
+
+
+def test_stored_oversells_leave_the_position_flat_and_consistent(db):
+    # Data from before validation: sold 15 while holding 10, then bought again
+    with Session(db) as session:
+        for type, quantity, price, day in (("Buy", 10, 100.0, 0), ("Sell", 15, 120.0, 1), ("Buy", 4, 90.0, 2)):
+            session.add(Trade(stock_name="AAPL", type=type, quantity=quantity, price=price, trade_date=DAY + timedelta(days=day)))
+        session.add(Trade(stock_name="AAPL", type="Dividend", quantity=1, price=1.0, trade_date=DAY))
+        session.commit()
+
+    portfolio.ensure_materialized()
+
+    [position] = portfolio.load_positions(include_lots=True)
+    assert position["quantity"] == 4
+    assert position["cost_basis"] == pytest.approx(4 * 90)
+    assert position["avg_cost"] == pytest.approx(90)
+    assert position["trade_count"] == 3  # The unknown type is left out
+    with Session(db) as session:
+        unmatched = session.exec(select(LotClose).where(LotClose.lot_id.is_(None))).one()
+        assert unmatched.quantity == 5
+
+
+def test_legacy_negative_positions_are_rebuilt_at_startup(db):
+    with Session(db) as session:
+        session.add(Trade(id=1, stock_name="AAPL", type="Sell", quantity=5, price=100.0, trade_date=DAY))
+        session.add(Position(symbol="AAPL", market="US", quantity=-5, trade_count=1))
+        session.commit()
+
+    portfolio.ensure_materialized()
+    assert portfolio.load_positions(include_closed=True)[0]["quantity"] == 0
+
+
+def test_bulk_import_reports_bad_types_and_oversells(db):
+    body = "\n".join([
+        "stock_name,type,quantity,price,trade_date",
+        "AAPL,Buy,10,100,2024-01-02T00:00:00",
+        "AAPL,Short,5,100,2024-01-03T00:00:00",
+        "AAPL,Sell,12,110,2024-01-04T00:00:00",
+    ])
+    response = client.post("/trades/bulk?format=csv", content=body)
+    report = response.json()
+
+    assert response.status_code == 200
+    assert report["inserted"] == 2
+    assert [error["line"] for error in report["errors"]] == [3]
+    assert report["oversold"] == [{"symbol": "AAPL", "market": "US", "unmatched_quantity": 2}]
+    assert portfolio.load_positions(include_closed=True)[0]["quantity"] == 0
@@ -0,0 +1,62 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from backend import providers
+from conftest import FakeProvider
+
+
+def test_providers_must_implement_quote_and_history():
+    class QuotesOnly(providers.MarketDataProvider):
+        def quote(self, symbol):
+            return {"price": 1.0, "previous_close": None}
+
+    with pytest.raises(TypeError, match="history"):
+        QuotesOnly()
+
+
+def test_concurrent_first_calls_build_one_provider(monkeypatch):
+    built = []
+    start = threading.Barrier(8)
+
+    def slow_from_env():
+        time.sleep(0.05)
+        built.append(FakeProvider())
+        return built[-1]
+
+    monkeypatch.setattr(providers, "_from_env", slow_from_env)
+    monkeypatch.setattr(providers, "_provider", None)
+
+    def first_call(_):
+        start.wait()
+        return providers.get_provider()
+
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(first_call, range(8)))
+
+    assert len(built) == 1
+    assert all(result is built[0] for result in results)
+
+
+def test_replay_serves_what_was_recorded(tmp_path):
+    recorder = providers.RecordingProvider(FakeProvider(count=50), str(tmp_path))
+    recorded = recorder.history("AAPL", "1d", period="max")
+    recorder.history_many(["MSFT"], "1h", period="max")
+    quote = recorder.quote("AAPL")
+    recorder.timezone("AAPL")
+
+    replay = providers.ReplayProvider(str(tmp_path))
+
+    replayed = replay.history("AAPL", "1d")
+    assert list(replayed.index) == list(recorded.index)
+    assert replayed.to_numpy().ravel() == pytest.approx(recorded[providers.OHLCV_COLUMNS].to_numpy().ravel())
+    assert replay.quote("AAPL") == quote
+    assert replay.timezone("AAPL") == "America/New_York"
+    assert replay.symbols() == ["AAPL", "MSFT"]
+    assert replay.history_many(["AAPL", "NVDA"], "1d").keys() == {"AAPL"}
+    since = recorded.index[-5]
+    assert len(replay.history("AAPL", "1d", start=since)) == 5
+    with pytest.raises(LookupError):
+        replay.quote("NVDA")
@@ -0,0 +1,68 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import resample
+from backend.main import app
+
+
+def _bars(start, periods, freq, tz):
+    index = pd.date_range(start, periods=periods, freq=freq, tz=tz)
+    close = np.arange(1, periods + 1, dtype=float)
+    return pd.DataFrame({"Open": close - 0.5, "High": close + 1, "Low": close - 1, "Close": close, "Volume": 10.0}, index=index)
+
+
+def test_intraday_bins_start_at_the_session_open():
+    # Two New York sessions of 1h bars, 09:30..15:30
+    hist = pd.concat([_bars(f"2024-01-0{d} 09:30", 7, "h", "America/New_York") for d in (2, 3)])
+    four_hour = resample.resample(hist, "4h", "AAPL")
+
+    assert [t.strftime("%d %H:%M") for t in four_hour.index] == ["02 09:30", "02 13:30", "03 09:30", "03 13:30"]
+    first = four_hour.iloc[0]
+    assert (first["Open"], first["High"], first["Low"], first["Close"], first["Volume"]) == (0.5, 5.0, 0.0, 4.0, 40.0)
+    assert four_hour["Volume"].sum() == hist["Volume"].sum()
+
+
+def test_futures_evening_bars_belong_to_the_next_session():
+    hist = _bars("2024-01-02 18:00", 24, "h", "America/New_York")  # Tuesday 18:00 .. Wednesday 17:00
+    daily = resample.resample(hist, "1d", "ES=F")
+    assert [t.strftime("%Y-%m-%d") for t in daily.index] == ["2024-01-03"]
+    assert resample.resample(hist, "1d", "AAPL").index.size == 2
+
+
+def test_weekly_and_monthly_bars_follow_the_session_calendar():
+    hist = _bars("2024-01-29", 10, "D", "Asia/Seoul")
+    assert [t.strftime("%m-%d") for t in resample.resample(hist, "1wk").index] == ["01-29", "02-05"]
+    assert [t.strftime("%m-%d") for t in resample.resample(hist, "1mo").index] == ["01-01", "02-01"]
+
+
+@pytest.mark.parametrize("targets,period,base", [
+    (["1d"], "1y", "1d"),
+    (["5m"], "5d", "5m"),
+    (["4h", "1h"], "60d", "1h"),
+    (["10m", "1h"], "30d", "5m"),
+    (["1wk", "1mo"], "5y", "1d"),
+    (["4h"], "1y", "1h"),
+])
+def test_plan_fetches_the_coarsest_common_base(targets, period, base):
+    assert resample.plan(targets, period)[0] == base
+
+
+@pytest.mark.parametrize("targets,period", [(["10m"], "1y"), (["7x"], "5d"), (["2d"], "5d"), ([" "], "5d")])
+def test_plan_rejects_unservable_requests(targets, period):
+    with pytest.raises(ValueError):
+        resample.plan(targets, period)
+
+
+def test_multi_timeframes_come_from_one_fetch(db, provider):
+    response = TestClient(app).get("/stocks/candles/multi/AAPL", params={"intervals": "1d,4h,1h", "period": "30d", "live": "false"})
+    body = json.loads(response.content)
+
+    assert response.status_code == 200
+    assert body["base_interval"] == "1h"
+    assert set(body["candles"]) == {"1d", "4h", "1h"}
+    assert len(body["candles"]["1h"]) > len(body["candles"]["4h"]) > len(body["candles"]["1d"]) > 0
+    assert [c[:3] for c in provider.calls if c[0].startswith("history")] == [("history", "AAPL", "1h")]
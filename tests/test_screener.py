@@ -0,0 +1,125 @@
+import asyncio
+import threading
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+
+from backend import market_data, screener
+from backend.indicator_engine import HISTORY_PERIODS
+from backend.main import app
+from backend.models import ScreenerResult, ScreenerRun
+from conftest import make_bars
+
+client = TestClient(app)  # No lifespan: tables come from the db fixture
+
+
+def _result(symbol, signal, regime, strength):
+    return ScreenerResult(
+        run_id=1, symbol=symbol, market="US", as_of=datetime(2024, 1, 2), price=100, atr=2, signal=signal,
+        strength=strength, regime=regime, regime_confidence=0.5, market_bias="NEUTRAL", volume_status="ACCUMULATION",
+        risk_heat="LOW", position_size=0.3, risk_reward=2, entry_long=102, entry_short=98, stop_loss=97, chandelier_stop=96,
+    )
+
+
+def _seed_run(engine):
+    with Session(engine) as session:
+        session.add(ScreenerRun(id=1, status="finished", symbols=3, screened=3))
+        session.add(_result("AAPL", "STRONG_BUY", "BULL", 1.5))
+        session.add(_result("MSFT", "EXIT_SHORT", "BULL", 0.5))
+        session.add(_result("TSLA", "STRONG_SELL", "BEAR", -1.0))
+        session.commit()
+
+
+def test_filters_take_comma_separated_enum_values(db):
+    _seed_run(db)
+    response = client.get("/screener", params={"signal": "strong_buy,EXIT_SHORT", "regime": "BULL"})
+
+    assert response.status_code == 200
+    assert [r["symbol"] for r in response.json()["results"]] == ["AAPL", "MSFT"]
+
+
+def test_unknown_filter_values_are_rejected(db):
+    _seed_run(db)
+    for params in ({"signal": "STRONG_BUY,BUY"}, {"regime": "TRENDING"}, {"risk_heat": "EXTREME"}):
+        response = client.get("/screener", params=params)
+        assert response.status_code == 400
+        assert "Unknown" in response.json()["detail"]
+
+
+def test_screened_signals_and_regimes_are_within_the_filter_values():
+    rows = screener.screen_batch({s: make_bars(s, "1d", 300) for s in ("AAPL", "MSFT", "NVDA", "TSLA", "AMZN")})
+
+    assert rows
+    assert all(row["signal"] in screener.SIGNALS and row["regime"] in screener.REGIMES for row in rows)
+    assert all(row["market"] in screener.RESULT_MARKETS for row in rows)
+
+
+def test_runs_fetch_the_indicator_engine_window(db, monkeypatch):
+    periods = []
+
+    async def fake_history_many(symbols, period, interval):
+        periods.append((interval, period))
+        return {}
+
+    monkeypatch.setattr(market_data, "get_history_many", fake_history_many)
+    for interval in ("1d", "1h"):
+        asyncio.run(screener.run_screener(["AAPL"], interval))
+
+    assert periods == [("1d", HISTORY_PERIODS["1d"]), ("1h", HISTORY_PERIODS["1h"])]
+
+
+def test_results_use_the_trade_market_codes(db):
+    rows = screener.screen_batch({s: make_bars(s, "1d", 300, tz="Asia/Seoul") for s in ("005930.KS", "035720.KQ")})
+    assert {row["market"] for row in rows} == {"KR"}
+
+    _seed_run(db)
+    with Session(db) as session:
+        korean = _result("005930.KS", "HOLD", "RANGING", 0.1)
+        korean.market = "KR"
+        session.add(korean)
+        session.commit()
+    response = client.get("/screener", params={"market": "KR"})
+    assert response.status_code == 200
+    assert [r["symbol"] for r in response.json()["results"]] == ["005930.KS"]
+
+
+def test_run_progress_is_written_after_each_batch(db, monkeypatch):
+    monkeypatch.setattr(screener, "SCREENER_BATCH_SIZE", 2)
+    monkeypatch.setattr(screener, "SCREENER_FETCH_CONCURRENCY", 1)
+    progress = []
+    record_batch = screener._record_batch
+
+    recording = threading.Lock()
+
+    def spy(run_id, rows, failed):
+        with recording:  # Batches record from worker threads; read each one's effect alone
+            record_batch(run_id, rows, failed)
+            run = client.get(f"/screener/runs/{run_id}").json()
+            progress.append((run["status"], run["screened"], run["failed"]))
+
+    async def fake_history_many(symbols, period, interval):
+        return {s: make_bars(s, "1d", 300) for s in symbols if s != "NODATA"}
+
+    monkeypatch.setattr(screener, "_record_batch", spy)
+    monkeypatch.setattr(market_data, "get_history_many", fake_history_many)
+    run_id = asyncio.run(screener.run_screener(["AAPL", "NODATA", "MSFT", "NVDA"]))
+
+    # Batches finish in either order; each one is visible as soon as it is recorded
+    assert progress[0] in (("running", 1, 1), ("running", 2, 0))
+    assert progress[1] == ("running", 3, 1)
+    with Session(db) as session:
+        run = session.get(ScreenerRun, run_id)
+        assert (run.status, run.screened, run.failed) == ("finished", 3, 1)
+        assert len(session.exec(select(ScreenerResult).where(ScreenerResult.run_id == run_id)).all()) == 3
+
+
+def test_runs_only_accept_intervals_with_a_history_window(db, monkeypatch):
+    for interval in ("5d", "3mo", "4h"):
+        response = client.post("/screener/run", params={"interval": interval})
+        assert response.status_code == 400
+        assert "Unsupported interval" in response.json()["detail"]
+    with pytest.raises(ValueError):
+        asyncio.run(screener.start_screener(["AAPL"], "5d"))
+    assert screener.is_running() is None
@@ -0,0 +1,58 @@
+import unicodedata
+
+from backend.search_index import SymbolIndex
+
+INSTRUMENTS = [
+    {"symbol": "AAPL", "name": "Apple Inc."},
+    {"symbol": "AAL", "name": "American Airlines Group"},
+    {"symbol": "A", "name": "Agilent Technologies"},
+    {"symbol": "MSFT", "name": "Microsoft Corporation"},
+    {"symbol": "APA", "name": "APA Corporation"},
+    {"symbol": "005930.KS", "name": "Samsung Electronics (삼성전자)"},
+    {"symbol": "000660.KS", "name": "SK Hynix (SK하이닉스)"},
+    {"symbol": "aapl", "name": "Duplicate Apple"},
+]
+index = SymbolIndex(INSTRUMENTS)
+
+
+def _symbols(q, limit=10):
+    return [item["symbol"] for item in index.search(q, limit=limit)]
+
+
+def test_ranks_exact_then_symbol_prefix_then_name_prefix_then_substring():
+    assert _symbols("a")[:4] == ["A", "AAL", "APA", "AAPL"]  # Exact, then shorter symbol prefixes first
+    assert _symbols("apple") == ["AAPL"]
+    assert _symbols("corp") == ["APA", "MSFT"]  # Name-word prefix
+    assert _symbols("soft") == ["MSFT"]  # Substring inside a word
+
+
+def test_duplicate_symbols_are_indexed_once():
+    assert len(index) == 7
+    assert index.search("AAPL")[0]["name"] == "Apple Inc."
+
+
+def test_korean_names_match_by_syllables_initials_and_spacing():
+    assert _symbols("삼성") == ["005930.KS"]
+    assert _symbols("삼성 전자") == ["005930.KS"]
+    assert _symbols("ㅅㅅㅈㅈ") == ["005930.KS"]
+    assert _symbols("ㅎㅇ") == ["000660.KS"]  # Initials in the middle of a name
+    assert _symbols(unicodedata.normalize("NFD", "하이닉스")) == ["000660.KS"]  # Decomposed input (macOS IMEs)
+
+
+def test_full_width_and_numeric_queries():
+    assert _symbols("ＭＳＦＴ") == ["MSFT"]
+    assert _symbols("0059") == ["005930.KS"]
+    assert _symbols("5930") == ["005930.KS"]
+
+
+def test_limit_and_empty_queries():
+    assert len(_symbols("a", limit=2)) == 2
+    assert _symbols("   ") == []
+    assert _symbols("zzz") == []
+
+
+def test_name_prefix_hits_are_ranked_before_the_limit_applies():
+    # Forty long symbols whose names sort first, then a short one sorting last
+    crowd = [{"symbol": f"LONGNAME{n:02d}.KS", "name": f"Alpha {n:02d}"} for n in range(40)]
+    index = SymbolIndex(crowd + [{"symbol": "ZZ", "name": "Alphabet"}])
+    assert index.search("alph", limit=5)[0]["symbol"] == "ZZ"
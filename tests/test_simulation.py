@@ -0,0 +1,37 @@
+import numpy as np
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.simulation import simulate_minute_candles
+from conftest import make_bars
+
+
+def test_minutes_stay_inside_their_base_bar_and_join_its_open_and_close():
+    hist = make_bars("AAPL", "1h", 48)
+    minutes = simulate_minute_candles(hist, steps=60, seed=1)
+
+    assert len(minutes) == 48 * 60
+    assert minutes.index.is_monotonic_increasing
+    per_bar = minutes.to_numpy().reshape(48, 60, 5)
+    assert np.all(per_bar[:, :, 1] <= hist["High"].to_numpy()[:, None] + 1e-9)
+    assert np.all(per_bar[:, :, 2] >= hist["Low"].to_numpy()[:, None] - 1e-9)
+    assert np.allclose(per_bar[:, 0, 0], hist["Open"].clip(hist["Low"], hist["High"]))
+    assert np.allclose(per_bar[:, -1, 3], hist["Close"])
+    assert np.all(minutes["High"] >= minutes[["Open", "Close"]].max(axis=1) - 1e-9)
+    assert np.all(minutes["Low"] <= minutes[["Open", "Close"]].min(axis=1) + 1e-9)
+
+
+def test_a_seed_makes_the_path_reproducible():
+    hist = make_bars("MSFT", "1h", 10)
+    assert simulate_minute_candles(hist, seed=7).equals(simulate_minute_candles(hist, seed=7))
+    assert not simulate_minute_candles(hist, seed=7).equals(simulate_minute_candles(hist, seed=8))
+
+
+def test_endpoint_simulates_from_stored_bars(db, provider):
+    client = TestClient(app)
+    first = client.get("/stocks/simulation/1m/AAPL", params={"period": "5d", "interval": "5m", "seed": 3})
+    second = client.get("/stocks/simulation/1m/AAPL", params={"period": "5d", "interval": "5m", "seed": 3})
+
+    assert first.status_code == 200
+    assert first.content == second.content
+    assert client.get("/stocks/simulation/1m/AAPL", params={"interval": "1d"}).status_code == 400
@@ -0,0 +1,77 @@
+import asyncio
+from datetime import datetime, time, timedelta, timezone
+
+from sqlmodel import Session, select
+
+from backend import stats_scheduler
+from backend.models import StockDailyStat
+
+from conftest import make_bars
+
+
+def _history_calls(provider):
+    return [c for c in provider.calls if c[0] in ("history", "history_many")]
+
+
+def test_first_run_backfills_recent_days_without_future_rows(db, provider):
+    written = asyncio.run(stats_scheduler.record_daily_stats(["AAPL", "005930.KS"]))
+
+    assert written > 0
+    with Session(db) as session:
+        rows = session.exec(select(StockDailyStat)).all()
+    for row in rows:
+        assert row.date.date() <= stats_scheduler.session_date(row.symbol)
+        assert row.date.time() == time.min
+    latest = max(r.date for r in rows if r.symbol == "AAPL").date()
+    assert stats_scheduler.session_date("AAPL") - latest <= timedelta(days=1)
+    # Backfill (30 days) plus ATR warm-up, not the old two-year window
+    assert all(c[3] == "240d" for c in _history_calls(provider))
+
+
+def test_up_to_date_symbols_fetch_only_the_warmup_window(db, provider, monkeypatch):
+    from backend import market_data
+
+    asyncio.run(stats_scheduler.record_daily_stats(["AAPL"]))
+    periods = []
+    real = market_data.get_history_many
+
+    async def spy(symbols, period="60d", interval="1d"):
+        periods.append(period)
+        return await real(symbols, period=period, interval=interval)
+
+    monkeypatch.setattr(market_data, "get_history_many", spy)
+    assert asyncio.run(stats_scheduler.record_daily_stats(["AAPL"])) >= 1  # Last day rewritten
+    assert periods == ["210d"]
+
+
+def test_bars_on_a_utc_index_are_dated_in_exchange_time():
+    # A Seoul session bar opens at 00:00 KST, i.e. 15:00 UTC the day before
+    hist = make_bars("005930.KS", "1d", 30, tz="Asia/Seoul").tz_convert("UTC")
+    today = hist.index[-1].tz_convert("Asia/Seoul").date()
+    rows = stats_scheduler._missing_rows("005930.KS", hist, today - timedelta(days=5), today, datetime.utcnow())
+
+    assert rows[-1]["date"].date() == today
+    assert len({r["date"] for r in rows}) == len(rows)
+
+
+def test_rows_after_the_exchange_date_are_skipped():
+    hist = make_bars("AAPL", "1d", 30)
+    last = hist.index[-1].date()
+    rows = stats_scheduler._missing_rows("AAPL", hist, last - timedelta(days=10), last - timedelta(days=1), datetime.utcnow())
+    assert rows and max(r["date"].date() for r in rows) == last - timedelta(days=1)
+
+
+def test_session_date_uses_the_exchange_calendar():
+    now = datetime(2024, 3, 4, 20, 0, tzinfo=timezone.utc)  # Monday evening in New York, Tuesday in Seoul
+    assert stats_scheduler.session_date("AAPL", now).isoformat() == "2024-03-04"
+    assert stats_scheduler.session_date("005930.KS", now).isoformat() == "2024-03-05"
+
+
+def test_next_run_is_the_earliest_post_close_across_markets():
+    # Friday 2024-01-05 12:00 UTC: Seoul has closed (21:00 KST), New York closes at 16:00 ET
+    market, at = stats_scheduler.next_run(datetime(2024, 1, 5, 12, 0, tzinfo=timezone.utc))
+    assert (market, at) == ("US", datetime(2024, 1, 5, 21, 20, tzinfo=timezone.utc))
+
+    # Saturday: both skip to Monday, Seoul first
+    market, at = stats_scheduler.next_run(datetime(2024, 1, 6, 12, 0, tzinfo=timezone.utc))
+    assert (market, at) == ("KRX", datetime(2024, 1, 8, 6, 50, tzinfo=timezone.utc))
@@ -0,0 +1,86 @@
+import asyncio
+import json
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import universe
+from backend.routers import stocks
+
+
+@pytest.fixture
+def snapshot_path(tmp_path, monkeypatch):
+    path = tmp_path / "universe_snapshot.json"
+    monkeypatch.setattr(universe, "UNIVERSE_SNAPSHOT", str(path))
+    monkeypatch.setattr(universe, "state", dict(universe.state))
+    return path
+
+
+def test_fresh_checkout_boots_from_the_shipped_seed(snapshot_path):
+    instruments = universe.load()
+
+    assert universe.state["source"] == "seed"
+    symbols = {i["symbol"] for i in instruments}
+    assert {"AAPL", "MSFT", "005930.KS"} <= symbols
+    assert len(symbols) > 400
+
+
+def test_local_snapshot_wins_over_the_seed(snapshot_path):
+    snapshot_path.write_text(json.dumps({
+        "version": universe.SNAPSHOT_VERSION, "fetched_at": datetime.utcnow().isoformat(),
+        "instruments": [{"symbol": "AAPL", "name": "Apple", "exchange": "S&P 500", "type": "EQUITY"}],
+    }))
+    assert [i["symbol"] for i in universe.load()] == ["AAPL"]
+    assert universe.state["source"] == "snapshot"
+
+
+def test_missing_seed_falls_back_to_builtin(snapshot_path, tmp_path, monkeypatch):
+    monkeypatch.setattr(universe, "SEED_SNAPSHOT", str(tmp_path / "missing.json"))
+    assert universe.load() == universe.KOSPI_TOP_10
+    assert universe.state["source"] == "builtin"
+
+
+def test_refresh_writes_the_snapshot_and_applies_it(snapshot_path, monkeypatch):
+    universe.load()
+    fetched = [{"symbol": "NEW", "name": "New Co", "exchange": "S&P 500", "type": "EQUITY"}]
+
+    async def fetch():
+        return fetched
+
+    monkeypatch.setattr(universe, "_fetch", fetch)
+    applied = []
+    assert asyncio.run(universe.refresh(applied.append))  # The seed is older than the max age
+    assert applied == [fetched]
+    assert json.loads(snapshot_path.read_text())["instruments"] == fetched
+    assert universe.state["source"] == "snapshot"
+
+
+def _client(monkeypatch):
+    import backend.main as main
+
+    async def idle(*args, **kwargs):
+        await asyncio.sleep(3600)
+
+    monkeypatch.setattr(main, "start_leader_tasks", lambda: None)
+    monkeypatch.setattr(universe, "keep_fresh", idle)
+    return main, TestClient(main.app)
+
+
+def test_ready_on_a_fresh_checkout_and_search_finds_seed_symbols(db, snapshot_path, monkeypatch):
+    main, client = _client(monkeypatch)
+    with client:
+        response = client.get("/ready")
+        assert response.status_code == 200
+        assert response.json()["universe"]["source"] == "seed"
+        assert any(hit["symbol"] == "AAPL" for hit in client.get("/stocks/search", params={"q": "AAPL"}).json())
+
+
+def test_not_ready_while_serving_only_the_builtin_list(db, snapshot_path, tmp_path, monkeypatch):
+    monkeypatch.setattr(universe, "SEED_SNAPSHOT", str(tmp_path / "missing.json"))
+    main, client = _client(monkeypatch)
+    with client:
+        response = client.get("/ready")
+        assert response.status_code == 503
+        assert response.json()["checks"]["universe"] is False
+    stocks.set_instruments([])
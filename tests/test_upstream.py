@@ -0,0 +1,114 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlmodel import Session
+
+from backend import candle_store, market_data, upstream
+from backend.models import CandleSeries
+
+
+class RateLimited(Exception):
+    pass
+
+
+def _expire_series(engine, symbol, interval="1d"):
+    with Session(engine) as session:
+        series = session.get(CandleSeries, (symbol, interval))
+        series.refreshed_at = datetime.utcnow() - timedelta(days=1)
+        session.add(series)
+        session.commit()
+
+
+def test_rate_limited_tail_refreshes_open_the_circuit(db, provider):
+    stored = candle_store.get_history("AAPL")
+    provider.error = RateLimited("429 Too Many Requests")
+
+    for _ in range(upstream.breaker.threshold):
+        _expire_series(db, "AAPL")
+        assert candle_store.get_history("AAPL").equals(stored)  # Stored bars while upstream refuses
+
+    assert upstream.breaker.state == "open"
+
+
+def test_open_circuit_still_serves_stored_bars(db, provider):
+    stored = candle_store.get_history("AAPL")
+    _expire_series(db, "AAPL")
+    upstream.breaker.opened_at = upstream.time.monotonic()
+    calls = len(provider.calls)
+
+    assert candle_store.get_history("AAPL").equals(stored)
+    assert asyncio.run(market_data.get_history("AAPL")).equals(stored)
+    assert len(provider.calls) == calls  # No provider call while open
+
+
+def test_open_circuit_refuses_series_never_stored(db, provider):
+    upstream.breaker.opened_at = upstream.time.monotonic()
+    with pytest.raises(upstream.UpstreamUnavailable):
+        candle_store.get_history("AAPL")
+
+
+def test_successful_store_read_does_not_reset_failures(db, provider):
+    candle_store.get_history("AAPL")
+    provider.error = RateLimited("rate limit")
+    _expire_series(db, "AAPL")
+    asyncio.run(market_data.get_history("AAPL"))
+    assert upstream.breaker.failures == 1
+
+
+def test_breaker_lets_one_probe_through_after_the_cooldown(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(upstream.time, "monotonic", lambda: now[0])
+    breaker = upstream.CircuitBreaker(threshold=2, cooldown=10)
+
+    breaker.record(ValueError("bad symbol"))  # Not a rate limit: never trips
+    breaker.record(RateLimited("429"))
+    assert breaker.state == "closed"
+    breaker.record(RateLimited("429"))
+    assert breaker.state == "open"
+    with pytest.raises(upstream.UpstreamUnavailable) as refused:
+        breaker.before_call()
+    assert refused.value.retry_after == 10
+
+    now[0] += 10
+    breaker.before_call()  # The probe
+    with pytest.raises(upstream.UpstreamUnavailable):
+        breaker.before_call()  # Everyone else waits for it
+    breaker.record(RateLimited("429"))
+    assert breaker.state == "open"  # A failed probe reopens at once
+
+    now[0] += 10
+    breaker.before_call()
+    breaker.record(None)
+    assert breaker.state == "closed" and breaker.failures == 0
+
+
+def test_slow_calls_release_the_caller(monkeypatch):
+    monkeypatch.setattr(upstream, "breaker", upstream.CircuitBreaker())
+    with pytest.raises(upstream.UpstreamUnavailable, match="timed out"):
+        asyncio.run(upstream.run("quote", time.sleep, 0.2, timeout=0.01))
+    assert upstream.call_stats["quote"]["timeouts"] >= 1
+
+
+def test_provider_calls_are_counted_and_timed_apart_from_store_reads(db, provider):
+    from backend import metrics
+
+    def outcomes(kind):
+        return {key[1]: value for key, value in metrics.upstream_calls.values.items() if key[0] == kind}
+
+    before = {kind: outcomes(kind) for kind in ("provider_history", "store_history")}
+    timed = lambda: sum(metrics.upstream_latency.series.get(("provider_history",), [0.0])[:-1])
+    timed_before = timed()
+    asyncio.run(market_data.get_history("AAPL"))
+    market_data.history_cache.invalidate()
+    asyncio.run(market_data.get_history("AAPL"))  # Served from the store, no provider call
+    provider.error = RateLimited("429 Too Many Requests")
+    with pytest.raises(RateLimited):
+        candle_store.get_history("NVDA")
+
+    gained = lambda kind, outcome: outcomes(kind).get(outcome, 0) - before[kind].get(outcome, 0)
+    assert (gained("provider_history", "ok"), gained("provider_history", "rate_limited")) == (1, 1)
+    assert gained("store_history", "ok") == 2
+    assert timed() - timed_before == 2
+    assert upstream.call_stats["provider_history"]["seconds"] > 0
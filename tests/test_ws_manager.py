@@ -0,0 +1,168 @@
+import asyncio
+import json
+
+from backend import ws_manager
+from backend.ws_manager import ConnectionManager
+
+
+class FakeSocket:
+    """Accepts instantly; sends block until `open` is set."""
+
+    def __init__(self):
+        self.sent = []
+        self.open = asyncio.Event()
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        await self.open.wait()
+        self.sent.append(json.loads(text))
+
+    async def close(self, code=1000):
+        pass
+
+
+def _quote(price):
+    return {"price": price, "change": 1.0, "change_percent": 1.0}
+
+
+def test_updates_carry_only_changed_fields():
+    async def scenario():
+        manager = ConnectionManager()
+        socket = FakeSocket()
+        socket.open.set()
+        await manager.connect(socket)
+        manager.subscribe(socket, ["AAPL"])
+        await manager.publish_quotes({"AAPL": _quote(10.0)})
+        await asyncio.sleep(0.01)
+        await manager.publish_quotes({"AAPL": {**_quote(10.0), "price": 11.0}})
+        await asyncio.sleep(0.01)
+        manager.disconnect(socket)
+        return socket.sent
+
+    first, second = asyncio.run(scenario())
+    assert first["updates"]["AAPL"] == _quote(10.0)
+    assert second["updates"]["AAPL"] == {"price": 11.0}
+
+
+def test_dropped_market_update_is_resent_in_full(monkeypatch):
+    monkeypatch.setattr(ws_manager, "OUTBOX_SIZE", 2)
+
+    async def scenario():
+        manager = ConnectionManager()
+        socket = FakeSocket()  # Stalled: nothing leaves the outbox yet
+        await manager.connect(socket)
+        manager.subscribe(socket, ["AAPL"])
+        client = manager.clients[socket]
+        await asyncio.sleep(0)
+
+        await manager.publish_quotes({"AAPL": _quote(10.0)})
+        # Two more messages push the market_update out of the full outbox
+        client.enqueue({"type": "error", "detail": "a"})
+        client.enqueue({"type": "error", "detail": "b"})
+        assert client.dropped == 1
+        await manager.publish_quotes({"AAPL": {**_quote(10.0), "price": 11.0}})
+
+        socket.open.set()
+        await asyncio.sleep(0.05)
+        manager.disconnect(socket)
+        return socket.sent
+
+    sent = asyncio.run(scenario())
+    updates = [m for m in sent if m["type"] == "market_update"]
+    assert updates[-1]["updates"]["AAPL"] == {**_quote(10.0), "price": 11.0}
+
+
+def test_subscriptions_pick_the_symbols_each_client_receives():
+    async def scenario():
+        manager = ConnectionManager()
+        default, custom = FakeSocket(), FakeSocket()
+        for socket in (default, custom):
+            socket.open.set()
+            await manager.connect(socket)
+        await manager.handle_message(custom, json.dumps({"action": "subscribe", "symbols": ["msft", " aapl "]}))
+        await manager.handle_message(custom, json.dumps({"action": "unsubscribe", "symbols": ["AAPL"]}))
+        polled = manager.subscribed_symbols()
+        await manager.publish_quotes({"AAPL": _quote(10.0), "MSFT": _quote(20.0)})
+        await asyncio.sleep(0.01)
+        manager.disconnect(default)
+        manager.disconnect(custom)
+        return polled, default.sent, custom.sent
+
+    polled, default, custom = asyncio.run(scenario())
+    assert polled == set(ws_manager.DEFAULT_SYMBOLS) | {"MSFT"}
+    assert [m["symbols"] for m in custom if m["type"] == "subscriptions"] == [["AAPL", "MSFT"], ["MSFT"]]
+    assert [m["updates"].keys() for m in custom if m["type"] == "market_update"] == [{"MSFT"}]
+    assert [m["updates"].keys() for m in default] == [{"AAPL"}]  # DEFAULT_SYMBOLS without MSFT
+
+
+def test_bad_messages_get_an_error_reply(monkeypatch):
+    monkeypatch.setattr(ws_manager, "MAX_SYMBOLS_PER_CLIENT", 2)
+
+    async def scenario():
+        manager = ConnectionManager()
+        socket = FakeSocket()
+        socket.open.set()
+        await manager.connect(socket)
+        for raw in ("not json", json.dumps({"action": "dance"}),
+                    json.dumps({"action": "subscribe", "symbols": ["A", "B", "C"]}),
+                    json.dumps({"action": "subscribe", "bars": ["4h"]}),
+                    json.dumps({"action": "subscribe", "symbols": "AAPL"}),
+                    json.dumps({"action": "subscribe", "bars": "1m"})):
+            await manager.handle_message(socket, raw)
+        await asyncio.sleep(0.01)
+        symbols = manager.clients[socket].symbols
+        manager.disconnect(socket)
+        return socket.sent, symbols
+
+    sent, symbols = asyncio.run(scenario())
+    assert [m["type"] for m in sent] == ["error"] * 6
+    assert "At most 2 symbols" in sent[2]["detail"]
+    assert "must be lists" in sent[4]["detail"]
+    assert symbols is None  # A bare string is never split into one-letter symbols
+
+
+def test_ticks_merge_into_the_update_still_queued():
+    async def scenario():
+        manager = ConnectionManager()
+        socket = FakeSocket()
+        await manager.connect(socket)
+        manager.subscribe(socket, ["AAPL", "MSFT"])
+        await asyncio.sleep(0)
+        # The writer holds the first update; the next three ticks merge into one queued message
+        await manager.publish_quotes({"AAPL": _quote(10.0)})
+        await asyncio.sleep(0)
+        await manager.publish_quotes({"AAPL": {**_quote(10.0), "price": 11.0}})
+        await manager.publish_quotes({"MSFT": _quote(20.0)})
+        await manager.publish_quotes({"AAPL": {**_quote(10.0), "price": 12.0}})
+        queued = len(manager.clients[socket].outbox)
+        socket.open.set()
+        await asyncio.sleep(0.01)
+        manager.disconnect(socket)
+        return queued, socket.sent
+
+    queued, sent = asyncio.run(scenario())
+    assert queued == 1
+    assert [m["updates"] for m in sent] == [{"AAPL": _quote(10.0)}, {"AAPL": {"price": 12.0}, "MSFT": _quote(20.0)}]
+
+
+def test_client_stuck_with_a_full_outbox_is_disconnected(monkeypatch):
+    monkeypatch.setattr(ws_manager, "OUTBOX_SIZE", 1)
+    monkeypatch.setattr(ws_manager, "STUCK_AFTER", 0.02)
+
+    async def scenario():
+        manager = ConnectionManager()
+        stuck, healthy = FakeSocket(), FakeSocket()
+        healthy.open.set()
+        await manager.connect(stuck)
+        await manager.connect(healthy)
+        for i in range(5):  # The writer holds 0, 1 fills the outbox, 2.. are dropped until it counts as stuck
+            await manager.broadcast({"type": "notice", "n": i})
+            await asyncio.sleep(0.015)
+        return manager, stuck, healthy
+
+    manager, stuck, healthy = asyncio.run(scenario())
+    assert stuck not in manager.clients and healthy in manager.clients
+    assert manager.slow_disconnects == 1
+    assert [m["n"] for m in healthy.sent] == [0, 1, 2, 3, 4]